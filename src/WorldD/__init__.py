@@ -1 +1,2 @@
 from .main import *
+from .runtime import MappedWorld, MappedLayer, open_world
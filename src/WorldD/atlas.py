@@ -0,0 +1,138 @@
+"""
+packs the tiles that are used by a world into a small atlas, so neither the editor nor a game has to keep
+(and convert) the whole sprite sheet.
+"""
+
+import math
+import os
+import sys
+from typing import Iterable
+
+import pygame as pg
+
+Rect = tuple[int, int, int, int]
+
+
+def pack(sizes: Iterable[tuple[int, int]], width: int | None = None) -> tuple[list[tuple[int, int]], tuple[int, int]]:
+	"""
+	shelf packing, the tallest tiles are placed first, row by row
+	:param sizes: (width, height) of every tile
+	:param width: width of the atlas, by default the smallest power of two that gives a roughly square atlas
+	:return: position of every tile (in the order of sizes) and the size of the atlas
+	"""
+	sizes = list(sizes)
+	if not sizes:
+		return [], (0, 0)
+	if width is None:
+		area = sum(w * h for w, h in sizes)
+		width = 1 << max(math.ceil(math.log2(math.sqrt(area))), 0)
+	width = max(width, max(w for w, _ in sizes))
+	positions: list[tuple[int, int] | None] = [None] * len(sizes)
+	x = y = shelf = 0
+	used_width = 0
+	for idx in sorted(range(len(sizes)), key=lambda idx: (-sizes[idx][1], -sizes[idx][0])):
+		w, h = sizes[idx]
+		if x + w > width:
+			x, y = 0, y + shelf
+			shelf = 0
+		positions[idx] = (x, y)
+		x += w
+		used_width = max(used_width, x)
+		shelf = max(shelf, h)
+	return positions, (used_width, y + shelf)
+
+
+class Atlas:
+
+	def __init__(self, image: pg.Surface, rects: Iterable[Rect]):
+		"""
+		copies the rects of the image into a tightly packed surface, rects used more than once are stored once
+		:param image: sprite sheet
+		:param rects: rects of the tiles on the sprite sheet
+		"""
+		self.rects: list[Rect] = sorted({tuple(pg.Rect(rect)) for rect in rects})
+		positions, size = pack(rect[2:] for rect in self.rects)
+		self.surface = pg.Surface(size, pg.SRCALPHA)
+		if pg.display.get_surface() is not None:
+			self.surface = self.surface.convert_alpha()
+		self.remap: dict[Rect, Rect] = {}
+		self.surface.fblits(
+			(image.subsurface(rect), position) for rect, position in zip(self.rects, positions)
+		)
+		for rect, (x, y) in zip(self.rects, positions):
+			self.remap[rect] = (x, y, rect[2], rect[3])
+
+	def __getitem__(self, rect) -> Rect:
+		""":return: rect of the tile on the atlas"""
+		return self.remap[tuple(rect)]
+
+	def __contains__(self, rect) -> bool:
+		return tuple(rect) in self.remap
+
+	def save(self, path: str):
+		pg.image.save(self.surface, path)
+
+	def remap_tiles(self, data: dict) -> dict:
+		"""
+		:param data: tile lookup as it is saved in the world ({group: {'tiles': {name: rect}, ...}})
+		:return: copy of the lookup with the rects on the atlas
+		"""
+		return {
+			name: {**group, 'tiles': {tile: list(self[rect]) for tile, rect in group['tiles'].items()}}
+			for name, group in data.items()
+		}
+
+	@property
+	def nbytes(self) -> int:
+		return self.surface.get_width() * self.surface.get_height() * self.surface.get_bytesize()
+
+	def __repr__(self):
+		return f'<Atlas tiles:{len(self.rects)} size:{self.surface.get_size()}>'
+
+
+def export(path: str, meta: dict, grid, image: pg.Surface, atlas_path: str | None = None, compression: str | None = 'zlib') -> Atlas:
+	"""
+	saves the world as a binary world whose tile lookup points to a new atlas of the tiles in the lookup
+	:param path: path of the new world
+	:param meta: json friendly data besides the grid (tile size, img, data, ...), it isn't changed
+	:param grid: grid of the world
+	:param image: sprite sheet the tile lookup points to
+	:param atlas_path: path of the atlas image, path with .png extension by default
+	"""
+	from . import binary
+	if atlas_path is None:
+		atlas_path = os.path.splitext(path)[0] + '.png'
+	data = meta.get('data', {})
+	atlas = Atlas(image, (rect for group in data.values() for rect in group['tiles'].values()))
+	atlas.save(atlas_path)
+	with open(path, 'wb') as file:
+		binary.write(file, {**meta, 'img': atlas_path, 'data': atlas.remap_tiles(data)}, grid, compression)
+	return atlas
+
+
+def export_world(source: str, destination: str, atlas_path: str | None = None, print_out: bool = True):
+	"""loads the world at source (any version) and exports it with an atlas, see export"""
+	from .main import GREEN, RESET, WorldLoader
+	loader = WorldLoader(source, print_out=print_out)
+	if loader.load() is None:
+		raise ValueError(f'can\'t export {source}, unknown version')
+	meta = {key: value for key, value in loader.meta.items() if key not in ('version', 'journal')}
+	meta['tile-size'] = loader.tile_size
+	meta['layer-names'] = loader.layer_names
+	meta['data'] = {
+		name: {
+			'tiles': dict(tile_group.tiles), 'pos': list(tile_group.pos), '_draw_matrix': False, '_matrix': {},
+			'blob': {str(mask): tile for mask, tile in tile_group.blob.items()}
+		}
+		for name, tile_group in loader.tiles.items()
+	}
+	atlas = export(destination, meta, loader.grid, pg.image.load(loader.sprite_sheet), atlas_path)
+	if print_out:
+		print(f'{GREEN}[EXPORTED] > {destination} ({atlas}){RESET}')
+
+
+if __name__ == '__main__':
+	if len(sys.argv) < 3:
+		print('usage: python -m WorldD.atlas <source.world> <destination.world> [atlas.png]')
+		sys.exit(1)
+	export_world(sys.argv[1], sys.argv[2], *sys.argv[3:4])
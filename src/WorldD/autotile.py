@@ -0,0 +1,137 @@
+"""
+bitmask autotiling.
+every cell of a terrain gets a mask of its 8 neighbours that belong to the same terrain,
+the mask is looked up in a table of 256 tiles that is compiled once per tile group.
+a corner only matters when both edges next to it are set, this leaves 47 different masks (blob tileset),
+masks without a blob tile use the tile of their 4 edges (N, E, S, W - 16 tiles, built from the 3x3 matrix of the group).
+"""
+
+from typing import Iterable, Sequence
+
+from .grid import EMPTY, Layer, Palette
+
+N, NE, E, SE, S, SW, W, NW = (1 << bit for bit in range(8))
+NEIGHBOURS = ((0, -1, N), (1, -1, NE), (1, 0, E), (1, 1, SE), (0, 1, S), (-1, 1, SW), (-1, 0, W), (-1, -1, NW))
+_CORNERS = ((NE, N | E), (SE, S | E), (SW, S | W), (NW, N | W))
+
+
+def reduce_mask(mask: int) -> int:
+	""":return: mask without the corners that don't have both of their edges"""
+	for corner, edges in _CORNERS:
+		if mask & corner and mask & edges != edges:
+			mask &= ~corner
+	return mask
+
+
+def edge_mask(mask: int) -> int:
+	""":return: 4 bit mask (N = 1, E = 2, S = 4, W = 8) of the edges of an 8 bit mask"""
+	return bool(mask & N) | bool(mask & E) << 1 | bool(mask & S) << 2 | bool(mask & W) << 3
+
+
+BLOB_MASKS = sorted({reduce_mask(mask) for mask in range(256)})  # 47 masks
+BLOB_INDEX = [BLOB_MASKS.index(reduce_mask(mask)) for mask in range(256)]
+EDGE_INDEX = [edge_mask(mask) for mask in range(256)]
+
+
+class AutotileRules:
+	"""tile names for every neighbour mask of one tile group"""
+
+	def __init__(self, edges: Sequence[str | None], blob: dict[int, str] | None = None):
+		"""
+		:param edges: tile for every 4 bit mask (N = 1, E = 2, S = 4, W = 8), None if there is no tile
+		:param blob: tiles of the 47 tile set by 8 bit mask, they win over the edges
+		"""
+		if len(edges) != 16:
+			raise ValueError(f'expected 16 edge tiles, got {len(edges)}')
+		self.edges: list[str | None] = list(edges)
+		self.blob: dict[int, str] = {reduce_mask(mask): name for mask, name in (blob or {}).items()}
+		self.table: list[str | None] = [
+			self.blob.get(BLOB_MASKS[BLOB_INDEX[mask]], self.edges[EDGE_INDEX[mask]]) for mask in range(256)
+		]
+
+	@classmethod
+	def from_matrix(cls, matrix: dict[tuple[int, int], str | None], blob: dict[int, str] | None = None) -> 'AutotileRules':
+		"""
+		cells at the edge of the terrain use the part of the 3x3 matrix on the same side, like the autotile rect
+		:param matrix: tiles from -1x-1 to 1x1
+		"""
+		edges = []
+		for mask in range(16):
+			n, e, s, w = (bool(mask & bit) for bit in (1, 2, 4, 8))
+			x = -1 if e and not w else 1 if w and not e else 0
+			y = -1 if s and not n else 1 if n and not s else 0
+			edges.append(matrix.get((x, y)))
+		return cls(edges, blob)
+
+	@property
+	def names(self) -> set[str]:
+		""":return: every tile used by the rules"""
+		return {name for name in self.table if name is not None}
+
+	def ids(self, group: str, palette: Palette) -> tuple[list[int], frozenset[int]]:
+		"""
+		:param group: name of the tile group the rules belong to
+		:return: tile id for every 8 bit mask (EMPTY without a tile) and the ids that belong to the terrain
+		"""
+		ids = {name: palette.intern((group, name)) for name in self.names}
+		return [ids[name] if name is not None else EMPTY for name in self.table], frozenset(ids.values())
+
+	def __getitem__(self, mask: int) -> str | None:
+		return self.table[mask]
+
+	def __repr__(self):
+		return f'<AutotileRules tiles:{len(self.names)} blob:{len(self.blob)}>'
+
+
+def neighbour_mask(layer: Layer, x: int, y: int, terrain: frozenset[int]) -> int:
+	""":return: 8 bit mask of the neighbours of x, y whose tile ids are in the terrain"""
+	get_id = layer.get_id
+	mask = 0
+	for dx, dy, bit in NEIGHBOURS:
+		if get_id(x + dx, y + dy) in terrain:
+			mask |= bit
+	return mask
+
+
+def update(layer: Layer, cells: Iterable[tuple[int, int]], table: Sequence[int], terrain: frozenset[int]) -> list[tuple[int, int]]:
+	"""
+	recomputes the tiles of the terrain on the cells and their neighbours, nothing else of the layer is visited
+	:param table: tile id for every 8 bit mask, see AutotileRules.ids
+	:return: cells whose tile changed
+	"""
+	changed = []
+	todo = {(x + dx, y + dy) for x, y in cells for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+	for x, y in todo:
+		if layer.get_id(x, y) not in terrain:
+			continue
+		id_ = table[neighbour_mask(layer, x, y, terrain)]
+		if id_ != EMPTY and layer.set_id(x, y, id_) != id_:
+			changed.append((x, y))
+	return changed
+
+
+def paint(layer: Layer, x: int, y: int, table: Sequence[int], terrain: frozenset[int], erase: bool = False) -> list[tuple[int, int]]:
+	"""
+	puts the terrain on x, y (or removes the tile) and fixes the tiles around it
+	:return: cells whose tile changed
+	"""
+	return paint_cells(layer, [(x, y)], table, terrain, erase)
+
+
+def paint_cells(layer: Layer, cells: Iterable[tuple[int, int]], table: Sequence[int], terrain: frozenset[int], erase: bool = False) -> list[tuple[int, int]]:
+	"""
+	puts the terrain on all cells at once (or removes their tiles) and fixes the tiles around them in one update,
+	gives the same result as painting the cells one by one
+	:return: cells whose tile changed
+	"""
+	get_id = layer.get_id
+	cells = dict.fromkeys(cells)
+	if erase:
+		cells = [(x, y) for x, y in cells if get_id(x, y) != EMPTY]
+	else:
+		cells = [(x, y) for x, y in cells if get_id(x, y) not in terrain]
+	if not cells:
+		return []
+	layer.set_ids(cells, EMPTY if erase else next(iter(terrain)))
+	painted = set(cells)
+	return cells + [cell for cell in update(layer, cells, table, terrain) if cell not in painted]
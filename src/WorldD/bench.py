@@ -0,0 +1,212 @@
+"""
+headless benchmark of the editor.
+worlds are loaded through Project and a scripted session is replayed on them: the camera pans, the zoom goes in and out
+and brush strokes are painted, all of it through the same events the window would get.
+every part of the frame is timed on its own, so a regression shows up next to the part that caused it.
+
+python -m WorldD.bench [world.world ...] [--synthetic 10k,1m,10m] [--frames 120] [--dir <folder for synthetic worlds>]
+without worlds the synthetic suite is used.
+"""
+
+import argparse
+import math
+import os
+import tempfile
+import time
+from array import array
+
+import pygame as pg
+from pygame.locals import MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL
+
+from . import binary
+from .grid import CHUNK_AREA, CHUNK_SIZE, TILE_ID_TYPE, Chunk, Grid
+from .main import GREEN, RED, RESET, YELLOW, Main, Project
+
+SYNTHETIC = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}  # tiles of the synthetic worlds
+SHEET_TILES = 8  # the synthetic sprite sheet has SHEET_TILES x SHEET_TILES tiles
+TILE = 16
+PARTS = ('events', 'lines', 'tiles', 'sidebar')
+
+
+def headless():
+	"""switches pygame to the dummy video driver, nothing is shown and no window is needed"""
+	os.environ['SDL_VIDEODRIVER'] = 'dummy'
+	os.environ['SDL_AUDIODRIVER'] = 'dummy'
+	pg.display.quit()
+	pg.display.init()
+
+
+"""====[ SYNTHETIC WORLDS ]===="""
+def synthetic_sheet(directory: str) -> str:
+	""":return: path of a sprite sheet with a differently coloured tile on every place"""
+	path = os.path.join(directory, 'synthetic.png')
+	if not os.path.exists(path):
+		sheet = pg.Surface((SHEET_TILES * TILE, SHEET_TILES * TILE))
+		for y in range(SHEET_TILES):
+			for x in range(SHEET_TILES):
+				sheet.fill((x * 255 // SHEET_TILES, y * 255 // SHEET_TILES, 120), (x * TILE, y * TILE, TILE, TILE))
+		pg.image.save(sheet, path)
+	return path
+
+
+def synthetic_world(directory: str, name: str, tiles: int) -> str:
+	"""
+	writes a world with at least the amount of tiles (whole chunks in a square) or reuses the one written before
+	:return: path of the world
+	"""
+	path = os.path.join(directory, f'synthetic-{name}.world')
+	if os.path.exists(path):
+		return path
+	names = {f'{x}x{y}': [x * TILE, y * TILE, TILE, TILE] for y in range(SHEET_TILES) for x in range(SHEET_TILES)}
+	grid = Grid([{}])
+	ids = [grid.palette.intern(('synthetic', tile)) for tile in names]
+	# every chunk has the same diagonal pattern of all the tiles
+	pattern = array(TILE_ID_TYPE, (
+		ids[(idx % CHUNK_SIZE + idx // CHUNK_SIZE * 3) % len(ids)] for idx in range(CHUNK_AREA)
+	))
+	chunks = -(-tiles // CHUNK_AREA)
+	width = math.isqrt(chunks - 1) + 1
+	for idx in range(chunks):
+		grid[0].put_chunk((idx % width, idx // width), Chunk(array(TILE_ID_TYPE, pattern)))
+	meta = {
+		'tile-size': [TILE, TILE],
+		'img': synthetic_sheet(directory),
+		'data': {'synthetic': {'tiles': names, 'pos': [0, 0], '_draw_matrix': False, '_matrix': {}}},
+		'layer-names': ['layer 1'],
+		'current-layer': 0
+	}
+	with open(path + '.tmp', 'wb') as file:
+		binary.write(file, meta, grid)
+	os.replace(path + '.tmp', path)
+	print(f'{YELLOW}[BENCH] > WROTE {path} ({len(grid[0])} tiles){RESET}')
+	return path
+
+
+"""====[ SESSION ]===="""
+def session(project: Project, frames: int) -> list[list[pg.event.Event]]:
+	"""
+	scripted input: a third of the frames pans the camera, a third zooms in and out and the rest paints brush strokes
+	:return: events of every frame
+	"""
+	display = project.display.get_rect()
+	left, right = project.sidebar.right + 40, display.w - 40
+	center = ((left + right) // 2, display.h // 2)
+	pan, zoom = frames // 3, frames // 3
+	script = []
+	for frame in range(frames):
+		if frame < pan:
+			angle = frame / max(pan, 1) * math.tau
+			rel = (round(math.cos(angle) * 24), round(math.sin(angle) * 24))
+			script.append([pg.event.Event(MOUSEMOTION, pos=center, rel=rel, buttons=(0, 1, 0))])
+		elif frame < pan + zoom:
+			# 8 frames in, 16 out, 8 in
+			y = 1 if (frame - pan) % 32 < 8 or (frame - pan) % 32 >= 24 else -1
+			script.append([pg.event.Event(MOUSEWHEEL, x=0, y=y, flipped=False, precise_x=0.0, precise_y=float(y))])
+		else:
+			# strokes of 10 frames, a few motion events per frame like a fast hand
+			step = frame - pan - zoom
+			y = display.h // 4 + (step // 10) * 37 % (display.h // 2)
+			x = left + (step % 10) * (right - left) // 10
+			events = []
+			if step % 10 == 0:
+				events.append(pg.event.Event(MOUSEBUTTONDOWN, button=1, pos=(x, y)))
+			for sub in range(1, 4):
+				pos = (x + sub * (right - left) // 40, y + sub * 3)
+				events.append(pg.event.Event(MOUSEMOTION, pos=pos, rel=((right - left) // 40, 3), buttons=(1, 0, 0)))
+			if step % 10 == 9:
+				events.append(pg.event.Event(MOUSEBUTTONUP, button=1, pos=events[-1].pos))
+			script.append(events)
+	return script
+
+
+def timed(times: dict[str, list[float]], part: str, func, *args):
+	start = time.perf_counter()
+	func(*args)
+	times[part].append(time.perf_counter() - start)
+
+
+def draw_sidebar(project: Project):
+	"""the sidebar part of Project.render"""
+	pg.draw.rect(project.display, (10, 10, 10), project.sidebar)
+	project.layers_vis.visualize()
+	for tile_group in project.tiles.values():
+		tile_group.draw()
+
+
+def run(editor: Main, path: str, frames: int) -> tuple[int, dict[str, list[float]]]:
+	"""
+	loads the world and replays the session on it
+	:return: amount of tiles in the world, seconds spent in every part of every frame (and the load time)
+	"""
+	start = time.perf_counter()
+	project = Project(editor, (32, 32), load=path)
+	project.finish_loading()
+	if project.sprite_sheet is None:
+		raise IOError(f'can\'t load {path}')
+	times = {'load': [time.perf_counter() - start], **{part: [] for part in PARTS}}
+	tiles = sum(len(layer) for layer in project.grid)
+	editor.projects.append(project)
+	editor.selected = len(editor.projects) - 1
+	group = next((group for group in project.tiles.values() if group.tiles), None)
+	if group is not None:
+		project.selected_tile = (group.name, next(iter(group.tiles)))
+	project.select_tool('brush')
+	display = project.display.get_rect()
+	pg.mouse.set_pos(((project.sidebar.right + display.w) // 2, display.h // 2))
+	pg.event.clear()
+	for events in session(project, frames):
+		for event in events:
+			pg.event.post(event)
+		timed(times, 'events', editor.eventHandler)
+		timed(times, 'lines', project.draw_grid_lines)
+		timed(times, 'tiles', project.draw_grid_tiles)
+		timed(times, 'sidebar', draw_sidebar, project)
+	editor.projects.remove(project)
+	editor.selected = 0
+	return tiles, times
+
+
+def report(path: str, tiles: int, times: dict[str, list[float]]):
+	print(f'{GREEN}[BENCH] > {os.path.basename(path)} ({tiles} tiles) loaded in {times["load"][0] * 1000:.1f} ms{RESET}')
+	print(f'    {"part":<10}{"mean":>10}{"p95":>10}{"max":>10}   ms per frame, {len(times[PARTS[0]])} frames')
+	total = [sum(frame) for frame in zip(*(times[part] for part in PARTS))]
+	for part, values in [*((part, times[part]) for part in PARTS), ('total', total)]:
+		values = sorted(values)
+		if not values:
+			continue
+		mean = sum(values) / len(values)
+		p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+		print(f'    {part:<10}{mean * 1000:>10.3f}{p95 * 1000:>10.3f}{values[-1] * 1000:>10.3f}')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='python -m WorldD.bench', description='headless benchmark of the editor')
+	parser.add_argument('worlds', nargs='*', help='worlds to replay the session on, the synthetic suite without them')
+	parser.add_argument('--synthetic', default=None, help=f'comma separated sizes out of {", ".join(SYNTHETIC)}')
+	parser.add_argument('--frames', type=int, default=120)
+	parser.add_argument('--dir', default=os.path.join(tempfile.gettempdir(), 'WorldD-bench'),
+	                    help='folder the synthetic worlds are written to and reused from')
+	args = parser.parse_args(argv)
+
+	headless()
+	editor = Main()
+	worlds = list(args.worlds)
+	sizes = args.synthetic.split(',') if args.synthetic is not None else ([] if worlds else list(SYNTHETIC))
+	if sizes:
+		os.makedirs(args.dir, exist_ok=True)
+	for size in sizes:
+		if size not in SYNTHETIC:
+			parser.error(f'unknown synthetic size {size}, use {", ".join(SYNTHETIC)}')
+		worlds.append(synthetic_world(args.dir, size, SYNTHETIC[size]))
+	for path in worlds:
+		try:
+			tiles, times = run(editor, path, args.frames)
+		except (IOError, ValueError) as error:
+			print(f'{RED}[BENCH] > FAILED {path} ({error}){RESET}')
+			continue
+		report(path, tiles, times)
+	editor.saver.wait()
+
+
+if __name__ == '__main__':
+	main()
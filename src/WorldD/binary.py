@@ -0,0 +1,227 @@
+"""
+binary world layout (little endian):
+	HEADER                                  magic, format, compression, chunk shift, layer count, meta offset, meta size
+	LAYER * layer count                     offset of the chunk directory, amount of chunks
+	DIRECTORY_ENTRY * chunks (per layer)    chunk x, chunk y, offset, size - sorted by (y, x)
+	chunk data                              CHUNK_AREA tile ids (unsigned short), compressed one by one
+	meta                                    utf-8 json with everything besides the grid (tile size, img, tiles, palette, ...)
+
+journal (<world>.journal), appended on every save between two full saves:
+	JOURNAL_RECORD                          magic, crc32 and size of the payload
+	payload                                 head size, utf-8 json head (token, meta, layers, compression),
+	                                        then JOURNAL_CHUNK + chunk data for every changed chunk (size 0 = removed chunk)
+"""
+
+import json
+import lzma
+import struct
+import sys
+import zlib
+from array import array
+from typing import BinaryIO, Iterator
+
+from .grid import CHUNK_AREA, CHUNK_SHIFT, TILE_ID_TYPE, Chunk, Grid, Layer
+
+MAGIC = b'WRLD'
+FORMAT = 1
+VERSION = '2.0.0'  # version reported to WorldD.load, next to the json versions
+HEADER = struct.Struct('<4sHBBIQQ')
+LAYER = struct.Struct('<QI')
+DIRECTORY_ENTRY = struct.Struct('<iiQI')
+
+JOURNAL_MAGIC = b'WJNL'
+JOURNAL_RECORD = struct.Struct('<4sIQ')
+JOURNAL_HEAD = struct.Struct('<I')
+JOURNAL_CHUNK = struct.Struct('<Iiii')
+
+COMPRESSIONS = {None: 0, 'none': 0, 'zlib': 1, 'lzma': 2}
+_compress = {0: bytes, 1: zlib.compress, 2: lzma.compress}
+_decompress = {0: bytes, 1: zlib.decompress, 2: lzma.decompress}
+
+
+def is_binary(file: BinaryIO) -> bool:
+	""":return: True if the opened file is a binary world, the file position isn't changed"""
+	pos = file.tell()
+	magic = file.read(len(MAGIC))
+	file.seek(pos)
+	return magic == MAGIC
+
+
+def encode_chunk(chunk: Chunk, compression: int) -> bytes:
+	tiles = chunk.tiles
+	if sys.byteorder == 'big':
+		tiles = array(TILE_ID_TYPE, tiles)
+		tiles.byteswap()
+	return _compress[compression](tiles.tobytes())
+
+
+def decode_chunk(data: bytes, compression: int) -> Chunk:
+	tiles = array(TILE_ID_TYPE)
+	tiles.frombytes(_decompress[compression](data))
+	if sys.byteorder == 'big':
+		tiles.byteswap()
+	if len(tiles) != CHUNK_AREA:
+		raise ValueError(f'chunk has {len(tiles)} tiles instead of {CHUNK_AREA}')
+	return Chunk(tiles)
+
+
+def write(file: BinaryIO, meta: dict, grid: Grid, compression: str | None = 'zlib'):
+	"""
+	:param file: file opened in binary mode
+	:param meta: json friendly data of the world besides the grid and the palette (tile size, img, ...)
+	:param compression: None, 'zlib' or 'lzma', every chunk is compressed on its own
+	"""
+	compression = COMPRESSIONS[compression]
+	layers = [sorted(layer.chunks.items(), key=lambda item: (item[0][1], item[0][0])) for layer in grid]
+	offset = HEADER.size + LAYER.size * len(layers)
+	layer_table = []
+	for chunks in layers:
+		layer_table.append(LAYER.pack(offset, len(chunks)))
+		offset += DIRECTORY_ENTRY.size * len(chunks)
+	directories = []
+	data = []
+	for chunks in layers:
+		for (cx, cy), chunk in chunks:
+			encoded = encode_chunk(chunk, compression)
+			directories.append(DIRECTORY_ENTRY.pack(cx, cy, offset, len(encoded)))
+			data.append(encoded)
+			offset += len(encoded)
+	meta = json.dumps({**meta, 'version': VERSION, 'palette': grid.palette.to_list()}, separators=(',', ':')).encode()
+	file.write(HEADER.pack(MAGIC, FORMAT, compression, CHUNK_SHIFT, len(layers), offset, len(meta)))
+	file.write(b''.join(layer_table))
+	file.write(b''.join(directories))
+	for encoded in data:
+		file.write(encoded)
+	file.write(meta)
+
+
+def read_header(buffer) -> tuple[int, int, int, int]:
+	""":return: compression, layer count, meta offset, meta size"""
+	magic, format_, compression, chunk_shift, layer_count, meta_offset, meta_size = HEADER.unpack_from(buffer, 0)
+	if magic != MAGIC:
+		raise ValueError('not a binary world')
+	if format_ > FORMAT:
+		raise ValueError(f'binary world format {format_} is newer than supported ({FORMAT})')
+	if chunk_shift != CHUNK_SHIFT:
+		raise ValueError(f'binary world uses chunks of {1 << chunk_shift} tiles instead of {1 << CHUNK_SHIFT}')
+	return compression, layer_count, meta_offset, meta_size
+
+
+def iter_read(file: BinaryIO, grid: Grid, step: int = 256) -> Iterator[float]:
+	"""
+	reads the binary world into the grid (the palette is loaded first)
+	:return: iterator of progress (0 - 1), the meta dict is the return value of the generator
+	"""
+	buffer = memoryview(file.read())
+	compression, layer_count, meta_offset, meta_size = read_header(buffer)
+	meta = json.loads(bytes(buffer[meta_offset:meta_offset + meta_size]))
+	grid.palette.extend(meta.pop('palette'))
+	total = sum(LAYER.unpack_from(buffer, HEADER.size + LAYER.size * idx)[1] for idx in range(layer_count)) or 1
+	loaded = 0
+	for idx in range(layer_count):
+		layer = grid.new_layer()
+		directory, count = LAYER.unpack_from(buffer, HEADER.size + LAYER.size * idx)
+		for entry in range(count):
+			cx, cy, offset, size = DIRECTORY_ENTRY.unpack_from(buffer, directory + DIRECTORY_ENTRY.size * entry)
+			layer.put_chunk((cx, cy), decode_chunk(buffer[offset:offset + size], compression))
+			loaded += 1
+			if loaded % step == 0:
+				yield loaded / total
+	return meta
+
+
+def read(file: BinaryIO) -> tuple[dict, Grid]:
+	""":return: meta (tile size, img, tiles, ...) and the grid"""
+	grid = Grid()
+	reader = iter_read(file, grid)
+	while True:
+		try:
+			next(reader)
+		except StopIteration as stop:
+			return stop.value, grid
+
+
+def journal_path(path: str) -> str:
+	return path + '.journal'
+
+
+def write_journal_record(
+		file: BinaryIO, token: str, meta: dict, layers: list[int],
+		chunks: list[tuple[int, tuple[int, int], Chunk | None]], compression: str | None = 'zlib'
+):
+	"""
+	appends one record to the journal, a record holds everything that changed since the previous one
+	:param token: token of the full save the journal continues
+	:param meta: json friendly data besides the grid, palette included
+	:param layers: for every layer, index of the layer in the previous state it continues (-1 for a new layer)
+	:param chunks: (layer, chunk key, chunk) for every changed chunk, None marks a removed chunk
+	"""
+	compression_id = COMPRESSIONS[compression]
+	head = json.dumps(
+		{'token': token, 'meta': meta, 'layers': layers, 'compression': compression_id}, separators=(',', ':')
+	).encode()
+	parts = [JOURNAL_HEAD.pack(len(head)), head]
+	for layer, (cx, cy), chunk in chunks:
+		data = b'' if chunk is None else encode_chunk(chunk, compression_id)
+		parts.append(JOURNAL_CHUNK.pack(layer, cx, cy, len(data)))
+		parts.append(data)
+	payload = b''.join(parts)
+	file.write(JOURNAL_RECORD.pack(JOURNAL_MAGIC, zlib.crc32(payload), len(payload)) + payload)
+
+
+def journal_end(file: BinaryIO) -> int:
+	""":return: size of the complete records at the start of the journal, an interrupted record after them is ignored"""
+	file.seek(0, 2)
+	size = file.tell()
+	pos = 0
+	while pos + JOURNAL_RECORD.size <= size:
+		file.seek(pos)
+		magic, _, record_size = JOURNAL_RECORD.unpack(file.read(JOURNAL_RECORD.size))
+		if magic != JOURNAL_MAGIC or pos + JOURNAL_RECORD.size + record_size > size:
+			break
+		pos += JOURNAL_RECORD.size + record_size
+	return pos
+
+
+def iter_journal(file: BinaryIO, token: str) -> Iterator[tuple[dict, list[int], list[tuple[int, tuple[int, int], Chunk | None]]]]:
+	"""
+	reading stops at the first record that is incomplete (interrupted write) or belongs to another full save
+	:return: iterator of (meta, layers, chunks) for every record, see write_journal_record
+	"""
+	buffer = memoryview(file.read())
+	pos = 0
+	while pos + JOURNAL_RECORD.size <= len(buffer):
+		magic, crc, size = JOURNAL_RECORD.unpack_from(buffer, pos)
+		payload = buffer[pos + JOURNAL_RECORD.size:pos + JOURNAL_RECORD.size + size]
+		if magic != JOURNAL_MAGIC or len(payload) != size or zlib.crc32(payload) != crc:
+			return
+		pos += JOURNAL_RECORD.size + size
+		head_size, = JOURNAL_HEAD.unpack_from(payload, 0)
+		head = json.loads(bytes(payload[JOURNAL_HEAD.size:JOURNAL_HEAD.size + head_size]))
+		if head['token'] != token:
+			return
+		chunks = []
+		offset = JOURNAL_HEAD.size + head_size
+		while offset < size:
+			layer, cx, cy, chunk_size = JOURNAL_CHUNK.unpack_from(payload, offset)
+			offset += JOURNAL_CHUNK.size
+			chunk = decode_chunk(payload[offset:offset + chunk_size], head['compression']) if chunk_size else None
+			chunks.append((layer, (cx, cy), chunk))
+			offset += chunk_size
+		yield head['meta'], head['layers'], chunks
+
+
+def apply_journal_record(grid: Grid, layers: list[int], chunks: list[tuple[int, tuple[int, int], Chunk | None]]):
+	"""rebuilds the layers of the grid and replaces the changed chunks (the palette has to be replaced before)"""
+	previous = list(grid)
+	grid[:] = [previous[idx] if idx >= 0 else Layer(grid.palette) for idx in layers]
+	for layer, key, chunk in chunks:
+		grid[layer].put_chunk(key, Chunk() if chunk is None else chunk)
+
+
+if __name__ == '__main__':
+	from .main import convert
+	if len(sys.argv) < 3:
+		print('usage: python -m WorldD.binary <source.world> <destination.world> [zlib | lzma | none | json]')
+		sys.exit(1)
+	convert(sys.argv[1], sys.argv[2], *sys.argv[3:4])
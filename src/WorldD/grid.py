@@ -0,0 +1,493 @@
+import sys
+from array import array
+from collections.abc import MutableMapping
+from itertools import compress, count
+from typing import Callable, Iterable, Iterator, Sequence
+
+CHUNK_SHIFT = 5
+CHUNK_SIZE = 1 << CHUNK_SHIFT  # 32x32 tiles per chunk
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE
+TILE_ID_TYPE = 'H'  # unsigned short, 2 bytes per cell
+MAX_TILE_ID = 0xFFFF
+EMPTY = 0
+
+_EMPTY_TILES = array(TILE_ID_TYPE, bytes(CHUNK_AREA * array(TILE_ID_TYPE).itemsize))
+_versions = count(1)
+_layer_uids = count(1)
+
+
+def chunk_key(x: int, y: int) -> tuple[int, int]:
+	""":return: position of the chunk that holds tile x, y (works for negative positions too)"""
+	return x >> CHUNK_SHIFT, y >> CHUNK_SHIFT
+
+
+def cell(pos) -> tuple[int, int] | None:
+	"""
+	:param pos: position of a tile, whole floats (like the ones of pygame.Vector2) are accepted too
+	:return: position with int coordinates, None if the position isn't on a cell
+	"""
+	x, y = pos
+	if type(x) is not int:
+		x = float(x)
+		if not x.is_integer():
+			return None
+		x = int(x)
+	if type(y) is not int:
+		y = float(y)
+		if not y.is_integer():
+			return None
+		y = int(y)
+	return x, y
+
+
+def line(x0: int, y0: int, x1: int, y1: int) -> Iterator[tuple[int, int]]:
+	""":return: iterator of the cells from x0, y0 to x1, y1 (both included) without gaps, bresenham's line"""
+	dx, dy = abs(x1 - x0), -abs(y1 - y0)
+	sx, sy = 1 if x0 < x1 else -1, 1 if y0 < y1 else -1
+	err = dx + dy
+	while True:
+		yield x0, y0
+		if x0 == x1 and y0 == y1:
+			return
+		err2 = 2 * err
+		if err2 >= dy:
+			err += dy
+			x0 += sx
+		if err2 <= dx:
+			err += dx
+			y0 += sy
+
+
+def iter_chunk_rect(key: tuple[int, int], tiles: Sequence[int], left: int, top: int, right: int, bottom: int) -> Iterator[tuple[int, int, int]]:
+	"""
+	:param key: position of the chunk
+	:param tiles: CHUNK_AREA tile ids row by row (array, memoryview, ...)
+	:return: iterator of (x, y, tile id) for every occupied cell of the chunk inside of the tile area
+	"""
+	chunk_left, chunk_top = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+	x0, x1 = max(left - chunk_left, 0), min(right - chunk_left, CHUNK_SIZE)
+	y0, y1 = max(top - chunk_top, 0), min(bottom - chunk_top, CHUNK_SIZE)
+	if x0 == 0 and y0 == 0 and x1 == CHUNK_SIZE and y1 == CHUNK_SIZE:
+		for idx in compress(range(CHUNK_AREA), tiles):
+			yield chunk_left + (idx & CHUNK_MASK), chunk_top + (idx >> CHUNK_SHIFT), tiles[idx]
+		return
+	for row in range(y0, y1):
+		start = row << CHUNK_SHIFT
+		y = chunk_top + row
+		for idx in compress(range(start + x0, start + x1), tiles[start + x0:start + x1]):
+			yield chunk_left + (idx & CHUNK_MASK), y, tiles[idx]
+
+
+class Palette:
+	"""
+	lookup between tile references (group, name) and small integer tile ids.
+	id 0 is reserved for an empty cell.
+	"""
+
+	def __init__(self, entries: Iterable[Sequence[str] | None] = ()):
+		""":param entries: tiles in id order starting from id 1, None marks an unused id"""
+		self.entries: list[tuple[str, str] | None] = [None]
+		self.ids: dict[tuple[str, str], int] = {}
+		self.free: list[int] = []
+		self.extend(entries)
+
+	def extend(self, entries: Iterable[Sequence[str] | None]):
+		"""adds tiles in id order, None marks an unused id"""
+		for entry in entries:
+			id_ = len(self.entries)
+			if entry is None:
+				self.free.append(id_)
+				self.entries.append(None)
+			else:
+				tile = (entry[0], entry[1])
+				self.entries.append(tile)
+				self.ids.setdefault(tile, id_)
+		if len(self.entries) - 1 > MAX_TILE_ID:
+			raise OverflowError(f'palette can\'t hold more than {MAX_TILE_ID} tiles')
+
+	def intern(self, tile: Sequence[str]) -> int:
+		""":return: id of the tile, the tile gets a new id if it wasn't seen before"""
+		tile = (tile[0], tile[1])
+		id_ = self.ids.get(tile)
+		if id_ is None:
+			if self.free:
+				id_ = self.free.pop()
+				self.entries[id_] = tile
+			else:
+				id_ = len(self.entries)
+				if id_ > MAX_TILE_ID:
+					raise OverflowError(f'palette can\'t hold more than {MAX_TILE_ID} tiles')
+				self.entries.append(tile)
+			self.ids[tile] = id_
+		return id_
+
+	def discard(self, tile: Sequence[str]) -> int:
+		""":return: id the tile had (EMPTY if it wasn't in the palette), the id can be reused afterwards"""
+		id_ = self.ids.pop((tile[0], tile[1]), EMPTY)
+		if id_ != EMPTY:
+			self.entries[id_] = None
+			self.free.append(id_)
+		return id_
+
+	def get_id(self, tile: Sequence[str]) -> int:
+		""":return: id of the tile or EMPTY if it isn't in the palette"""
+		return self.ids.get((tile[0], tile[1]), EMPTY)
+
+	def to_list(self) -> list[list[str] | None]:
+		""":return: json friendly list of tiles in id order, starting from id 1"""
+		return [list(entry) if entry is not None else None for entry in self.entries[1:]]
+
+	def clear(self):
+		self.entries = [None]
+		self.ids = {}
+		self.free = []
+
+	def copy(self) -> 'Palette':
+		palette = Palette()
+		palette.entries = self.entries.copy()
+		palette.ids = self.ids.copy()
+		palette.free = self.free.copy()
+		return palette
+
+	def __getitem__(self, id_: int) -> tuple[str, str] | None:
+		return self.entries[id_]
+
+	def __contains__(self, tile) -> bool:
+		return tuple(tile) in self.ids
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def __repr__(self):
+		return f'<Palette tiles:{len(self)}>'
+
+
+class Chunk:
+	"""
+	CHUNK_SIZE x CHUNK_SIZE block of tile ids stored row by row.
+	version changes on every modification and is never shared between chunks, so caches can compare it.
+	"""
+
+	__slots__ = ('tiles', 'count', 'version')
+
+	def __init__(self, tiles: array = None):
+		self.tiles: array = array(TILE_ID_TYPE, _EMPTY_TILES) if tiles is None else tiles
+		self.count: int = CHUNK_AREA - self.tiles.count(EMPTY)
+		self.version: int = next(_versions)
+
+	def touch(self):
+		self.version = next(_versions)
+
+	def copy(self) -> 'Chunk':
+		""":return: independent copy with the same version"""
+		chunk = Chunk(array(TILE_ID_TYPE, self.tiles))
+		chunk.version = self.version
+		return chunk
+
+	@property
+	def nbytes(self) -> int:
+		return sys.getsizeof(self.tiles)
+
+
+class Layer(MutableMapping):
+	"""
+	chunked storage of one layer.
+	behaves like the old dict[tuple[int, int], [group, name]], but every cell is only a tile id inside of a chunk array.
+	"""
+
+	# called with (layer, chunk key) before a chunk is changed, used by the undo history
+	recorder: Callable[['Layer', tuple[int, int]], None] | None = None
+
+	def __init__(self, palette: Palette, tiles=None):
+		self.palette = palette
+		self.uid = next(_layer_uids)
+		self.chunks: dict[tuple[int, int], Chunk] = {}
+		self._len = 0
+		if tiles:
+			self.update(tiles)
+
+	def get_id(self, x: int, y: int) -> int:
+		""":return: tile id at x, y (EMPTY if there is no tile)"""
+		chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+		if chunk is None:
+			return EMPTY
+		return chunk.tiles[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+	def set_id(self, x: int, y: int, id_: int) -> int:
+		"""
+		:param id_: tile id, EMPTY removes the tile
+		:return: previous tile id at x, y
+		"""
+		key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+		chunk = self.chunks.get(key)
+		if chunk is None:
+			if id_ == EMPTY:
+				return EMPTY
+			if self.recorder is not None:
+				self.recorder(self, key)
+			chunk = self.chunks[key] = Chunk()
+		idx = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+		old = chunk.tiles[idx]
+		if old == id_:
+			return old
+		if self.recorder is not None:
+			self.recorder(self, key)
+		chunk.tiles[idx] = id_
+		chunk.version = next(_versions)
+		if old == EMPTY:
+			chunk.count += 1
+			self._len += 1
+		elif id_ == EMPTY:
+			chunk.count -= 1
+			self._len -= 1
+			if not chunk.count:
+				del self.chunks[key]
+		return old
+
+	def fill(self, left: int, top: int, right: int, bottom: int, id_: int):
+		"""
+		sets every cell with left <= x < right and top <= y < bottom at once, row slices of the chunk arrays are replaced
+		:param id_: tile id, EMPTY removes the tiles
+		"""
+		if left >= right or top >= bottom:
+			return
+		full = array(TILE_ID_TYPE, [id_]) * CHUNK_AREA
+		for cy in range(top >> CHUNK_SHIFT, ((bottom - 1) >> CHUNK_SHIFT) + 1):
+			chunk_top = cy << CHUNK_SHIFT
+			y0, y1 = max(top - chunk_top, 0), min(bottom - chunk_top, CHUNK_SIZE)
+			for cx in range(left >> CHUNK_SHIFT, ((right - 1) >> CHUNK_SHIFT) + 1):
+				chunk_left = cx << CHUNK_SHIFT
+				x0, x1 = max(left - chunk_left, 0), min(right - chunk_left, CHUNK_SIZE)
+				key = (cx, cy)
+				chunk = self.chunks.get(key)
+				if chunk is None:
+					if id_ == EMPTY:
+						continue
+					if self.recorder is not None:
+						self.recorder(self, key)
+					chunk = self.chunks[key] = Chunk()
+				tiles = chunk.tiles
+				old_count = chunk.count
+				if x1 - x0 == CHUNK_SIZE and y1 - y0 == CHUNK_SIZE:
+					if tiles == full:
+						continue
+					if self.recorder is not None:
+						self.recorder(self, key)
+					tiles[:] = full
+					chunk.count = CHUNK_AREA if id_ != EMPTY else 0
+				else:
+					row = full[:x1 - x0]
+					changed = False
+					for start in range((y0 << CHUNK_SHIFT) + x0, (y1 << CHUNK_SHIFT) + x0, CHUNK_SIZE):
+						if tiles[start:start + x1 - x0] != row:
+							if not changed and self.recorder is not None:
+								self.recorder(self, key)
+							tiles[start:start + x1 - x0] = row
+							changed = True
+					if not changed:
+						continue
+					chunk.count = CHUNK_AREA - tiles.count(EMPTY)
+				chunk.version = next(_versions)
+				self._len += chunk.count - old_count
+				if not chunk.count:
+					del self.chunks[key]
+
+	def set_ids(self, cells: Iterable[tuple[int, int]], id_: int) -> int:
+		"""
+		sets many cells to the same tile id, every chunk is looked up, recorded and versioned once
+		:param id_: tile id, EMPTY removes the tiles
+		:return: number of changed cells
+		"""
+		by_chunk: dict[tuple[int, int], set[int]] = {}
+		for x, y in cells:
+			by_chunk.setdefault((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT), set()).add(((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK))
+		changed = 0
+		for key, indices in by_chunk.items():
+			chunk = self.chunks.get(key)
+			tiles = chunk.tiles if chunk is not None else _EMPTY_TILES
+			indices = [idx for idx in indices if tiles[idx] != id_]
+			if not indices:
+				continue
+			if self.recorder is not None:
+				self.recorder(self, key)
+			if chunk is None:
+				chunk = self.chunks[key] = Chunk()
+				tiles = chunk.tiles
+			if id_ == EMPTY:
+				filled = -len(indices)
+			else:
+				filled = sum(tiles[idx] == EMPTY for idx in indices)
+			for idx in indices:
+				tiles[idx] = id_
+			chunk.count += filled
+			chunk.version = next(_versions)
+			self._len += filled
+			changed += len(indices)
+			if not chunk.count:
+				del self.chunks[key]
+		return changed
+
+	def put_chunk(self, key: tuple[int, int], chunk: Chunk):
+		"""replaces the whole chunk at the chunk position"""
+		if self.recorder is not None:
+			self.recorder(self, key)
+		old = self.chunks.pop(key, None)
+		if old is not None:
+			self._len -= old.count
+		if chunk.count:
+			self.chunks[key] = chunk
+			self._len += chunk.count
+
+	def iter_ids(self) -> Iterator[tuple[int, int, int]]:
+		""":return: iterator of (x, y, tile id) for every tile in the layer"""
+		for (cx, cy), chunk in self.chunks.items():
+			left, top = cx << CHUNK_SHIFT, cy << CHUNK_SHIFT
+			tiles = chunk.tiles
+			for idx in compress(range(CHUNK_AREA), tiles):
+				yield left + (idx & CHUNK_MASK), top + (idx >> CHUNK_SHIFT), tiles[idx]
+
+	def chunks_in_rect(self, left: int, top: int, right: int, bottom: int) -> Iterator[tuple[tuple[int, int], Chunk]]:
+		""":return: iterator of (chunk key, chunk) for every existing chunk that overlaps the tile area"""
+		if left >= right or top >= bottom:
+			return
+		c_left, c_top = left >> CHUNK_SHIFT, top >> CHUNK_SHIFT
+		c_right, c_bottom = (right - 1) >> CHUNK_SHIFT, (bottom - 1) >> CHUNK_SHIFT
+		chunks = self.chunks
+		if (c_right - c_left + 1) * (c_bottom - c_top + 1) > len(chunks):
+			for key in sorted(key for key in chunks if c_left <= key[0] <= c_right and c_top <= key[1] <= c_bottom):
+				yield key, chunks[key]
+			return
+		for cx in range(c_left, c_right + 1):
+			for cy in range(c_top, c_bottom + 1):
+				chunk = chunks.get((cx, cy))
+				if chunk is not None:
+					yield (cx, cy), chunk
+
+	def iter_rect(self, left: int, top: int, right: int, bottom: int) -> Iterator[tuple[int, int, int]]:
+		"""
+		only visits chunks that overlap the area and only yields occupied cells
+		:return: iterator of (x, y, tile id) for every tile with left <= x < right and top <= y < bottom
+		"""
+		for key, chunk in self.chunks_in_rect(left, top, right, bottom):
+			yield from iter_chunk_rect(key, chunk.tiles, left, top, right, bottom)
+
+	def purge(self, id_: int) -> int:
+		"""
+		removes every cell with the tile id
+		:return: amount of removed tiles
+		"""
+		removed = 0
+		for key, chunk in list(self.chunks.items()):
+			tiles = chunk.tiles
+			if id_ not in tiles:
+				continue
+			if self.recorder is not None:
+				self.recorder(self, key)
+			for idx in compress(range(CHUNK_AREA), map(id_.__eq__, tiles)):
+				tiles[idx] = EMPTY
+				removed += 1
+			chunk.count = CHUNK_AREA - tiles.count(EMPTY)
+			chunk.touch()
+			if not chunk.count:
+				del self.chunks[key]
+		self._len -= removed
+		return removed
+
+	def copy(self, palette: Palette = None) -> 'Layer':
+		"""
+		:param palette: palette of the copy, the palette of this layer by default
+		:return: independent copy of the layer (chunk arrays are copied, the uid is kept)
+		"""
+		layer = Layer(self.palette if palette is None else palette)
+		layer.uid = self.uid
+		layer.chunks = {key: chunk.copy() for key, chunk in self.chunks.items()}
+		layer._len = self._len
+		return layer
+
+	@property
+	def revision(self) -> tuple[int, int, int]:
+		""":return: value that changes whenever the layer is modified"""
+		return self.uid, len(self.chunks), max((chunk.version for chunk in self.chunks.values()), default=0)
+
+	def memory_usage(self) -> int:
+		""":return: approximate amount of bytes used by the layer"""
+		return sys.getsizeof(self.chunks) + sum(chunk.nbytes for chunk in self.chunks.values())
+
+	def __getitem__(self, pos):
+		xy = cell(pos)
+		id_ = self.get_id(*xy) if xy is not None else EMPTY
+		if id_ == EMPTY:
+			raise KeyError(pos)
+		return self.palette.entries[id_]
+
+	def get(self, pos, default=None):
+		xy = cell(pos)
+		id_ = self.get_id(*xy) if xy is not None else EMPTY
+		return self.palette.entries[id_] if id_ != EMPTY else default
+
+	def __setitem__(self, pos, tile):
+		xy = cell(pos)
+		if xy is None:
+			raise KeyError(f'{pos} isn\'t a cell, positions have to be whole numbers')
+		self.set_id(xy[0], xy[1], self.palette.intern(tile))
+
+	def __delitem__(self, pos):
+		xy = cell(pos)
+		if xy is None or self.set_id(xy[0], xy[1], EMPTY) == EMPTY:
+			raise KeyError(pos)
+
+	def __contains__(self, pos) -> bool:
+		xy = cell(pos)
+		return xy is not None and self.get_id(*xy) != EMPTY
+
+	def __iter__(self) -> Iterator[tuple[int, int]]:
+		for x, y, _ in self.iter_ids():
+			yield x, y
+
+	def __len__(self) -> int:
+		return self._len
+
+	def __repr__(self):
+		return f'<Layer tiles:{self._len} chunks:{len(self.chunks)}>'
+
+
+class Grid(list):
+	"""list of layers sharing one palette"""
+
+	def __init__(self, layers: Iterable = (), palette: Palette = None):
+		self.palette = Palette() if palette is None else palette
+		super().__init__(Layer(self.palette, layer) for layer in layers)
+
+	def new_layer(self) -> Layer:
+		layer = Layer(self.palette)
+		self.append(layer)
+		return layer
+
+	def copy(self) -> 'Grid':
+		""":return: snapshot of the grid that isn't affected by later changes"""
+		grid = Grid(palette=self.palette.copy())
+		grid.extend(layer.copy(grid.palette) for layer in self)
+		return grid
+
+	@property
+	def revision(self) -> tuple:
+		""":return: value that changes whenever a layer or the palette is modified"""
+		return tuple(layer.revision for layer in self), tuple(self.palette.entries)
+
+	def remove_tile(self, tile: Sequence[str]) -> int:
+		"""
+		removes the tile from the palette and every layer
+		:return: amount of removed tiles
+		"""
+		id_ = self.palette.discard(tile)
+		if id_ == EMPTY:
+			return 0
+		return sum(layer.purge(id_) for layer in self)
+
+	def memory_usage(self) -> list[int]:
+		""":return: approximate amount of bytes used by each layer"""
+		return [layer.memory_usage() for layer in self]
+
+	def __repr__(self):
+		return f'<Grid layers:{len(self)} palette:{len(self.palette)}>'
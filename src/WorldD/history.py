@@ -0,0 +1,243 @@
+"""
+undo / redo of the project.
+a step only keeps what it changed: every touched chunk as it was before the first change (zlib compressed),
+and the palette, layer list, layer names or tile lookup when the step changes them.
+undoing a step swaps the stored state with the current one, the swapped out state becomes the redo step.
+"""
+
+import sys
+import zlib
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+from .grid import TILE_ID_TYPE, Chunk, Layer, Palette
+
+_RECORD_SIZE = 96  # approximate bytes used by the dict entry of one chunk
+
+
+class Step:
+	__slots__ = ('name', 'chunks', 'palette', 'layers', 'lookup', 'nbytes')
+
+	def __init__(self, name: str):
+		self.name = name
+		# id of the layer: (layer, {chunk key: compressed tiles or None if the chunk didn't exist})
+		self.chunks: dict[int, tuple[Layer, dict[tuple[int, int], bytes | None]]] = {}
+		self.palette: Palette | None = None
+		self.layers: tuple[list[Layer], list[str], int] | None = None  # layers, layer names, current layer
+		self.lookup: dict[str, tuple[object, dict]] | None = None  # tile groups with their tiles
+		self.nbytes = 0
+
+	def __bool__(self):
+		return bool(self.chunks) or self.palette is not None or self.layers is not None or self.lookup is not None
+
+	def __repr__(self):
+		return f'<Step "{self.name}" chunks:{sum(len(chunks) for _, chunks in self.chunks.values())} bytes:{self.nbytes}>'
+
+
+def layers_size(layers: tuple[list[Layer], list[str], int]) -> int:
+	return sys.getsizeof(layers[0]) + sum(map(sys.getsizeof, layers[1]))
+
+
+def lookup_size(lookup: dict[str, tuple[object, dict]]) -> int:
+	return sum(sys.getsizeof(group_tiles) for _, group_tiles in lookup.values())
+
+
+def palette_size(palette: Palette) -> int:
+	return sys.getsizeof(palette.entries) + sys.getsizeof(palette.ids) + sys.getsizeof(palette.free)
+
+
+def pack_chunk(chunk: Chunk | None) -> bytes | None:
+	return zlib.compress(chunk.tiles.tobytes(), 1) if chunk is not None else None
+
+
+def unpack_chunk(data: bytes | None) -> Chunk:
+	if data is None:
+		return Chunk()
+	tiles = array(TILE_ID_TYPE)
+	tiles.frombytes(zlib.decompress(data))
+	return Chunk(tiles)
+
+
+class History:
+
+	def __init__(self, project, limit: int):
+		"""
+		:param project: project whose grid, layer names and tile lookup are recorded
+		:param limit: bytes the steps can use together, the oldest steps are forgotten first
+		"""
+		self.project = project
+		self.limit = limit
+		self.undo_steps: deque[Step] = deque()
+		self.redo_steps: list[Step] = []
+		self.current: Step | None = None
+		self.attached: list[Layer] = []
+		self.nbytes = 0
+
+	"""====[ RECORDING ]===="""
+	def begin(self, name: str) -> bool:
+		"""
+		starts recording a step, changes made until end() are undone together
+		:return: False if a step was already recorded (the changes become part of it)
+		"""
+		if self.current is not None:
+			return False
+		self.current = Step(name)
+		# tile ids in the recorded chunks are only valid with the palette of the same moment
+		self.current.palette = self.project.palette.copy()
+		self.attach()
+		return True
+
+	def end(self):
+		"""finishes the recorded step"""
+		step = self.current
+		if step is None:
+			return
+		self.current = None
+		self.detach()
+		palette = self.project.palette
+		if step.palette.entries == palette.entries and step.palette.free == palette.free:
+			step.palette = None
+		else:
+			step.nbytes += palette_size(step.palette)
+		if not step:
+			return
+		self.forget(self.redo_steps)
+		self.undo_steps.append(step)
+		self.nbytes += step.nbytes
+		while self.nbytes > self.limit and len(self.undo_steps) > 1:
+			self.nbytes -= self.undo_steps.popleft().nbytes
+
+	@contextmanager
+	def step(self, name: str):
+		"""records everything changed inside of the with statement as one step (or as a part of the recorded one)"""
+		began = self.begin(name)
+		try:
+			yield
+		finally:
+			if began:
+				self.end()
+
+	def attach(self):
+		self.attached = list(self.project.grid)
+		for layer in self.attached:
+			layer.recorder = self.record
+
+	def detach(self):
+		for layer in self.attached:
+			layer.recorder = None
+		self.attached = []
+
+	def record(self, layer: Layer, key: tuple[int, int]):
+		"""called by the layer before the chunk is changed, only the first change of a chunk is stored"""
+		step = self.current
+		if step is None:
+			return
+		chunks = step.chunks.get(id(layer))
+		if chunks is None:
+			chunks = step.chunks[id(layer)] = (layer, {})
+		chunks = chunks[1]
+		if key in chunks:
+			return
+		data = chunks[key] = pack_chunk(layer.chunks.get(key))
+		step.nbytes += _RECORD_SIZE + (len(data) if data is not None else 0)
+
+	def remember_layers(self):
+		"""has to be called before layers are added, removed or renamed"""
+		step = self.current
+		if step is None or step.layers is not None:
+			return
+		step.layers = (list(self.project.grid), list(self.project.layer_names), self.project.current_layer)
+		step.nbytes += layers_size(step.layers)
+
+	def remember_lookup(self):
+		"""has to be called before tiles or tile groups are removed from the tile lookup"""
+		step = self.current
+		if step is None or step.lookup is not None:
+			return
+		step.lookup = self.lookup()
+		step.nbytes += lookup_size(step.lookup)
+
+	def lookup(self) -> dict[str, tuple[object, dict]]:
+		""":return: tile groups with a copy of their tiles"""
+		return {name: (group, dict(group.tiles)) for name, group in self.project.tiles.items()}
+
+	"""====[ UNDO ]===="""
+	def undo(self) -> Step | None:
+		""":return: undone step or None if there is nothing to undo"""
+		self.end()
+		if not self.undo_steps:
+			return None
+		step = self.undo_steps.pop()
+		self.nbytes -= step.nbytes
+		redo = self.swap(step)
+		self.redo_steps.append(redo)
+		self.nbytes += redo.nbytes
+		return step
+
+	def redo(self) -> Step | None:
+		""":return: redone step or None if there is nothing to redo"""
+		self.end()
+		if not self.redo_steps:
+			return None
+		step = self.redo_steps.pop()
+		self.nbytes -= step.nbytes
+		undo = self.swap(step)
+		self.undo_steps.append(undo)
+		self.nbytes += undo.nbytes
+		return step
+
+	def swap(self, step: Step) -> Step:
+		"""
+		brings back the state stored in the step
+		:return: step with the state that was replaced
+		"""
+		project = self.project
+		inverse = Step(step.name)
+		for layer, chunks in step.chunks.values():
+			replaced = {}
+			for key, data in chunks.items():
+				replaced[key] = current = pack_chunk(layer.chunks.get(key))
+				inverse.nbytes += _RECORD_SIZE + (len(current) if current is not None else 0)
+				layer.put_chunk(key, unpack_chunk(data))
+			inverse.chunks[id(layer)] = (layer, replaced)
+		if step.palette is not None:
+			inverse.palette = project.palette.copy()
+			inverse.nbytes += palette_size(inverse.palette)
+			project.palette.entries = step.palette.entries.copy()
+			project.palette.ids = step.palette.ids.copy()
+			project.palette.free = step.palette.free.copy()
+		if step.lookup is not None:
+			inverse.lookup = self.lookup()
+			inverse.nbytes += lookup_size(inverse.lookup)
+			project.tiles.clear()
+			for name, (group, group_tiles) in step.lookup.items():
+				group.tiles = dict(group_tiles)
+				group.version += 1
+				project.tiles[name] = group
+			if project.raw_selected_tile is not None:
+				group, name = project.raw_selected_tile
+				if group not in project.tiles or name not in project.tiles[group].tiles:
+					project.selected_tile = None
+			project.lookup_changed()
+		if step.layers is not None:
+			inverse.layers = (list(project.grid), list(project.layer_names), project.current_layer)
+			inverse.nbytes += layers_size(inverse.layers)
+			layers, names, current_layer = step.layers
+			project.grid[:] = layers
+			project.layer_names[:] = names
+			project.current_layer = current_layer
+		project.chunk_cache.invalidate()
+		return inverse
+
+	def forget(self, steps):
+		while steps:
+			self.nbytes -= steps.pop().nbytes
+
+	def clear(self):
+		self.end()
+		self.forget(self.undo_steps)
+		self.forget(self.redo_steps)
+
+	def __repr__(self):
+		return f'<History undo:{len(self.undo_steps)} redo:{len(self.redo_steps)} bytes:{self.nbytes}>'
@@ -1,12 +1,28 @@
+import copy
 import json
+import math
 import os
+import re
+import stat
 import sys
-import tkinter
+import tempfile
+import threading
+import time
 import tomllib
-from tkinter import filedialog
-from typing import TypeVar, Union
+from collections import OrderedDict
+from fractions import Fraction
+from functools import partial
+from weakref import WeakValueDictionary
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar, Union
 import pygame as pg
 from pygame.locals import *
+from .grid import CHUNK_SHIFT, CHUNK_SIZE, EMPTY, Chunk, Grid, Layer, Palette, line
+from .stream import JSONStream
+from .atlas import Atlas
+from . import atlas
+from . import autotile
+from .history import History
+from . import binary
 try:
 	import colorama
 	RED = colorama.Fore.RED
@@ -18,15 +34,210 @@ except ImportError:
 	
 
 pg.init()
-tkinter.Tk().withdraw()
+_tk_root = None
 
-__version__ = '1.0.0'
+__version__ = '1.1.0'
 
 PureTileGroup = TypeVar('PureTileGroup')
 
 
 TILES = dict[str, PureTileGroup]
-GRID = list[dict[tuple[int, int], list[str, str]]]
+GRID = Grid
+
+
+class WorldLoader:
+	
+	VERSIONS = ("? 0.12", "1.0.0", "1.1.0", binary.VERSION)
+	STEP = 4096  # amount of tiles loaded by one step
+	ENTRY_ID = re.compile(r'\s*"(-?\d+),(-?\d+)"\s*:\s*(\d+)\s*(?:,|(?=}))')
+	ENTRY_TILE = re.compile(
+		r'\s*"(-?[\d.]+),(-?[\d.]+)"\s*:\s*\[\s*"([^"\\]*)"\s*,\s*"([^"\\]*)"\s*]\s*(?:,|(?=}))'
+	)
+	
+	def __init__(self, path: Union[str, object], spec_version=None, print_out: bool = True):
+		"""
+		incremental world loader, every step (next()) parses a part of the file and returns the progress (0 - 1).
+		grid is filled while loading, so it can be shown before the whole file is loaded.
+		:param path: str, path to file (or already opened file)
+		:param print_out: boolean value, if False: no printing.
+		:param spec_version: specify version, if None then it will automatically match.
+		"""
+		self.print_out = print_out
+		self.spec_version = spec_version
+		self.dprint(f'{YELLOW}[LOADING] > {GREEN}STARTED{RESET}')
+		if type(path) is str:
+			self.dprint(f'{YELLOW}[LOADING] > OPENING A FILE ({path}){RESET}')
+			path = open(path, 'rb')
+			self.dprint(f'{YELLOW}[LOADING] > OPENED A FILE{RESET}')
+		else:
+			self.dprint(f'{YELLOW}[LOADING] > FILE ALREADY OPENED{RESET}')
+		self.file = path
+		self.binary = binary.is_binary(path)
+		self.stream = JSONStream(path)
+		self._progress = 0.0
+		"""====[ LOADED ]===="""
+		self.meta: dict = {}  # everything besides the grid and the palette, as it is in the file
+		self.version: str | None = None
+		self.tile_size: list[int, int] | None = None
+		self.sprite_sheet: str | None = None
+		self.tiles: TILES | None = None
+		self.grid: GRID = Grid()
+		self.layer_names: list[str] | None = None
+		self.journal_records = 0  # amount of journal records applied on top of the full save
+		self.journal_chunks = 0
+		self.done = False
+		self.result: tuple[list[int, int], str, TILES, GRID, list] | None = None
+		self._steps = self.steps()
+	
+	def dprint(self, text):
+		if self.print_out:
+			print(text)
+	
+	@property
+	def progress(self) -> float:
+		return self._progress
+	
+	def __iter__(self):
+		return self
+	
+	def __next__(self) -> float:
+		self._progress = next(self._steps)
+		return self._progress
+	
+	def load(self) -> Union[tuple[list[int, int], str, TILES, GRID, list], None]:
+		""":returns: tile size, sprite sheet path, tiles, grid, layer names"""
+		for _ in self:
+			pass
+		return self.result
+	
+	def load_tiles(self, data: dict):
+		if all(type(tile_group) is dict for tile_group in data.values()):
+			self.tiles = \
+				{
+					name: PureTileGroup(name, {tile: pos for tile, pos in tile_group['tiles'].items()}, tile_group['pos'])
+					for name, tile_group in data.items()
+				}
+			for name, tile_group in data.items():
+				self.tiles[name].blob = {int(mask): tile for mask, tile in tile_group.get('blob', {}).items()}
+		else:  # ? 0.12
+			self.tiles = {'all': PureTileGroup('all', {tile: tuple(map(int, pos.lstrip('(').rstrip(')').split(',')))
+			                                           for pos, tile in data.items()})}
+		self.dprint(f'{GREEN}[LOADED] > TILES{RESET}')
+	
+	def load_layer(self, layer: Layer):
+		stream = self.stream
+		palette = self.grid.palette
+		loaded = 0
+		stream.consume('{')
+		while True:
+			match = stream.match(self.ENTRY_ID)
+			if match is not None:
+				x, y, tile_id = match.groups()
+				layer.set_id(int(x), int(y), int(tile_id))
+			else:
+				match = stream.match(self.ENTRY_TILE)
+				if match is not None:
+					x, y, group, name = match.groups()
+					layer.set_id(int(float(x)), int(float(y)), palette.intern((group, name)))
+				elif stream.peek() == '}':
+					stream.consume('}')
+					return
+				else:
+					x, y = map(float, stream.value().split(','))
+					stream.consume(':')
+					tile = stream.value()
+					layer.set_id(int(x), int(y), tile if type(tile) is int else palette.intern(tile))
+					if stream.peek() == ',':
+						stream.consume(',')
+			loaded += 1
+			if loaded % self.STEP == 0:
+				yield stream.progress
+	
+	def apply(self, key: str, value):
+		"""uses value of the key from the file (everything besides the grid)"""
+		match key:
+			case 'version':
+				self.version = value
+			case 'tile-size':
+				self.tile_size = value
+				self.dprint(f'{GREEN}[LOADED] > TILE SIZE ({self.tile_size}){RESET}')
+			case 'img':
+				self.sprite_sheet = value
+				self.dprint(f'{GREEN}[LOADED] > IMG ({self.sprite_sheet}){RESET}')
+			case 'data':
+				self.load_tiles(value)
+			case 'palette':
+				self.grid.palette.extend(value)
+				self.dprint(f'{GREEN}[LOADED] > PALETTE ({len(self.grid.palette)} tiles){RESET}')
+				return
+			case 'layer-names':
+				self.layer_names = list(value)
+		self.meta[key] = value
+	
+	def replay_journal(self):
+		"""applies the changes saved to the journal after the last full save"""
+		path = getattr(self.file, 'name', None)
+		if type(path) is not str or not os.path.exists(binary.journal_path(path)):
+			return
+		with open(binary.journal_path(path), 'rb') as file:
+			for meta, layers, chunks in binary.iter_journal(file, self.meta['journal']):
+				self.grid.palette.clear()
+				for key, value in meta.items():
+					self.apply(key, value)
+				binary.apply_journal_record(self.grid, layers, chunks)
+				self.journal_records += 1
+				self.journal_chunks += len(chunks)
+				yield self._progress
+		self.dprint(f'{GREEN}[LOADED] > JOURNAL ({self.journal_records} saves){RESET}')
+	
+	def steps(self):
+		stream = self.stream
+		if self.binary:
+			self.dprint(f'{YELLOW}[LOADING] > BINARY WORLD{RESET}')
+			meta = yield from binary.iter_read(self.file, self.grid)
+			self.dprint(f'{GREEN}[LOADED] > PALETTE ({len(self.grid.palette)} tiles){RESET}')
+			for key, value in meta.items():
+				self.apply(key, value)
+		else:
+			for key in stream.items():
+				if key == 'grid':
+					if stream.peek() == '{':  # ? 0.12, only one layer
+						yield from self.load_layer(self.grid.new_layer())
+					else:
+						for _ in stream.elements():
+							yield from self.load_layer(self.grid.new_layer())
+				else:
+					self.apply(key, stream.value())
+				yield stream.progress
+		if 'journal' in self.meta:
+			yield from self.replay_journal()
+		sizes = ", ".join(f"{size / 1024:.1f} KB" for size in self.grid.memory_usage())
+		self.dprint(f'{GREEN}[LOADED] > GRID ({sizes}){RESET}')
+		self.file.close()
+		
+		version = self.version if self.version is not None else "? 0.12"
+		if self.spec_version is not None:
+			self.dprint(f'{YELLOW}[LOADING] > {GREEN}SPECIFIED VERSION ({self.spec_version}){RESET}')
+			version = self.spec_version
+			suffix = ''
+		else:
+			suffix = '(UNSAFE MATCHING)'
+		if version not in self.VERSIONS:
+			self.dprint(f'{RED}[LOADING] > VERSION UNMATCHED{RESET}')
+			self.dprint(f'{RED}[LOADING] > RETURNING NOTHING{RESET}')
+			self.done = True
+			return
+		self.dprint(f'{YELLOW}[LOADING] > VERSION MATCHED: {version.lstrip("? ")} {suffix if version == "? 0.12" else ""}{RESET}')
+		if version == "? 0.12" or self.tile_size is None:
+			self.tile_size = [32, 32]
+		if self.tiles is None:
+			self.tiles = {}
+		if self.layer_names is None or version == "? 0.12":
+			self.layer_names = [f'layer {layer+1}' for layer in range(len(self.grid))]
+		self.dprint(f'{GREEN}[LOADED] > LAYER NAMES{RESET}')
+		self.dprint(f'{YELLOW}==[{GREEN}LOADING SUCCESSFUL{YELLOW}]=={RESET}')
+		self.result = self.tile_size, self.sprite_sheet, self.tiles, self.grid, self.layer_names
+		self.done = True
 
 
 def load(path: Union[str, object], spec_version=None, print_out: bool=True) -> Union[tuple[list[int, int], str, TILES, GRID, list], None]:
@@ -36,75 +247,62 @@ def load(path: Union[str, object], spec_version=None, print_out: bool=True) -> U
 	:param spec_version: specify version, if None then it will automatically match.
 	:returns: tile size, sprite sheet path, tiles, grid, layer names
 	"""
-	def dprint(text):
-		if print_out:
-			print(text)
-	dprint(f'{YELLOW}[LOADING] > {GREEN}STARTED{RESET}')
-	if type(path) is str:
-		dprint(f'{YELLOW}[LOADING] > OPENING A FILE ({path}){RESET}')
-		path = open(path, 'rb')
-		dprint(f'{YELLOW}[LOADING] > OPENED A FILE{RESET}')
-	else:
-		dprint(f'{YELLOW}[LOADING] > FILE ALREADY OPENED{RESET}')
-	
-	def load_v0_12():
-		sprite_sheet: str = data['img']
-		tiles: dict[str, PureTileGroup] = {'all': PureTileGroup('all', {tile: tuple(map(int, pos.lstrip('(').rstrip(')').split(',')))
-		                                      for pos, tile in data['data'].items()})}
-		grid: GRID = \
-			[
-				{tuple(map(int, pos.split(','))): list(tile) for pos, tile in data['grid'].items()}
-			]
-		tile_size: list[int, int] = [32, 32]
-		layer_names = [f'layer {layer+1}' for layer in range(len(grid))]
-		return tile_size, sprite_sheet, tiles, grid, layer_names
-	
-	def load_v1_00():
-		tile_size: list[int, int] = data['tile-size']
-		dprint(f'{GREEN}[LOADED] > TILE SIZE ({tile_size}){RESET}')
-		tiles: dict[str, PureTileGroup] = \
-			{
-				name: PureTileGroup(name, {tile: pos for tile, pos in tile_group['tiles'].items()}, tile_group['pos'])
-				for name, tile_group in data['data'].items()
-			}
-		dprint(f'{GREEN}[LOADED] > TILES{RESET}')
-		grid: GRID = \
-			[
-				{tuple(map(int, map(float, pos.split(',')))): list(tile) for pos, tile in layer.items()}
-				for layer in data['grid']
-				]
-		dprint(f'{GREEN}[LOADED] > GRID{RESET}')
-		sprite_sheet: str = data['img']
-		dprint(f'{GREEN}[LOADED] > IMG ({sprite_sheet}){RESET}')
-		layer_names = [layer for layer in data['layer-names']]
-		dprint(f'{GREEN}[LOADED] > LAYER NAMES{RESET}')
-		dprint(f'{YELLOW}==[{GREEN}LOADING SUCCESSFUL{YELLOW}]=={RESET}')
-		return tile_size, sprite_sheet, tiles, grid, layer_names
-	
-	data = json.load(path)
-	if "version" not in data:
-		version = "? 0.12"
-	else:
-		version = data['version']
-	
-	if spec_version is not None:
-		dprint(f'{YELLOW}[LOADING] > {GREEN}SPECIFIED VERSION ({spec_version}){RESET}')
-		version = spec_version
-		suffix = ''
+	return WorldLoader(path, spec_version, print_out).load()
+
+
+def dumps(meta: dict, grid: GRID) -> str:
+	"""
+	:param meta: json friendly data of the world besides the grid and the palette (tile size, img, ...)
+	:returns: world as json text (version 1.1.0)
+	"""
+	return json.dumps(
+		{
+			**meta,
+			'version': __version__,
+			'palette': grid.palette.to_list(),
+			'grid': [{f"{x},{y}": tile_id for x, y, tile_id in layer.iter_ids()} for layer in grid]
+		},
+		separators=(',', ':')
+	)
+
+
+def convert(source: str, destination: str, compression: str | None = 'zlib', print_out: bool = True):
+	"""
+	converts world to the binary format (or back to json), the journal of the world is merged into it
+	:param source: path to a world in any version
+	:param destination: path of the new world
+	:param compression: 'zlib', 'lzma' or 'none' for the binary format, 'json' to save it as json
+	"""
+	loader = WorldLoader(source, print_out=print_out)
+	if loader.load() is None:
+		raise ValueError(f'can\'t convert {source}, unknown version')
+	meta = {key: value for key, value in loader.meta.items() if key not in ('version', 'journal')}
+	meta['tile-size'] = loader.tile_size
+	meta['layer-names'] = loader.layer_names
+	if loader.version is None:  # ? 0.12
+		meta['data'] = {
+			name: {'tiles': tile_group.tiles, 'pos': list(tile_group.pos), '_draw_matrix': False, '_matrix': {}, 'blob': {}}
+			for name, tile_group in loader.tiles.items()
+		}
+	if compression == 'json':
+		with open(destination, 'w') as file:
+			file.write(dumps(meta, loader.grid))
 	else:
-		suffix = '(UNSAFE MATCHING)'
-		
-	match version:
-		case "? 0.12":
-			dprint(f'{YELLOW}[LOADING] > VERSION MATCHED: 0.12 {suffix}{RESET}')
-			return load_v0_12()
-		case "1.0.0":
-			dprint(f'{YELLOW}[LOADING] > VERSION MATCHED: 1.0.0{RESET}')
-			return load_v1_00()
-		case _:
-			dprint(f'{RED}[LOADING] > VERSION UNMATCHED{RESET}')
-			dprint(f'{RED}[LOADING] > RETURNING NOTHING{RESET}')
-			return None
+		with open(destination, 'wb') as file:
+			binary.write(file, meta, loader.grid, compression)
+	if print_out:
+		print(f'{GREEN}[CONVERTED] > {source} -> {destination}{RESET}')
+
+
+def file_dialog():
+	""":return: tkinter.filedialog, tkinter and its hidden root window are started by the first dialog, not on import"""
+	global _tk_root
+	from tkinter import filedialog
+	if _tk_root is None:
+		import tkinter
+		_tk_root = tkinter.Tk()
+		_tk_root.withdraw()
+	return filedialog
 
 
 def draw_rect(surf, color, rect, width=0, *args):
@@ -187,6 +385,8 @@ class Bindings:
 		self.RECT = Key(*bindings['RECT'])
 		self.AUTOTILE_RECT = Key(*bindings['AUTOTILE-RECT'])
 		self.BRUSH = Key(*bindings['BRUSH'])
+		self.AUTOTILE_BRUSH = Key(*bindings['AUTOTILE-BRUSH'])
+		self.BLOB_TILE = Key(*bindings['BLOB-TILE'])
 		self.MATRIX_TOP_RIGHT = Key(*bindings['MATRIX-TOP-RIGHT'])
 		self.MATRIX_TOP_MID = Key(*bindings['MATRIX-TOP-MID'])
 		self.MATRIX_TOP_LEFT = Key(*bindings['MATRIX-TOP-LEFT'])
@@ -203,6 +403,138 @@ class Bindings:
 		self.TOGGLE_TILE_MODE = Key(*bindings['TOGGLE-TILE-MODE'])
 		self.EDIT_TILE = Key(*bindings['EDIT-TILE'])
 		self.EXPORT_TILE = Key(*bindings['TILE-EXPORT'])
+		self.EXPORT_ATLAS = Key(*bindings['ATLAS-EXPORT'])
+		self.UNDO = Key(*bindings['UNDO'])
+		self.REDO = Key(*bindings['REDO'])
+		"""====[ DISPATCH ]===="""
+		self.version = 0  # changes with every rebind, key tables compile again after it
+		self.mod_mask = self.used_mods()
+	
+	def used_mods(self) -> int:
+		""":return: every modifier that is used by a binding, other modifiers never change if a key matches"""
+		mask = KMOD_NONE
+		for key in vars(self).values():
+			if isinstance(key, Key):
+				for mod in key.mod:
+					mask |= mod
+		return mask
+	
+	def rebind(self, action: str, keycode: str, mods: str):
+		"""
+		changes the key of the action at runtime
+		:param action: name of the binding (like 'UNDO')
+		"""
+		if not isinstance(getattr(self, action, None), Key):
+			raise KeyError(f'unknown binding: {action}')
+		setattr(self, action, Key(keycode, mods))
+		self.mod_mask = self.used_mods()
+		self.version += 1
+
+
+class KeyTable:
+	
+	def __init__(self, bindings: Bindings, *chains: Sequence[tuple[str | Key, Callable[[], None]]]):
+		"""
+		key bindings compiled to callbacks, looked up by (key, modifiers used by the bindings),
+		every chain works like an if / elif chain: only the first matching key of it is called
+		:param chains: (name of the binding or a Key, callback) in the order they are checked
+		"""
+		self.bindings = bindings
+		self.chains = chains
+		self.mod_mask = KMOD_NONE
+		self.version = None
+		self.table: dict[tuple[int, int], tuple[Callable[[], None], ...]] = {}
+	
+	def compile(self, event) -> tuple[Callable[[], None], ...]:
+		""":return: callbacks for the key of the event, one for every chain with a matching key"""
+		callbacks = []
+		for chain in self.chains:
+			for key, callback in chain:
+				if isinstance(key, str):
+					key = getattr(self.bindings, key)
+				if key == event:
+					callbacks.append(callback)
+					break
+		return tuple(callbacks)
+	
+	def dispatch(self, event) -> bool:
+		"""
+		calls the callbacks of the KEYDOWN / KEYUP event, the callbacks of a key are found only once
+		:return: False if no key matched
+		"""
+		if self.version != self.bindings.version:
+			self.version = self.bindings.version
+			self.table.clear()
+			self.mod_mask = self.bindings.mod_mask
+			for chain in self.chains:
+				for key, _ in chain:
+					if isinstance(key, Key):
+						for mod in key.mod:
+							self.mod_mask |= mod
+		state = (event.key, event.mod & self.mod_mask)
+		callbacks = self.table.get(state)
+		if callbacks is None:
+			callbacks = self.table[state] = self.compile(event)
+		for callback in callbacks:
+			callback()
+		return bool(callbacks)
+
+
+class HitIndex:
+	
+	CELL = 128  # pixels, size of the buckets the panels are sorted into
+	
+	def __init__(self, panels: Iterable[tuple[pg.Rect, object]]):
+		""":param panels: rects of the ui with the object they belong to, later ones are on top"""
+		self.buckets: dict[tuple[int, int], list[tuple[pg.Rect, object]]] = {}
+		cell = self.CELL
+		for rect, owner in panels:
+			if not rect.w or not rect.h:
+				continue
+			for x in range(rect.left // cell, (rect.right - 1) // cell + 1):
+				for y in range(rect.top // cell, (rect.bottom - 1) // cell + 1):
+					self.buckets.setdefault((x, y), []).append((rect, owner))
+	
+	def hits(self, pos) -> tuple:
+		""":return: objects with a panel at pos, top most first"""
+		bucket = self.buckets.get((int(pos[0]) // self.CELL, int(pos[1]) // self.CELL))
+		if not bucket:
+			return ()
+		return tuple(dict.fromkeys(owner for rect, owner in reversed(bucket) if rect.collidepoint(pos)))
+
+
+class Input:
+	
+	def __init__(self, events=(), panels: Callable[[], Iterable[tuple[pg.Rect, object]]] = tuple):
+		"""
+		snapshot of the input of one frame, handlers read the mouse from it instead of asking pygame
+		:param panels: returns the ui panels to hit-test against, they are indexed on the first hit-test of the frame
+		"""
+		self.events = events
+		self.mouse_pos: tuple[int, int] = pg.mouse.get_pos()
+		self.mouse_buttons: tuple[bool, ...] = pg.mouse.get_pressed()
+		self.panels = panels
+		self.index: HitIndex | None = None
+		self.tested: dict[tuple[int, int], tuple] = {}
+	
+	def hits(self, pos=None) -> tuple:
+		""":return: objects with a panel at pos (the mouse if None), top most first, every position is tested once"""
+		pos = self.mouse_pos if pos is None else (int(pos[0]), int(pos[1]))
+		hits = self.tested.get(pos)
+		if hits is None:
+			if self.index is None:
+				self.index = HitIndex(self.panels())
+			hits = self.tested[pos] = self.index.hits(pos)
+		return hits
+	
+	def over(self, pos=None, kind: type = object) -> bool:
+		""":return: True if there is a panel of the kind at pos (the mouse if None)"""
+		return any(isinstance(owner, kind) for owner in self.hits(pos))
+	
+	def panels_changed(self):
+		"""has to be called when a panel moves, appears or disappears, the next hit-test indexes the panels again"""
+		self.index = None
+		self.tested.clear()
 
 
 class Options:
@@ -221,8 +553,19 @@ class Options:
 				self.FPS = pg.display.get_current_refresh_rate()
 			if self.FPS <= 0:
 				self.FPS = 120
+			self.IDLE_FPS = min(self.options['IDLE-FPS'], self.FPS)
+			self.TEXTURE_CACHE_SIZE = self.options['TEXTURE-CACHE-SIZE']
+			self.TEXT_CACHE_SIZE = self.options['TEXT-CACHE-SIZE']
+			self.CHUNK_CACHE_SIZE = self.options['CHUNK-CACHE-SIZE']
+			self.HISTORY_SIZE = self.options['HISTORY-SIZE']
 			self.TOP_OFFSET = self.options['TOP-OFFSET']
 			self.SIDEBAR_SCROLL_SPEED = self.options['SIDEBAR-SCROLL-SPEED']
+			"""====[ SAVING ]===="""
+			self.SAVE_FORMAT = self.options['SAVE-FORMAT']
+			self.SAVE_COMPRESSION = self.options['SAVE-COMPRESSION']
+			self.AUTOSAVE_INTERVAL = self.options['AUTOSAVE-INTERVAL']
+			self.JOURNAL = self.options['JOURNAL']
+			self.JOURNAL_COMPACT_AFTER = self.options['JOURNAL-COMPACT-AFTER']
 
 
 class Themes:
@@ -234,6 +577,8 @@ class Themes:
 
 class Main:
 	
+	CAPTION_INTERVAL = 1  # seconds between measuring the memory of the current layer for the caption
+	
 	def __init__(self):
 		""""""
 		"""====[ WINDOW ]===="""
@@ -241,28 +586,72 @@ class Main:
 		self.display = pg.display.set_mode(self.win, RESIZABLE)
 		self.clock = pg.Clock()
 		self.events = ()
-		self.work_path = os.path.dirname(os.path.abspath(__file__)) + '\\'
-		self.Options = Options(self.work_path + 'options.toml')
+		self.input = Input()
+		self.work_path = os.path.dirname(os.path.abspath(__file__))
+		self.Options = Options(os.path.join(self.work_path, 'options.toml'))
 		self.Bindings = Bindings(self.Options.options)
+		self.keys = KeyTable(self.Bindings, [
+			('EXIT', self.exit),
+			('TOGGLE_FULLSCREEN', pg.display.toggle_fullscreen),
+			('PROJECT_SELECTION_LEFT', self.previous_project),
+			('PROJECT_SELECTION_RIGHT', self.next_project),
+		])
 		"""====[ COLOR SCHEME ]===="""
 		self.colors = Themes(self.Options.options)
 		"""====[ ICONS ]===="""
-		icon_sheet = pg.image.load(self.work_path + 'assets/icon-sheet.png').convert_alpha()
+		icon_sheet = pg.image.load(os.path.join(self.work_path, 'assets', 'icon-sheet.png')).convert_alpha()
 		self.hide_ico = pg.transform.scale(icon_sheet.subsurface((0, 0, 16, 16)), (32, 32))
 		self.show_ico = pg.transform.scale(icon_sheet.subsurface((16, 0, 16, 16)), (32, 32))
 		self.close_ico = pg.transform.scale(icon_sheet.subsurface((32, 0, 16, 16)), (32, 32))
 		"""====[ PROJECTS ]===="""
 		self.Header = pg.font.SysFont(self.Options.HEADER_FONT, 50, True, False)
 		self.SmallerHeader = pg.font.SysFont(self.Options.HEADER_FONT, 30, False, False)
+		self.text_cache = TextCache(self.Options.TEXT_CACHE_SIZE * 1024 * 1024)
 		self.path = pg.system.get_pref_path('NotMEE12', 'WorldD')
-		if not os.path.exists(self.path + '\\recent.txt'):
+		if not os.path.exists(os.path.join(self.path, 'recent.txt')):
 			self.recent = []
 		else:
-			with open(self.path + '\\recent.txt') as recent:
+			with open(os.path.join(self.path, 'recent.txt')) as recent:
 				self.recent = list(recent.read().split('\n'))
 		self.projects: list[Project | Welcome] = [Welcome(self)]
 		self.popups = []
 		self.selected = 0
+		"""====[ SAVING ]===="""
+		self.saver = Saver()
+		self.next_autosave = time.monotonic() + self.Options.AUTOSAVE_INTERVAL
+		"""====[ CAPTION ]===="""
+		self.caption_layer: Layer | None = None
+		self.caption_usage = 0
+		self.next_caption = 0.0
+		"""====[ DAMAGE ]===="""
+		self.full_redraw = True
+		self.damage: list[pg.Rect] = []
+	
+	def invalidate(self, *rects):
+		"""marks areas of the window that have to be redrawn, everything is redrawn if no area is given"""
+		if rects:
+			self.damage.extend(pg.Rect(rect) for rect in rects)
+		else:
+			self.full_redraw = True
+	
+	def present(self) -> bool:
+		"""
+		redraws only the damaged areas and pushes them to the window
+		:return: False if nothing had to be redrawn
+		"""
+		if self.full_redraw:
+			self.refresh()
+			pg.display.flip()
+		elif self.damage:
+			self.display.set_clip(self.damage[0].unionall(self.damage[1:]))
+			self.refresh()
+			self.display.set_clip(None)
+			pg.display.update(self.damage)
+		else:
+			return False
+		self.full_redraw = False
+		self.damage = []
+		return True
 	
 	def refresh(self):
 		self.display.fill(self.colors.Project['background'])
@@ -272,21 +661,23 @@ class Main:
 		pg.draw.rect(self.display, self.colors.Welcome['top-bar-background'],
 					 (0, 0, self.display.get_width(), self.Options.TOP_OFFSET))
 		selected_project = self.projects[self.selected]
-		main_project = self.Header.render('< ' + (selected_project.path.split('/')[-1] if selected_project is not None else '') + ' > ', True,
-		                                  self.colors.Welcome['top-bar-text-color'])
+		main_project = self.text_cache.render(
+			self.Header, '< ' + (selected_project.path.split('/')[-1] if selected_project is not None else '') + ' > ', True,
+			self.colors.Welcome['top-bar-text-color']
+		)
 		main_pos = ((self.display.get_width() - main_project.get_width()) / 2,
 		            (self.Options.TOP_OFFSET - main_project.get_height()) / 2)
 		self.display.blit(main_project, main_pos)
 		if self.selected > 0:
 			for en, project in enumerate(self.projects[:self.selected]):
-				name = self.SmallerHeader.render(project.path.split('/')[-1], True, (200, 200, 200))
+				name = self.text_cache.render(self.SmallerHeader, project.path.split('/')[-1], True, (200, 200, 200))
 				pos = (main_pos[0] - sum(
 					self.SmallerHeader.size(' ' + p.path.split('/')[-1] + ' ')[0] for p in self.projects[:en + 1]),
 				       (self.Options.TOP_OFFSET - name.get_height()) / 2)
 				self.display.blit(name, pos)
 		if self.selected < len(self.projects) - 1:
 			for en, project in enumerate(self.projects[self.selected + 1:]):
-				name = self.SmallerHeader.render(project.path.split('/')[-1], True, (200, 200, 200))
+				name = self.text_cache.render(self.SmallerHeader, project.path.split('/')[-1], True, (200, 200, 200))
 				pos = (main_pos[0] + main_project.get_width() + sum(
 					self.SmallerHeader.size(' ' + p.path.split('/')[-1] + ' ')[0] for p in
 					self.projects[self.selected + 1:en - 1]), (self.Options.TOP_OFFSET - name.get_height()) / 2)
@@ -306,10 +697,21 @@ class Main:
 			pg.draw.line(self.display, (180, 180, 180), (self.display.get_width() - 20, 20),
 			             (self.display.get_width() - 5, 5), 5)
 	
+	def previous_project(self):
+		print(YELLOW + '[PROJECT-SELECTION] > LEFT {%s}' % self.selected + RESET)
+		self.selected -= 1
+		self.selected = pg.math.clamp(self.selected, 0, len(self.projects) - 1)
+	
+	def next_project(self):
+		self.selected += 1
+		self.selected = pg.math.clamp(self.selected, 0, len(self.projects) - 1)
+		print(YELLOW + '[PROJECT-SELECTION] > RIGHT {%s}' % self.selected + RESET)
+	
 	def exit(self):
 		for project in self.projects:
 			project.save()
-		with open(self.path + '\\recent.txt', 'a') as recent:
+		self.saver.wait()
+		with open(os.path.join(self.path, 'recent.txt'), 'a') as recent:
 			recent.truncate(0)
 			recent.writelines('\n'.join(self.recent))
 		pg.quit()
@@ -317,7 +719,16 @@ class Main:
 	
 	def eventHandler(self):
 		self.events = pg.event.get()
+		self.input = Input(self.events, self.projects[self.selected].panels)
 		for event in self.events:
+			if event.type == MOUSEMOTION and not self.popups:
+				rects = self.projects[self.selected].damage(event)
+				if rects is None:
+					self.invalidate()
+				elif rects:
+					self.invalidate(*rects)
+			else:
+				self.invalidate()
 			if event.type == QUIT:
 				self.exit()
 			elif event.type == DROPFILE:
@@ -331,18 +742,7 @@ class Main:
 							event.pos) and self.Options.SHOW_EXIT:
 						self.exit()
 			elif event.type == KEYDOWN:
-				if event == self.Bindings.EXIT:
-					self.exit()
-				elif event == self.Bindings.TOGGLE_FULLSCREEN:
-					pg.display.toggle_fullscreen()
-				elif event == self.Bindings.PROJECT_SELECTION_LEFT:
-					print(YELLOW + '[PROJECT-SELECTION] > LEFT {%s}' % self.selected + RESET)
-					self.selected -= 1
-					self.selected = pg.math.clamp(self.selected, 0, len(self.projects) - 1)
-				elif event == self.Bindings.PROJECT_SELECTION_RIGHT:
-					self.selected += 1
-					self.selected = pg.math.clamp(self.selected, 0, len(self.projects) - 1)
-					print(YELLOW + '[PROJECT-SELECTION] > RIGHT {%s}' % self.selected + RESET)
+				self.keys.dispatch(event)
 		if not self.popups:
 			self.projects[self.selected].eventHandler()
 		else:
@@ -351,22 +751,42 @@ class Main:
 		
 	def run(self):
 		while True:
-			self.refresh()
-			pg.display.flip()
-			self.clock.tick(self.Options.FPS)
+			if self.present():
+				self.clock.tick(self.Options.FPS)
+			else:
+				self.clock.tick(self.Options.IDLE_FPS)
 			if self.eventHandler():
 				return 1
+			for project in self.projects:
+				project.update()
+			if self.Options.AUTOSAVE_INTERVAL > 0 and time.monotonic() >= self.next_autosave:
+				self.next_autosave = time.monotonic() + self.Options.AUTOSAVE_INTERVAL
+				for project in self.projects:
+					project.autosave()
 			project = self.projects[self.selected]
-			if project.path != 'Welcome':
-				tiles = f'{len(project.grid[project.current_layer].keys())} tiles | '
-			else:
-				tiles = ''
-			path = project.path
-			pg.display.set_caption(f'{path} - WorldD | {tiles}{self.clock.get_fps():.2f} FPS')
+			pg.display.set_caption(f'{project.path} - WorldD | {self.layer_stats(project)}{self.clock.get_fps():.2f} FPS')
+	
+	def layer_stats(self, project: 'Project | Welcome') -> str:
+		"""
+		memory_usage visits every chunk, so it's measured again only after CAPTION_INTERVAL or when the layer changes
+		:return: tiles and memory of the current layer for the caption
+		"""
+		if project.path == 'Welcome' or project.current_layer >= len(project.grid):
+			return ''
+		layer = project.grid[project.current_layer]
+		now = time.monotonic()
+		if layer is not self.caption_layer or now >= self.next_caption:
+			self.caption_layer = layer
+			self.caption_usage = layer.memory_usage()
+			self.next_caption = now + self.CAPTION_INTERVAL
+		return f'{len(layer)} tiles ({self.caption_usage / 1024:.1f} KB) | '
 
 
 class Project:
 	
+	LOAD_BUDGET = 1 / 120  # seconds spent loading the world every frame
+	PREWARM_BUDGET = 1 / 500  # seconds spent scaling tiles for the next zoom levels every frame
+	
 	def __init__(self, main: Main, tile_size, load: str | bool = False):
 		"""creates new project"""
 		
@@ -390,27 +810,84 @@ class Project:
 														  True, (250, 250, 250))
 		self.header.set_underline(False)
 		self.sprite_sheet = None
+		self.chunk_cache = ChunkCache(self, self.main.Options.CHUNK_CACHE_SIZE * 1024 * 1024)
+		self.tile_cache = TextureCache(self.main.Options.TEXTURE_CACHE_SIZE * 1024 * 1024)
+		self.prewarm: Iterator[tuple[tuple, tuple]] | None = None
+		self.prewarm_state = None
+		self.history = History(self, self.main.Options.HISTORY_SIZE * 1024 * 1024)
+		self.grid_lines: tuple[tuple, pg.Surface, pg.Surface] | None = None
 		
 		"""====[ TOOLS ]===="""
 		self.tool = 'brush'
 		self.rect = [False, pg.Rect(0, 0, 0, 0)]
+		self.stroke: list[tuple[int, int] | None] = []  # blocks the brush went over this frame, None breaks the line
+		self.stroke_end: tuple[int, int] | None = None  # last painted block of the stroke
+		
+		"""====[ KEYS ]===="""
+		bindings = self.main.Bindings
+		self.rename_keys = KeyTable(bindings, [
+			('CANCEL_SELECTION', self.stop_renaming),
+			('SELECTION_ACCEPT', self.stop_renaming),
+			(Key('backspace', ''), self.erase_layer_name),
+		])
+		# only outside of the tile mode
+		self.map_keys = KeyTable(
+			bindings,
+			[('RESET_TILE', self.reset_tile)],
+			[('RECT', partial(self.select_tool, 'rect'))],
+			[('AUTOTILE_RECT', partial(self.select_tool, 'autotile-rect'))],
+			[
+				('BRUSH', partial(self.select_tool, 'brush')),
+				('NEW_LAYER', self.new_layer),
+				('PREVIOUS_LAYER', self.previous_layer),
+				('DELETE_LAYER', self.delete_layer),
+				('RENAME_LAYER', self.rename_layer),
+			],
+			[('AUTOTILE_BRUSH', partial(self.select_tool, 'autotile-brush'))],
+			[('BLOB_TILE', self.assign_blob_tile)],
+		)
+		self.keys = KeyTable(
+			bindings,
+			[
+				('SCALE_TILE_UP', self.scale_tile_up),
+				('SCALE_TILE_DOWN', self.scale_tile_down),
+				('TILE_LOOKUP_REMOVAL', self.remove_selected_tile),
+			],
+			[
+				('SAVE_AS', self.save_as),
+				('SAVE', self.quick_save),
+				('LOAD', self.load_dialog),
+				('EXPORT_ATLAS', self.export_atlas),
+				('UNDO', self.undo),
+				('REDO', self.redo),
+				('TOGGLE_TILE_MODE', self.toggle_tile_mode),
+			],
+		)
 		
 		"""====[ CONFIG ]===="""
 		self.renaming = False
 		self.tiles: dict[str, TileGroup] = {'all': TileGroup(self, 'all', {})}
-		self.grid = [{}]
+		self.grid: GRID = Grid([{}])
 		self.current_layer = 0
 		self.layer_names = ['Layer 0']
 		self.layers_vis = Layers(self.display, self)
 		self.destination = None
+		self.loader: WorldLoader | None = None
+		self.saved_revision = None
+		self.journal: Journal | None = None
+		self.loaded_format: str | None = None  # 'binary' or 'json' if the world was loaded from a file
 		self.path = None
 		self.tile_size = pg.Vector2(tile_size)
+		self._selected_tile = None
+		self.zoom = 1
+		self.bold = pg.Vector2(self.offset[0] * self.zoom - self.tile_size[0] + self.sidebar.right,
+		                       self.offset[1] * self.zoom - self.tile_size[1])
 		new_project = load is False
 		load_project = load is True
 		recent_project = load is not bool
 		if new_project:
 			filetypes = [('image', '*.png'), ('image', '*.jpg')]
-			file = filedialog.askopenfile(filetypes=filetypes)
+			file = file_dialog().askopenfile(filetypes=filetypes)
 			if file is None:
 				raise IOError
 			self.path = file.name
@@ -418,7 +895,7 @@ class Project:
 			file.close()
 		elif load_project:
 			filetypes = [('world', '*.world')]
-			file = filedialog.askopenfile(filetypes=filetypes)
+			file = file_dialog().askopenfile(filetypes=filetypes)
 			if file is None:
 				raise IOError
 			else:
@@ -433,8 +910,6 @@ class Project:
 			else:
 				self.path = file.name
 				self.load(file.name)
-		self._selected_tile = None
-		self.zoom = 1
 		self.tile_mode_enabled = False
 		self.scroll = 0
 		self.last_y = 0
@@ -449,63 +924,202 @@ class Project:
 		"""====[ CACHED ]===="""
 		self.bold = pg.Vector2(self.offset[0] * self.zoom - self.tile_size[0] + self.sidebar.right,
 		                       self.offset[1] * self.zoom - self.tile_size[1])
-		self.tile_cache = {}
 	
 	def load(self, path=None):
+		"""starts loading the world, the rest is loaded by update() while the map is already shown"""
 		if path is not None:
 			self.path = path
 		if self.destination is None:
 			if self.path is None:
-				self.destination = filedialog.askopenfile('r', defaultextension='.world')
+				self.destination = file_dialog().askopenfile('rb', defaultextension='.world')
 				self.path = self.destination.name
 			else:
-				self.destination = open(self.path)
-		tile_size, sp_sheet, pure_tile_groups, self.grid, self.layer_names = load(self.destination)
-		self.tile_size = pg.Vector2(tuple(tile_size))
-		self.sprite_sheet = self.SpriteSheet(sp_sheet, self.display, self)
+				self.destination = open(self.path, 'rb')
+		self.history.clear()
+		self.loader = WorldLoader(self.destination)
+		self.loaded_format = 'binary' if self.loader.binary else 'json'
+		self.grid = self.loader.grid
+		self.layer_names = []
+		self.sprite_sheet = None
+		self.tiles = {}
+		self.chunk_cache.invalidate()
+		self.update()
+	
+	def update(self):
+		"""
+		loads a part of the world (for at most LOAD_BUDGET seconds) if the world is still loading,
+		otherwise prepares textures of the neighbouring zoom levels
+		"""
+		if self.loader is None:
+			self.prewarm_textures()
+			return
+		end = time.perf_counter() + self.LOAD_BUDGET
+		for _ in self.loader:
+			if time.perf_counter() > end:
+				break
+		self.apply_loaded()
+		self.main.invalidate()
+	
+	def prewarm_textures(self):
+		"""scales tiles for the zoom levels one scroll away, a part every frame (at most PREWARM_BUDGET seconds)"""
+		if self.sprite_sheet is None:
+			return
+		state = (tuple(self.tile_size), self.zoom, len(self.palette), self.sprite_sheet.img)
+		if state != self.prewarm_state:
+			self.prewarm_state = state
+			self.prewarm = self.prewarm_keys()
+		if self.prewarm is not None and self.tile_cache.prewarm(self.sprite_sheet, self.prewarm, self.PREWARM_BUDGET):
+			self.prewarm = None
+	
+	def prewarm_keys(self) -> Iterator[tuple[tuple, tuple]]:
+		""":return: iterator of (rect, size) for every tile of the grid at the neighbouring zoom levels"""
+		step = self.main.Options.SCROLL_SENSITIVITY
+		tiles = [self.tiles[group][name] for group, name in list(self.palette.ids) if group in self.tiles and name in self.tiles[group]]
+		for zoom in (self.zoom + step, self.zoom - step):
+			if zoom != pg.math.clamp(zoom, 0.25, 15):
+				continue
+			size = (self.tile_size.x * zoom, self.tile_size.y * zoom)
+			for rect in tiles:
+				yield tuple(rect), size
+	
+	def finish_loading(self):
+		if self.loader is not None:
+			self.loader.load()
+			self.apply_loaded()
+	
+	def apply_loaded(self):
+		"""uses everything that the loader already has"""
+		loader = self.loader
+		while len(self.layer_names) < len(self.grid):
+			self.layer_names.append(f'layer {len(self.layer_names) + 1}')
+		if self.sprite_sheet is None and (loader.done or None not in (loader.tile_size, loader.sprite_sheet, loader.tiles)):
+			if loader.done and loader.result is None:
+				print(f'{RED}[LOAD] > FAILED ({self.path}){RESET}')
+				self.loader = None
+				self.destination = None
+				return
+			self.apply_header()
+		if loader.done:
+			if loader.journal_records:
+				# the journal can change the tile lookup and the sprite sheet after they were shown
+				self.apply_header()
+			self.layer_names = loader.layer_names
+			if 'journal' in loader.meta:
+				self.journal = Journal(self.path, loader.meta['journal'], self.grid, loader.journal_records, loader.journal_chunks)
+			for tile in list(self.palette.ids):
+				if tile[0] not in self.tiles or tile[1] not in self.tiles[tile[0]]:
+					self.grid.remove_tile(tile)
+			self.loader = None
+			self.destination = None
+			self.saved_revision = (self.grid.revision, copy.deepcopy(self.meta))
+	
+	def find_sprite_sheet(self, path: str) -> str:
+		""":return: path of the sprite sheet, worlds moved to another place (or machine) use the image next to them"""
+		if os.path.exists(path) or self.path is None:
+			return path
+		moved = os.path.join(os.path.dirname(os.path.abspath(self.path)), os.path.basename(path))
+		return moved if os.path.exists(moved) else path
+	
+	def apply_header(self):
+		"""uses tile size, sprite sheet and tiles of the loader"""
+		loader = self.loader
+		self.tile_size = pg.Vector2(tuple(loader.tile_size))
+		self.sprite_sheet = self.SpriteSheet(self.find_sprite_sheet(loader.sprite_sheet), self.display, self)
 		self.tiles = {}
 		y = 0
-		for name, pure_tile_group in pure_tile_groups.items():
+		for name, pure_tile_group in loader.tiles.items():
 			tile_group = TileGroup(self, name, pure_tile_group.tiles, (0, y))
+			tile_group.blob = dict(pure_tile_group.blob)
 			self.tiles[name] = tile_group
 			y += tile_group.size[2]
 		self.last_y = y
-		# self.tiles = {name: TileGroup(self, name, tile_group.tiles, tile_group.pos) }
-		self.destination.close()
-		self.destination = None
+		self.bold = pg.Vector2(self.offset[0] * self.zoom - self.tile_size[0] + self.sidebar.right,
+		                       self.offset[1] * self.zoom - self.tile_size[1])
+		self.chunk_cache.invalidate()
+		self.tile_cache.clear()
+	
+	@property
+	def meta(self) -> dict:
+		"""everything that is saved besides the grid and the palette"""
+		return {
+			'tile-size': list(self.tile_size),
+			'img': self.sprite_sheet.path,
+			'data': {name: tile_group.data for name, tile_group in self.tiles.items()},
+			'layer-names': self.layer_names,
+			'current-layer': self.current_layer
+		}
 	
 	def save(self):
-		if self.destination is None:
-			if self.path is None or self.path[-4:] == '.png':
-				self.destination = filedialog.asksaveasfile(
-					'a+',
-					defaultextension='.world',
-					title='Save world as: '
-				)
-				if self.destination is not None:
-					self.path = self.destination.name
-			else:
-				self.destination = open(self.path, 'a+')
-		if self.path is not None and self.path[-4:] != '.png':
-			save_data = json.dumps(
-				{
-					'grid':  [{f"{pos[0]},{pos[1]}": tile for pos, tile in layer.items()} for layer in self.grid],
-					'current-layer': self.current_layer,
-					'layer-names': self.layer_names,
-					'data': {name: tile_group.data for name, tile_group in self.tiles.items()},
-					'img': self.sprite_sheet.path,
-					'tile-size': list(self.tile_size),
-					'version': __version__
-				},
+		self.finish_loading()
+		if self.path is None or self.path[-4:] == '.png':
+			destination = file_dialog().asksaveasfile(
+				'a+',
+				defaultextension='.world',
+				title='Save world as: '
 			)
-			self.destination.seek(0)
-			self.destination.truncate(0)
-			self.destination.write(save_data)
-			self.destination.close()
-			self.destination = None
-			if self.path not in self.main.recent:
-				self.main.recent.append(self.path)
-    
+			if destination is None:
+				return
+			self.path = destination.name
+			destination.close()
+		self.write()
+		if self.path not in self.main.recent:
+			self.main.recent.append(self.path)
+	
+	@property
+	def save_format(self) -> str:
+		""":return: 'binary' or 'json', with SAVE-FORMAT = 'keep' worlds stay in the format they were loaded in"""
+		save_format = self.main.Options.SAVE_FORMAT
+		if save_format == 'keep':
+			return self.loaded_format if self.loaded_format is not None else 'binary'
+		return save_format
+	
+	def write(self):
+		"""
+		hands the world to the saver, the file is written in the background.
+		only the changes since the last save are appended to the journal, until it's time to compact it into a full save
+		(or until writing the world failed, the journal can't be trusted after that).
+		json worlds are always saved whole, so other tools reading them never see an outdated world
+		"""
+		options = self.main.Options
+		meta = copy.deepcopy(self.meta)
+		revision = self.grid.revision
+		save_format = self.save_format
+		journal = self.journal
+		if (
+				options.JOURNAL and save_format == 'binary' and journal is not None and journal.path == self.path
+				and not self.main.saver.failed_saving(self.path)
+		):
+			if self.saved_revision == (revision, meta):
+				return
+			if journal.records < options.JOURNAL_COMPACT_AFTER:
+				layers, chunks = journal.diff(self.grid)
+				if journal.chunks + len(chunks) <= sum(len(layer.chunks) for layer in self.grid):
+					self.saved_revision = (revision, meta)
+					journal.mark(self.grid, len(chunks))
+					self.main.saver.append(
+						self.path, journal.token, {**meta, 'palette': self.palette.to_list()}, layers, chunks,
+						options.SAVE_COMPRESSION
+					)
+					return
+		grid = self.grid.copy()
+		self.saved_revision = (revision, meta)
+		if save_format == 'binary':
+			token = os.urandom(8).hex()
+			self.journal = Journal(self.path, token, grid)
+			meta = {**meta, 'journal': token}
+		else:
+			self.journal = None
+		self.main.saver.save(self.path, meta, grid, save_format, options.SAVE_COMPRESSION)
+	
+	def autosave(self):
+		"""saves the world if it was changed since the last save, worlds that were never saved are skipped"""
+		if self.loader is not None or self.path is None or self.path[-6:] != '.world':
+			return
+		if self.saved_revision == (self.grid.revision, self.meta) and not self.main.saver.failed_saving(self.path):
+			return
+		print(f'[SAVE] > AUTO ({self.path})')
+		self.write()
+	
 	def display_hover_tile(self, pos=None, tile=None):
 		if self.selected_tile is not None or tile is not None:
 			dis_rect = self.display.get_rect()
@@ -516,10 +1130,10 @@ class Project:
 			if pg.Rect(0, self.main.Options.TOP_OFFSET, dis_rect.w, dis_rect.h - self.main.Options.TOP_OFFSET) \
 					.colliderect(pg.Rect((x, y), size)):
 				if tile is None:
-					tile = self.sprite_sheet.img.subsurface(self.selected_tile)
-				if pos is None:
-					pos = pg.mouse.get_pos()
-				self.display.blit(pg.transform.scale(tile, size), (x, y))
+					tile = self.tile_cache.get(self.sprite_sheet, self.selected_tile, size)
+				elif tile.get_size() != (int(size[0]), int(size[1])):
+					tile = pg.transform.scale(tile, size)
+				self.display.blit(tile, (x, y))
 	
 	@property
 	def selected_tile(self):
@@ -536,10 +1150,70 @@ class Project:
 	def raw_selected_tile(self):
 		return self._selected_tile
 	
+	def export_atlas(self):
+		"""saves the world next to itself (<world>-atlas.world) with an atlas of the tiles in the tile lookup"""
+		self.finish_loading()
+		if self.path is None or self.path[-6:] != '.world':
+			print(f'{RED}[EXPORT] > SAVE THE WORLD FIRST{RESET}')
+			return
+		path = self.path[:-6] + '-atlas.world'
+		exported = atlas.export(
+			path, copy.deepcopy(self.meta), self.grid, self.sprite_sheet.img,
+			compression=self.main.Options.SAVE_COMPRESSION
+		)
+		print(f'{GREEN}[EXPORT] > ATLAS ({path}, {exported}){RESET}')
+	
+	def lookup_changed(self):
+		"""forgets everything that depends on the tile lookup"""
+		self.chunk_cache.invalidate()
+		if self.sprite_sheet is not None:
+			self.sprite_sheet.atlas = None
+	
+	@property
+	def palette(self) -> Palette:
+		"""project-wide lookup between (group, name) and the tile ids stored in the grid"""
+		return self.grid.palette
+	
+	def visible_blocks(self, left, top, right, bottom) -> tuple[range, range]:
+		"""
+		the area is clipped by the window (below TOP_OFFSET) without visiting the blocks outside of it
+		:return: columns and rows of the block area that are visible
+		"""
+		dis_rect = self.display.get_rect()
+		view = pg.Rect(0, self.main.Options.TOP_OFFSET, dis_rect.w, dis_rect.h - self.main.Options.TOP_OFFSET)
+		size = (self.tile_size.x * self.zoom, self.tile_size.y * self.zoom)
+		
+		def column(x):
+			return view.colliderect(pg.Rect(self.bold.x + size[0] * x, view.y, size[0], size[1]))
+		
+		def row(y):
+			return view.colliderect(pg.Rect(view.x, self.bold.y + size[1] * y, size[0], size[1]))
+		
+		first = self.current_block(view.topleft)
+		last = self.current_block(view.bottomright)
+		x0, x1 = max(left, first[0] - 1), min(right, last[0] + 2)
+		y0, y1 = max(top, first[1] - 1), min(bottom, last[1] + 2)
+		# only the blocks at the edges of the window can be partly outside of it
+		while x0 < x1 and not column(x0):
+			x0 += 1
+		while x1 > x0 and not column(x1 - 1):
+			x1 -= 1
+		while y0 < y1 and not row(y0):
+			y0 += 1
+		while y1 > y0 and not row(y1 - 1):
+			y1 -= 1
+		return range(x0, x1), range(y0, y1)
+	
+	def area_blits(self, tile: pg.Surface, left, top, right, bottom) -> list[tuple[pg.Surface, tuple[float, float]]]:
+		""":return: blits of the tile on every visible block of the area (for fblits)"""
+		size = (self.tile_size.x * self.zoom, self.tile_size.y * self.zoom)
+		columns, rows = self.visible_blocks(left, top, right, bottom)
+		xs = [self.bold.x + size[0] * x for x in columns]
+		return [(tile, (x, self.bold.y + size[1] * y)) for y in rows for x in xs]
+	
 	def draw_hover_rect(self):
 		if not self.rect[0]:
 			return
-		dis_rect = self.display.get_rect()
 		size = (self.tile_size.x * self.zoom, self.tile_size.y * self.zoom)
 		
 		rect: pg.Rect = self.rect[1]
@@ -550,17 +1224,11 @@ class Project:
 		bottom = rect.bottom if rect.h > 0 else rect.top + 1
 		
 		if self.selected_tile is not None:
-			tile = pg.transform.scale(self.sprite_sheet.img.subsurface(self.selected_tile), size)
+			tile = self.tile_cache.get(self.sprite_sheet, self.selected_tile, size)
 		else:
 			tile = pg.Surface(size)
 		
-		for x_ in range(left, right):
-			for y_ in range(top, bottom):
-				x = self.bold.x + size[0] * x_
-				y = self.bold.y + size[1] * y_
-				if pg.Rect(0, self.main.Options.TOP_OFFSET, dis_rect.w, dis_rect.h - self.main.Options.TOP_OFFSET) \
-						.colliderect(pg.Rect((x, y), size)):
-					self.display.blit(tile, (x, y))
+		self.display.fblits(self.area_blits(tile, left, top, right, bottom))
 		w = 5
 		left = self.bold.x + size[0] * left - w
 		top = self.bold.y + size[1] * top - w
@@ -584,42 +1252,31 @@ class Project:
 		bottom = rect.bottom if rect.h > 0 else rect.top + 1
 		
 		txt = {
-			key: pg.transform.scale(self.sprite_sheet.img.subsurface(group[value]), size) for key, value in
-			matrix.items()
+			key: self.tile_cache.get(self.sprite_sheet, group[value], size) for key, value in matrix.items()
 		}
 		# DRAW TOP
 		width = right - left
 		height = bottom - top
 		
+		# same parts as upload_autotile_rect_to_grid, later parts are drawn over the earlier ones
+		blits = []
 		if width == 1 and height == 1:
-			self.display_hover_tile((self.bold.x + size[0] * left, self.bold.y + size[1] * top), txt[(0, 0)])
+			blits += self.area_blits(txt[(0, 0)], left, top, left + 1, top + 1)
 		if width > 1:
-			self.display_hover_tile((self.bold.x + size[0] * left, self.bold.y + size[1] * top), txt[(-1, -1)])
-			self.display_hover_tile((self.bold.x + size[0] * right - size[0], self.bold.y + size[1] * top),
-			                        txt[(1, -1)])
+			blits += self.area_blits(txt[(-1, -1)], left, top, left + 1, top + 1)
+			blits += self.area_blits(txt[(1, -1)], right - 1, top, right, top + 1)
 		if height > 1:
-			self.display_hover_tile((self.bold.x + size[0] * left, self.bold.y + size[1] * bottom - size[1]),
-			                        txt[(-1, 1)])
-			self.display_hover_tile((self.bold.x + size[0] * right - size[0], self.bold.y + size[1] * bottom - size[1]),
-			                        txt[(1, 1)])
+			blits += self.area_blits(txt[(-1, 1)], left, bottom - 1, left + 1, bottom)
+			blits += self.area_blits(txt[(1, 1)], right - 1, bottom - 1, right, bottom)
 		if width > 3 and height > 3:
-			for x in range(left + 1, right - 1):
-				for y in range(top + 1, bottom - 1):
-					self.display_hover_tile((self.bold.x + size[0] * x, self.bold.y + size[1] * y), txt[(0, 0)])
+			blits += self.area_blits(txt[(0, 0)], left + 1, top + 1, right - 1, bottom - 1)
 		if height > 2:
-			x = self.bold.x + size[0] * left
-			x2 = self.bold.x + size[0] * right - size[0]
-			for y in range(top + 1, bottom - 1):
-				y = self.bold.y + size[1] * y
-				self.display_hover_tile((x, y), txt[(-1, 0)])
-				self.display_hover_tile((x2, y), txt[(1, 0)])
+			blits += self.area_blits(txt[(-1, 0)], left, top + 1, left + 1, bottom - 1)
+			blits += self.area_blits(txt[(1, 0)], right - 1, top + 1, right, bottom - 1)
 		if width > 2:
-			y = self.bold.y + size[1] * top
-			y2 = self.bold.y + size[1] * bottom - size[1]
-			for x in range(left + 1, right - 1):
-				x = self.bold.x + size[0] * x
-				self.display_hover_tile((x, y), txt[(0, -1)])
-				self.display_hover_tile((x, y2), txt[(0, 1)])
+			blits += self.area_blits(txt[(0, -1)], left + 1, top, right - 1, top + 1)
+			blits += self.area_blits(txt[(0, 1)], left + 1, bottom - 1, right - 1, bottom)
+		self.display.fblits(blits)
 		w = 5
 		left = self.bold.x + size[0] * left - w
 		top = self.bold.y + size[1] * top - w
@@ -627,69 +1284,89 @@ class Project:
 		height = self.bold.y + size[1] * bottom - top + w
 		pg.draw.rect(self.display, (200, 200, 200), pg.Rect((left, top), (width, height)), w)
 	
+	def grid_line_layers(self) -> tuple[pg.Surface, pg.Surface]:
+		"""
+		the lines repeat every tile, so they are drawn once (one tile wider / higher than the window)
+		and only moved while the view pans
+		:return: layer with the vertical lines, layer with the horizontal lines
+		"""
+		dis_rect = self.display.get_rect()
+		color = pg.Color(self.grid_color)
+		state = (tuple(self.tile_size), self.zoom, dis_rect.size, tuple(color))
+		if self.grid_lines is not None and self.grid_lines[0] == state:
+			return self.grid_lines[1:]
+		step_x, step_y = self.tile_size[0] * self.zoom, self.tile_size[1] * self.zoom
+		key = (255 - color.r, 255 - color.g, 255 - color.b)
+		columns = pg.Surface((dis_rect.w + math.ceil(step_x), dis_rect.h))
+		rows = pg.Surface((dis_rect.w, dis_rect.h + math.ceil(step_y)))
+		for layer in (columns, rows):
+			layer.fill(key)
+			layer.set_colorkey(key, pg.RLEACCEL)
+		for idx in range(int(columns.get_width() / step_x) + 1):
+			columns.fill(color, (int(idx * step_x), 0, 1, columns.get_height()))
+		for idx in range(int(rows.get_height() / step_y) + 1):
+			rows.fill(color, (0, int(idx * step_y), rows.get_width(), 1))
+		self.grid_lines = (state, columns, rows)
+		return columns, rows
+	
 	def draw_grid_lines(self):
 		dis_rect = self.display.get_rect()
-		v_line = pg.Surface((dis_rect.w, 1))
-		h_line = pg.Surface((1, dis_rect.h))
-		v_line.fill(self.grid_color)
-		h_line.fill(self.grid_color)
+		columns, rows = self.grid_line_layers()
 		tile_w, tile_h = self.tile_size
-		lines = []
-		for idx in range(int(max(dis_rect.w / self.tile_size[0], dis_rect.h / self.tile_size[1]) / self.zoom)):
-			x = idx * tile_w * self.zoom + self.offset[0] % tile_w * self.zoom - tile_w + self.sidebar.right
-			if 0 < x < dis_rect.w:
-				lines.append((h_line, (x, self.main.Options.TOP_OFFSET)))
-			x2 = self.sidebar.right - self.offset[0] % tile_w - tile_w
-			y = idx * tile_h * self.zoom + self.offset[1] % tile_h * self.zoom - tile_w
-			if y >= self.main.Options.TOP_OFFSET:
-				lines.append((v_line, (x2, y)))
-		self.display.fblits(lines)
+		step_x, step_y = tile_w * self.zoom, tile_h * self.zoom
+		top = self.main.Options.TOP_OFFSET
+		# first line of the grid, the layers start one tile before it
+		x = self.offset[0] % tile_w * self.zoom - tile_w + self.sidebar.right
+		y = self.offset[1] % tile_h * self.zoom - tile_w
+		left = max(int(x), 1)
+		x = math.floor(x - math.ceil(x / step_x) * step_x)
+		y = math.floor(y - math.ceil(y / step_y) * step_y)
+		self.display.blit(columns, (left, top), (left - x, 0, dis_rect.w - left, dis_rect.h - top))
+		x2 = self.sidebar.right - self.offset[0] % tile_w - tile_w
+		self.display.blit(rows, (x2, top), (0, top - y, dis_rect.w, dis_rect.h - top))
 	
 	def draw_grid_tiles(self):
 		size = (self.tile_size.x * self.zoom, self.tile_size.y * self.zoom)
 		vis_rect = pg.Rect(self.sidebar.right - size[0] + 1, self.main.Options.TOP_OFFSET - size[1],
 		                   self.display.get_width() - self.sidebar.w + size[0] * 2, self.sidebar.h + size[1])
-		grid = []
 		left, top = self.current_block(vis_rect.topleft)
 		right, bottom = self.current_block(vis_rect.bottomright)
-		for x_ in range(left, right):
-			for y_ in range(top, bottom):
-				pos = (x_, y_)
-				tiles = []
-				x, y = None, None
-				for layer in self.grid:
-					if pos in layer:
-						data = layer[pos]
-						if data[0] in self.tiles:
-							tile_group = self.tiles[data[0]]
-							name = data[1]
-							if name in tile_group:
-								tile_name = tuple(tile_group[name])
-								x = self.bold.x + size[0] * pos[0]
-								y = self.bold.y + size[1] * pos[1]
-								if vis_rect.collidepoint(x, y):
-									if tile_name not in self.tile_cache:
-										self.tile_cache[tile_name] = pg.transform.scale(self.sprite_sheet.img.subsurface(tile_name), size).convert_alpha()
-									tiles.append(self.tile_cache[tile_name])
-							else:
-								del layer[pos]
-						else:
-							del layer[pos]
-				if tiles:
-					for tile in tiles:
-						grid.append((tile, (x, y)))
-				
+		if self.chunk_cache.draw(left, top, right, bottom, size):
+			return
+		textures = {}
+		grid = []
+		for layer in self.grid:
+			for x, y, tile_id in layer.iter_rect(left, top, right, bottom):
+				texture = textures.get(tile_id, False)
+				if texture is False:
+					texture = textures[tile_id] = self.tile_texture(tile_id, size)
+				if texture is not None:
+					grid.append((texture, (self.bold.x + size[0] * x, self.bold.y + size[1] * y)))
 		self.display.fblits(grid)
 	
+	def tile_texture(self, tile_id: int, size) -> pg.Surface | None:
+		"""
+		:return: texture of the tile id scaled to the size, None if the tile isn't in the tile lookup
+		         (tiles of removed groups are only purged when the world finishes loading)
+		"""
+		tile = self.palette[tile_id]
+		if tile is None or tile[0] not in self.tiles or tile[1] not in self.tiles[tile[0]]:
+			return None
+		return self.tile_cache.get(self.sprite_sheet, self.tiles[tile[0]][tile[1]], size)
+	
 	def render(self):
 		dis_rect = self.display.get_rect()
+		if self.sprite_sheet is None:
+			self.draw_grid_lines()
+			self.layers_vis.visualize()
+			return
 		if self.tile_mode_enabled:
 			self.sprite_sheet.render(self.tile_size)
 		else:
 			self.draw_grid_lines()
 			# ===[ GRID ]===
 			self.draw_grid_tiles()
-			if self.tool == 'brush':
+			if self.tool == 'brush' or self.tool == 'autotile-brush':
 				self.display_hover_tile()
 			elif self.tool == 'rect':
 				self.draw_hover_rect()
@@ -707,40 +1384,157 @@ class Project:
 			tile_group.draw()
 	
 	def render_on_top(self):
-		tile_size = self.header.render(f'{self.tile_size[0]}x{self.tile_size[1]}', True,
-		                               (200, 200, 200))
+		tile_size = self.main.text_cache.render(self.header, f'{self.tile_size[0]}x{self.tile_size[1]}', True,
+		                                        (200, 200, 200))
 		self.display.blit(tile_size, (self.sidebar.centerx - tile_size.get_width() / 2, 0))
+		if self.loader is not None:
+			progress = self.main.text_cache.render(self.header, f'loading {self.loader.progress:.0%}', True, (200, 200, 200))
+			self.display.blit(progress, (self.sidebar.right + 10, self.main.Options.TOP_OFFSET + 10))
+	
+	def block_rect(self, block) -> pg.Rect:
+		""":return: area of the window covered by the block"""
+		size = (self.tile_size.x * self.zoom, self.tile_size.y * self.zoom)
+		return pg.Rect(self.bold.x + size[0] * block[0], self.bold.y + size[1] * block[1], size[0] + 1, size[1] + 1)
+	
+	def damage(self, event) -> list[pg.Rect] | None:
+		"""
+		:param event: MOUSEMOTION event
+		:return: areas of the window changed by the event, None if everything has to be redrawn
+		"""
+		if self.tile_mode_enabled or event.buttons[1] or event.buttons[2]:
+			return None
+		old_pos = (event.pos[0] - event.rel[0], event.pos[1] - event.rel[1])
+		if event.buttons[0]:
+			if self.tool != 'brush':
+				return None
+			for pos in (old_pos, event.pos):
+				if pos[0] < self.sidebar.right or self.main.input.hits(pos):
+					return None
+			# paint_stroke fills the line between the blocks, its bounding rect covers every painted block
+			area = self.block_rect(self.current_block(old_pos)).union(self.block_rect(self.current_block(event.pos)))
+			if self.stroke_end is not None:
+				area.union_ip(self.block_rect(self.stroke_end))
+			return [area]
+		elif self.tool != 'brush' and self.tool != 'autotile-brush':
+			return []
+		return [self.block_rect(self.current_block(old_pos)), self.block_rect(self.current_block(event.pos))]
 	
 	def current_block(self, pos=None) -> tuple[int, int]:
 		""":return: block position at specified pos / mouse pos"""
 		if pos is None:
-			pos = pg.mouse.get_pos()
+			pos = self.main.input.mouse_pos
 		pos = (
 			int((pos[0] - self.bold.x) // (self.tile_size[0] * self.zoom)),
 			int((pos[1] - self.bold.y) // (self.tile_size[1] * self.zoom))
 		)
 		return pos
 	
-	def set_block(self, pos, group=None, name=None):
+	def set_blocks(self, blocks):
+		"""puts the selected tile on every block (or removes their tiles) in one write"""
+		layer = self.grid[self.current_layer]
+		id_ = layer.palette.intern(self._selected_tile) if self.selected_tile is not None else EMPTY
+		layer.set_ids(blocks, id_)
+	
+	def autotile_blocks(self, blocks):
+		"""
+		paints the autotile terrain of the selected group on the blocks (or erases them without a selected tile),
+		only the blocks and their neighbours are updated
+		"""
+		layer = self.grid[self.current_layer]
+		erase = self.selected_tile is None
+		if erase:
+			# erasing keeps the terrain of the removed tile intact
+			by_group = {}
+			for block in blocks:
+				tile = layer.get(block)
+				if tile is not None:
+					by_group.setdefault(tile[0], []).append(block)
+		else:
+			by_group = {self.raw_selected_tile[0]: blocks}
+		for name, group_blocks in by_group.items():
+			group = self.tiles.get(name)
+			if group is None or not group.matrix_is_full():
+				self.set_blocks(group_blocks)
+				continue
+			table, terrain = group.rules.ids(group.name, layer.palette)
+			autotile.paint_cells(layer, group_blocks, table, terrain, erase)
+	
+	def assign_blob_tile(self):
+		"""
+		the selected tile becomes the blob tile of the neighbour mask of the autotile terrain under the mouse
+		(without a selected tile the blob tile of the mask is removed), the block is fixed right away
+		"""
+		layer = self.grid[self.current_layer]
+		block = self.current_block()
+		tile = layer.get(block)
+		group = self.tiles.get(tile[0]) if tile is not None else None
+		if group is None or not group.matrix_is_full():
+			return
+		if self.selected_tile is not None and self.raw_selected_tile[0] != group.name:
+			print(f'{RED}[BLOB] > THE SELECTED TILE ISN\'T IN {group.name}{RESET}')
+			return
+		_, terrain = group.rules.ids(group.name, layer.palette)
+		if layer.get_id(*block) not in terrain:
+			return
+		mask = autotile.reduce_mask(autotile.neighbour_mask(layer, *block, terrain))
 		if self.selected_tile is not None:
-			if group is None or name is None:
-				group, name = self._selected_tile
-			self.grid[self.current_layer][pos] = [group, name]
+			group.blob[mask] = self.raw_selected_tile[1]
 		else:
-			if pos in self.grid[self.current_layer]:
-				del self.grid[self.current_layer][pos]
-		
+			group.blob.pop(mask, None)
+		group.matrix_changed()
+		# a removed blob tile still belongs to the terrain until the block is fixed
+		table, new_terrain = group.rules.ids(group.name, layer.palette)
+		with self.history.step('blob-tile'):
+			autotile.update(layer, [block], table, terrain | new_terrain)
+		print(f'[BLOB] > {group.name} {mask:08b}: {group.blob.get(mask)}')
+	
+	def panels(self) -> Iterator[tuple[pg.Rect, object]]:
+		""":return: rects of the ui over the map with the object they belong to, see Input"""
+		yield self.layers_vis.rect, self.layers_vis
+		for group in self.tiles.values():
+			for rect in group.hit_rects():
+				yield rect, group
+	
+	def over_tile_group(self, pos) -> bool:
+		""":return: True if pos is on a tile group"""
+		return self.main.input.over(pos, TileGroup)
+	
+	def paint_stroke(self):
+		"""paints the blocks the brush went over since the last call, the gaps between them are filled with lines"""
+		if not self.stroke:
+			return
+		blocks = {}
+		end = self.stroke_end
+		for block in self.stroke:
+			if block is not None:
+				blocks.update(dict.fromkeys(line(*end, *block) if end is not None else (block,)))
+			end = block
+		self.stroke.clear()
+		self.stroke_end = end
+		if not blocks:
+			return
+		if self.tool == 'autotile-brush':
+			self.autotile_blocks(list(blocks))
+		else:
+			self.set_blocks(blocks)
+	
 	def upload_rect_to_grid(self, width, height):
-		for x in range(width[0], width[1]):
-			for y in range(height[0], height[1]):
-				self.set_block((x, y))
+		"""fills the rect with the selected tile (or removes its tiles) in one operation"""
+		layer = self.grid[self.current_layer]
+		id_ = layer.palette.intern(self._selected_tile) if self.selected_tile is not None else EMPTY
+		layer.fill(width[0], height[0], width[1], height[1], id_)
 	
 	def upload_autotile_rect_to_grid(self, width, height):
+		"""fills the rect with the autotile matrix of the selected group, one fill per part of the rect"""
 		if not (self.selected_tile is not None and self.rect[0]) or not self.tiles[
 			self.raw_selected_tile[0]].matrix_is_full():
 			return
 		group = self.tiles[self.raw_selected_tile[0]]
 		matrix = group.matrix
+		layer = self.grid[self.current_layer]
+		
+		def fill(area_left, area_top, area_right, area_bottom, part):
+			layer.fill(area_left, area_top, area_right, area_bottom, layer.palette.intern((group.name, matrix[part])))
 		
 		left, right = width
 		top, bottom = height
@@ -749,122 +1543,148 @@ class Project:
 		width = right - left
 		height = bottom - top
 		
+		# later parts overwrite the earlier ones
 		if width == 1 and height == 1:
-			self.set_block((left, top), group.name, matrix[(0, 0)])
+			fill(left, top, left + 1, top + 1, (0, 0))
 		if width > 1:
-			self.set_block((left, top), group.name, matrix[(-1, -1)])
-			self.set_block((right - 1, top), group.name, matrix[(1, -1)])
+			fill(left, top, left + 1, top + 1, (-1, -1))
+			fill(right - 1, top, right, top + 1, (1, -1))
 		if height > 1:
-			self.set_block((left, bottom - 1), group.name, matrix[(-1, 1)])
-			self.set_block((right - 1, bottom - 1), group.name, matrix[(1, 1)])
+			fill(left, bottom - 1, left + 1, bottom, (-1, 1))
+			fill(right - 1, bottom - 1, right, bottom, (1, 1))
 		if width > 3 and height > 3:
-			for x in range(left + 1, right - 1):
-				for y in range(top + 1, bottom - 1):
-					self.set_block((x, y), group.name, matrix[(0, 0)])
+			fill(left + 1, top + 1, right - 1, bottom - 1, (0, 0))
 		if height > 2:
-			x = left
-			x2 = right - 1
-			for y in range(top + 1, bottom - 1):
-				self.set_block((x, y), group.name, matrix[(-1, 0)])
-				self.set_block((x2, y), group.name, matrix[(1, 0)])
+			fill(left, top + 1, left + 1, bottom - 1, (-1, 0))
+			fill(right - 1, top + 1, right, bottom - 1, (1, 0))
 		if width > 2:
-			y = top
-			y2 = bottom - 1
-			for x in range(left + 1, right - 1):
-				self.set_block((x, y), group.name, matrix[(0, -1)])
-				self.set_block((x, y2), group.name, matrix[(0, 1)])
+			fill(left + 1, top, right - 1, top + 1, (0, -1))
+			fill(left + 1, bottom - 1, right - 1, bottom, (0, 1))
+	
+	def select_tool(self, tool: str):
+		self.tool = tool
+		if tool == 'rect' or tool == 'autotile-rect':
+			self.rect[0] = False
+			self.rect[1].topleft = (0, 0)
+			self.rect[1].size = (0, 0)
+		else:
+			self.rect = [False, pg.Rect(0, 0, 0, 0)]
+		print(f'[TOOL] > {tool.upper()}')
+	
+	def reset_tile(self):
+		self.selected_tile = None
+	
+	def new_layer(self):
+		"""moves to the layer above, a new layer is made if there is none"""
+		with self.history.step('new-layer'):
+			if len(self.grid) <= self.current_layer + 1:
+				self.history.remember_layers()
+			self.current_layer += 1
+			if len(self.grid) <= self.current_layer:
+				self.grid.new_layer()
+				self.layer_names.append(
+					f"layer {len(self.grid)}")
+				print('[LAYER] > NEW {%s}' % self.current_layer)
+			else:
+				print('[LAYER] > UP {%s}' % self.current_layer)
+	
+	def previous_layer(self):
+		if self.current_layer > 0:
+			self.current_layer -= 1
+			print('[LAYER] > PREVIOUS')
+	
+	def delete_layer(self):
+		print('[LAYER] > DELETE {%s}' % self.current_layer)
+		with self.history.step('delete-layer'):
+			self.history.remember_layers()
+			self.grid.pop(self.current_layer)
+			self.layer_names.pop(self.current_layer)
+			self.current_layer -= 1
+	
+	def rename_layer(self):
+		print('[LAYER] > RENAME {%s}' % self.current_layer)
+		# the names before renaming are one step, typing isn't recorded key by key
+		with self.history.step('rename-layer'):
+			self.history.remember_layers()
+		self.renaming = True
+	
+	def stop_renaming(self):
+		self.renaming = False
+		print('[SELECTION] > CANCEL/ACCEPT')
+	
+	def erase_layer_name(self):
+		self.layer_names[self.current_layer] = self.layer_names[self.current_layer][0:-1]
+	
+	def scale_tile_up(self):
+		self.tile_size *= 2
+		self.bold = pg.Vector2(
+			self.offset[0] * self.zoom - self.tile_size[
+				0] + self.sidebar.right,
+			self.offset[1] * self.zoom - self.tile_size[1])
+		print('[TILE-SIZE] > MULT {to: %s}' % self.tile_size)
+	
+	def scale_tile_down(self):
+		self.tile_size /= 2
+		self.tile_size[0] = max(1.0, self.tile_size[0])
+		self.tile_size[1] = max(1.0, self.tile_size[1])
+		self.bold = pg.Vector2(
+			self.offset[0] * self.zoom - self.tile_size[
+				0] + self.sidebar.right,
+			self.offset[1] * self.zoom - self.tile_size[1])
+		print('[TILE-SIZE] > DIV {to: %s}' % self.tile_size)
+	
+	def remove_selected_tile(self):
+		"""removes the selected tile from the tile lookup (and every block with it)"""
+		if self.selected_tile is not None:
+			with self.history.step('lookup-removal'):
+				self.history.remember_lookup()
+				del self.tiles[self.raw_selected_tile[0]][
+					self.raw_selected_tile[1]]
+			self.selected_tile = None
+			print('[TILE] > LOOKUP-REMOVAL')
+	
+	def save_as(self):
+		print('[SAVE] > AS')
+		self.path = None
+		self.save()
+	
+	def quick_save(self):
+		print('[SAVE] > NORMAL')
+		self.save()
+	
+	def load_dialog(self):
+		self.path = None
+		self.destination = None
+		self.load()
+		print(f'[LOAD] > {self.path}')
+	
+	def undo(self):
+		step = self.history.undo()
+		print(f'[HISTORY] > UNDO {step.name}' if step is not None else '[HISTORY] > NOTHING TO UNDO')
+	
+	def redo(self):
+		step = self.history.redo()
+		print(f'[HISTORY] > REDO {step.name}' if step is not None else '[HISTORY] > NOTHING TO REDO')
+	
+	def toggle_tile_mode(self):
+		print('[TILE] > ACTIVE-MODe')
+		self.tile_mode_enabled = not self.tile_mode_enabled
 	
 	def eventHandler(self):
-		for event in self.main.events:
+		events = self.main.events
+		if self.loader is not None:
+			# only moving around the map while it's loading
+			events = [event for event in events if event.type == MOUSEWHEEL or
+			          event.type == MOUSEMOTION and not event.buttons[0]]
+		for event in events:
 			if event.type == KEYDOWN:
 				if self.renaming:
-					if event == self.main.Bindings.CANCEL_SELECTION or event == self.main.Bindings.SELECTION_ACCEPT:
-						self.renaming = False
-						print('[SELECTION] > CANCEL/ACCEPT')
-					elif event.key == K_BACKSPACE:
-						self.layer_names[self.current_layer] = self.layer_names[self.current_layer][0:-1]
-					elif event.unicode.isascii():
+					if not self.rename_keys.dispatch(event) and event.unicode.isascii():
 						self.layer_names[self.current_layer] += event.unicode
 				else:
 					if not self.tile_mode_enabled:
-						if event == self.main.Bindings.RESET_TILE:
-							self.selected_tile = None
-						if event == self.main.Bindings.RECT:
-							self.tool = 'rect'
-							self.rect[0] = False
-							self.rect[1].topleft = (0, 0)
-							self.rect[1].size = (0, 0)
-							print('[TOOL] > RECT')
-						if event == self.main.Bindings.AUTOTILE_RECT:
-							self.tool = 'autotile-rect'
-							self.rect[0] = False
-							self.rect[1].topleft = (0, 0)
-							self.rect[1].size = (0, 0)
-							print('[TOOL] > AUTOTILE-RECT')
-						if event == self.main.Bindings.BRUSH:
-							self.tool = 'brush'
-							self.rect = [False, pg.Rect(0, 0, 0, 0)]
-							print('[TOOL] > BRUSH')
-						elif event == self.main.Bindings.NEW_LAYER:
-							self.current_layer += 1
-							if len(self.grid) <= self.current_layer:
-								self.grid.append({})
-								self.layer_names.append(
-									f"layer {len(self.grid)}")
-								print('[LAYER] > NEW {%s}' % self.current_layer)
-							else:
-								print('[LAYER] > UP {%s}' % self.current_layer)
-						elif event == self.main.Bindings.PREVIOUS_LAYER:
-							if self.current_layer > 0:
-								self.current_layer -= 1
-								print('[LAYER] > PREVIOUS')
-						elif event == self.main.Bindings.DELETE_LAYER:
-							print('[LAYER] > DELETE {%s}' % self.current_layer)
-							self.grid.pop(self.current_layer)
-							self.layer_names.pop(self.current_layer)
-							self.current_layer -= 1
-						elif event == self.main.Bindings.RENAME_LAYER:
-							print('[LAYER] > RENAME {%s}' % self.current_layer)
-							self.renaming = True
-					if event == self.main.Bindings.SCALE_TILE_UP:
-						self.tile_size *= 2
-						self.bold = pg.Vector2(
-							self.offset[0] * self.zoom - self.tile_size[
-								0] + self.sidebar.right,
-							self.offset[1] * self.zoom - self.tile_size[1])
-						print('[TILE-SIZE] > MULT {to: %s}' % self.tile_size)
-					elif event == self.main.Bindings.SCALE_TILE_DOWN:
-						self.tile_size /= 2
-						self.tile_size[0] = max(1.0, self.tile_size[0])
-						self.tile_size[1] = max(1.0, self.tile_size[1])
-						self.bold = pg.Vector2(
-							self.offset[0] * self.zoom - self.tile_size[
-								0] + self.sidebar.right,
-							self.offset[1] * self.zoom - self.tile_size[1])
-						print('[TILE-SIZE] > DIV {to: %s}' % self.tile_size)
-					elif event == self.main.Bindings.TILE_LOOKUP_REMOVAL:
-						if self.selected_tile is not None:
-							del self.tiles[self.raw_selected_tile[0]][
-								self.raw_selected_tile[1]]
-							self.selected_tile = None
-							print('[TILE] > LOOKUP-REMOVAL')
-					if event == self.main.Bindings.SAVE_AS:
-						print('[SAVE] > AS')
-						self.path = None
-						self.save()
-						print('[SAVE] > SUCCESSFUL')
-					elif event == self.main.Bindings.SAVE:
-						print('[SAVE] > NORMAL')
-						self.save()
-						print('[SAVE] > SUCCESSFUL')
-					elif event == self.main.Bindings.LOAD:
-						self.path = None
-						self.destination = None
-						self.load()
-						print(f'[LOAD] > {self.path}')
-					elif event == self.main.Bindings.TOGGLE_TILE_MODE:
-						print('[TILE] > ACTIVE-MODe')
-						self.tile_mode_enabled = not self.tile_mode_enabled
+						self.map_keys.dispatch(event)
+					self.keys.dispatch(event)
 			elif event.type == KEYUP:
 				if event == self.main.Bindings.RECT:
 					if self.rect[0]:
@@ -875,14 +1695,19 @@ class Project:
 			elif event.type == MOUSEBUTTONDOWN and not self.tile_mode_enabled:
 				if event.button == 1:
 					if not event.pos[0] < self.sidebar.right:
-						if self.tool == 'brush':
-							if not any(group.collidepoint(event.pos) for group in self.tiles.values()):
-								self.set_block(self.current_block(event.pos))
+						if self.tool == 'brush' or self.tool == 'autotile-brush':
+							if not self.over_tile_group(event.pos):
+								self.history.begin(self.tool)
+								self.stroke_end = None
+								self.stroke.append(self.current_block(event.pos))
 						elif self.tool == 'rect' or self.tool == 'autotile-rect':
-							if not any(group.collidepoint(event.pos) for group in self.tiles.values()):
+							if not self.over_tile_group(event.pos):
 								self.rect[0] = True
 								self.rect[1] = pg.Rect(self.current_block(), (1, 1))
 			elif event.type == MOUSEBUTTONUP:
+				self.paint_stroke()
+				self.stroke_end = None
+				self.history.end()
 				if not self.tile_mode_enabled:
 					if self.tool == 'rect' or self.tool == 'autotile-rect':
 						if self.rect[0]:
@@ -892,10 +1717,11 @@ class Project:
 							rect.left if rect.w > 0 else rect.right - 1, rect.right if rect.w > 0 else rect.left + 1)
 							height = (
 							rect.top if rect.h > 0 else rect.bottom - 1, rect.bottom if rect.h > 0 else rect.top + 1)
-							if self.tool == 'rect':
-								self.upload_rect_to_grid(width, height)
-							else:
-								self.upload_autotile_rect_to_grid(width, height)
+							with self.history.step(self.tool):
+								if self.tool == 'rect':
+									self.upload_rect_to_grid(width, height)
+								else:
+									self.upload_autotile_rect_to_grid(width, height)
 							
 							self.rect[0] = False
 							pos = self.current_block(event.pos)
@@ -908,30 +1734,37 @@ class Project:
 						self.bold = pg.Vector2(self.offset[0] * self.zoom - self.tile_size[0] + self.sidebar.right,
 						                       self.offset[1] * self.zoom - self.tile_size[1])
 					elif event.buttons[0]:
-						if self.tool == 'brush':
-							if not any(group.collidepoint(event.pos) for group in self.tiles.values()) and not self.layers_vis.collidepoint(event.pos):
-								self.set_block(self.current_block(event.pos))
+						if self.tool == 'brush' or self.tool == 'autotile-brush':
+							if not self.main.input.hits(event.pos):
+								self.history.begin(self.tool)  # the whole stroke is one step
+								# painted once per frame, see paint_stroke
+								self.stroke.append(self.current_block(event.pos))
+							else:
+								self.stroke.append(None)
 						elif self.tool == 'rect' or self.tool == 'autotile-rect':
 								if self.rect[0]:
-									if not any(group.collidepoint(event.pos) for group in self.tiles.values()):
-										pos = self.current_block(pg.mouse.get_pos())
+									if not self.over_tile_group(event.pos):
+										pos = self.current_block()
 										self.rect[1].w = pos[0] - self.rect[1].x + 1
 										self.rect[1].h = pos[1] - self.rect[1].y + 1
+				elif event.buttons[0]:
+					self.stroke.append(None)  # no line through the sidebar
 			elif event.type == MOUSEWHEEL:
-				if not self.sidebar.collidepoint(pg.mouse.get_pos()) and not self.tile_mode_enabled:
+				if not self.sidebar.collidepoint(self.main.input.mouse_pos) and not self.tile_mode_enabled:
 					self.zoom += event.y * self.main.Options.SCROLL_SENSITIVITY
 					self.zoom = pg.math.clamp(self.zoom, 0.25, 15)
-					self.tile_cache = {}
 					self.bold = pg.Vector2(self.offset[0] * self.zoom - self.tile_size[0] + self.sidebar.right,
 					                       self.offset[1] * self.zoom - self.tile_size[1])
-				elif self.sidebar.collidepoint(pg.mouse.get_pos()):
+				elif self.sidebar.collidepoint(self.main.input.mouse_pos):
 					self.scroll += event.y * self.main.Options.SCROLL_SENSITIVITY * self.main.Options.SIDEBAR_SCROLL_SPEED
+					self.main.input.panels_changed()
+		self.paint_stroke()
 		if self.tile_mode_enabled:
-			self.sprite_sheet.eventHandler(self.main.events)
+			self.sprite_sheet.eventHandler(events)
 		else:
-			self.layers_vis.event_handler(self.main.events)
+			self.layers_vis.event_handler(events)
 		for tile_group in self.tiles.copy().values():
-			tile_group.eventHandler(self.main.events)
+			tile_group.eventHandler(events)
 	
 	class SpriteSheet:
 		
@@ -950,6 +1783,12 @@ class Project:
 			"""====[ IMAGE ]===="""
 			self.img = pg.image.load(path).convert_alpha()
 			self.w, self.h = 512, 512
+			# a level may use a quarter of the texture cache, bigger zooms scale the tiles one by one
+			self.pyramid = MipPyramid(self.img, self.project.tile_cache.max_bytes // 4)
+			self.atlas: Atlas | None = None
+			self.atlas_pyramid: MipPyramid | None = None
+			self.view: tuple[tuple, pg.Surface, tuple[int, int], pg.Rect] | None = None  # state, scaled part, dest, area
+			self.grid_overlay: tuple[tuple, pg.Surface] | None = None
 			
 			"""====[ TEXT ]===="""
 			self.save_selection_group = self.project.save_selection_group
@@ -968,14 +1807,102 @@ class Project:
 			self.selection = pg.Rect(0, 0, 0, 0)
 			self.editing_selection_group = True
 			self.edit_tile = False
+			
+			"""====[ KEYS ]===="""
+			self.keys = KeyTable(self.main.Bindings, [('EDIT_TILE', self.edit_selected_tile)])
+			# only while something is selected
+			self.selection_keys = KeyTable(self.main.Bindings, [
+				('CANCEL_SELECTION', self.cancel_selection),
+				(Key('backspace', ''), self.erase_selection_name),
+				('EXPORT_TILE', self.export_selection),
+				('SELECTION_ACCEPT', self.accept_selection),
+				(Key('left', ''), self.toggle_selection_name),
+				(Key('right', ''), self.toggle_selection_name),
+			])
+		
+		def tile(self, rect, size) -> pg.Surface:
+			""":return: part of the sprite sheet at the rect scaled to the size, taken from the atlas of the used tiles if possible"""
+			atlas = self.get_atlas()
+			if rect in atlas:
+				return self.atlas_pyramid.tile(atlas[rect], size)
+			return self.pyramid.tile(rect, size)
+		
+		def get_atlas(self) -> Atlas:
+			""":return: atlas of the tiles in the tile lookup, it's packed again after the lookup changes"""
+			if self.atlas is None:
+				self.atlas = Atlas(
+					self.img,
+					(rect for tile_group in self.project.tiles.values() for rect in tile_group.tiles.values())
+				)
+				self.atlas_pyramid = MipPyramid(self.atlas.surface, self.project.tile_cache.max_bytes // 4)
+			return self.atlas
+		
+		def scaled_size(self) -> tuple[int, int]:
+			""":return: size of the whole sprite sheet at the current zoom"""
+			return int(self.img.get_width() * self.zoom), int(self.img.get_height() * self.zoom)
+		
+		def view_area(self) -> pg.Rect:
+			""":return: part of the scaled sprite sheet that is shown in the area"""
+			return self.img.get_rect(
+				topleft=(self.w / 2 * (self.zoom - 1) + self.offset.x, self.h / 2 * (self.zoom - 1) + self.offset.y),
+				size=(self.w, self.h)
+			)
+		
+		def scaled_view(self) -> tuple[pg.Surface, tuple[int, int], pg.Rect]:
+			"""
+			only the visible part of the sprite sheet is scaled, it's kept until the zoom or offset change
+			:return: scaled part, its position in the area, part of it that is visible
+			"""
+			area = self.view_area()
+			state = (self.zoom, tuple(area), self.img.get_size())
+			if self.view is not None and self.view[0] == state:
+				return self.view[1:]
+			visible = area.clip(pg.Rect((0, 0), self.scaled_size()))
+			if not visible.w or not visible.h:
+				self.view = (state, pg.Surface((0, 0)), (0, 0), pg.Rect(0, 0, 0, 0))
+				return self.view[1:]
+			# the part starts and ends on pixels that land on whole pixels, so it matches the scaled sheet
+			step = Fraction(self.zoom).limit_denominator(64).denominator
+			img_w, img_h = self.img.get_size()
+			left = int(visible.left / self.zoom) // step * step
+			top = int(visible.top / self.zoom) // step * step
+			right = min(-(-math.ceil(visible.right / self.zoom) // step) * step, img_w)
+			bottom = min(-(-math.ceil(visible.bottom / self.zoom) // step) * step, img_h)
+			part = pg.transform.scale(
+				self.img.subsurface(left, top, right - left, bottom - top),
+				(round(right * self.zoom) - round(left * self.zoom), round(bottom * self.zoom) - round(top * self.zoom))
+			)
+			part_left, part_top = round(left * self.zoom), round(top * self.zoom)
+			self.view = (
+				state, part, (visible.left - area.left, visible.top - area.top),
+				visible.move(-part_left, -part_top).clip(part.get_rect())
+			)
+			return self.view[1:]
 		
-		def draw_selection(self, img):
+		def grid_lines(self, tile_size) -> pg.Surface:
+			""":return: lines of the tiles over the visible part of the sprite sheet (colorkeyed), redrawn when the view changes"""
+			area = self.view_area()
+			color = pg.Color(self.grid_color)
+			state = (self.zoom, tuple(area), self.scaled_size(), tuple(tile_size), tuple(color))
+			if self.grid_overlay is not None and self.grid_overlay[0] == state:
+				return self.grid_overlay[1]
+			key = (255 - color.r, 255 - color.g, 255 - color.b)
+			overlay = pg.Surface(area.size)
+			overlay.fill(key)
+			overlay.set_colorkey(key, pg.RLEACCEL)
+			overlay.set_clip(pg.Rect((-area.left, -area.top), self.scaled_size()))
+			self.draw_lines(overlay, (-area.left, -area.top), self.scaled_size(), tile_size)
+			overlay.set_clip(None)
+			self.grid_overlay = (state, overlay)
+			return overlay
+		
+		def draw_selection(self, origin):
 			if self.selection != (0, 0, 0, 0):
-				draw_rect(img, self.selection_color,
+				draw_rect(self.display, self.selection_color,
 				          pg.Rect(
 					          self.selection.x * self.zoom, self.selection.y * self.zoom,
 					          self.selection.w * self.zoom, self.selection.h * self.zoom
-				          ), width=3
+				          ).move(origin), width=3
 				          )
 		
 		@property
@@ -985,49 +1912,52 @@ class Project:
 			rect.center = self.center
 			return rect
 		
-		def draw_lines(self, img, tile_size):
-			if img.get_width() > img.get_height():
-				r = img.get_width() / tile_size[0]
+		def draw_lines(self, surface, origin, img_size, tile_size):
+			"""draws lines of the tiles on the surface, the sprite sheet is at origin with img_size, only lines in the clip are drawn"""
+			width, height = img_size
+			ox, oy = origin
+			if width > height:
+				r = width / tile_size[0]
 			else:
-				r = img.get_height() / tile_size[1]
+				r = height / tile_size[1]
 			
-			for idx in range(int(r)):
-				x = idx * tile_size[0] * self.zoom
-				pg.draw.line(img, self.grid_color, (x, 0), (x, img.get_height()), 1)
-				y = idx * tile_size[1] * self.zoom
-				pg.draw.line(img, self.grid_color, (0, y), (img.get_width(), y), 1)
-			pg.draw.line(img, self.grid_color, (img.get_width() - 1, 0), (img.get_width() - 1, img.get_height()))
-			pg.draw.line(img, self.grid_color, (0, img.get_height() - 1), (img.get_width(), img.get_height() - 1))
+			clip = surface.get_clip()
+			step_x, step_y = tile_size[0] * self.zoom, tile_size[1] * self.zoom
+			for idx in range(max(int((clip.left - ox) / step_x) - 1, 0), min(int((clip.right - ox) / step_x) + 2, int(r))):
+				x = ox + int(idx * step_x)
+				pg.draw.line(surface, self.grid_color, (x, oy), (x, oy + height - 1), 1)
+			for idx in range(max(int((clip.top - oy) / step_y) - 1, 0), min(int((clip.bottom - oy) / step_y) + 2, int(r))):
+				y = oy + int(idx * step_y)
+				pg.draw.line(surface, self.grid_color, (ox, y), (ox + width - 1, y), 1)
+			pg.draw.line(surface, self.grid_color, (ox + width - 1, oy), (ox + width - 1, oy + height - 1))
+			pg.draw.line(surface, self.grid_color, (ox, oy + height - 1), (ox + width - 1, oy + height - 1))
 		
 		def draw_data(self):
 			rect = self.area
 			if self.selection != (0, 0, 0, 0):
 				group = self.save_selection_group_sel if self.editing_selection_group else self.save_selection_group
-				text = self.text.render(self.selection_group_name, False, (120, 120, 120))
+				text = self.main.text_cache.render(self.text, self.selection_group_name, False, (120, 120, 120))
 				self.display.blit(text, (rect.centerx - text.get_width() / 2, rect.bottom + 50))
 				self.display.blit(group, (rect.centerx - self.save_selection_group.get_width() / 2, rect.bottom + 20))
 
-				text = self.text.render(self.selection_name, False, (120, 120, 120))
+				text = self.main.text_cache.render(self.text, self.selection_name, False, (120, 120, 120))
 				name = self.save_selection_name if self.editing_selection_group else self.save_selection_name_sel
 				self.display.blit(text, (rect.centerx - text.get_width()/2, rect.bottom + 130))
 				self.display.blit(name, (rect.centerx - name.get_width() / 2, rect.bottom + 80))
 
 		def render(self, tile_size):
-			sp_sheet = pg.transform.scale_by(self.img, self.zoom)
 			rect = self.area
 			pg.draw.rect(self.display, (32, 32, 32), rect)
-			self.draw_lines(sp_sheet, tile_size)
-			# sp sheet
-			dest = rect.topleft
-			area = self.img.get_rect(
-				topleft=(
-					rect.w / 2 * (self.zoom - 1) + self.offset.x,
-					rect.h / 2 * (self.zoom - 1) + self.offset.y
-				),
-				size=(self.w, self.h)
-			)
-			self.draw_selection(sp_sheet)
-			self.display.blit(sp_sheet, dest, area)
+			# sp sheet, only the visible part is scaled, the lines are an overlay of their own
+			part, dest, visible = self.scaled_view()
+			self.display.blit(part, (rect.left + dest[0], rect.top + dest[1]), visible)
+			self.display.blit(self.grid_lines(tile_size), rect.topleft)
+			area = self.view_area()
+			origin = (rect.left - area.left, rect.top - area.top)
+			clip = self.display.get_clip()
+			self.display.set_clip(pg.Rect(origin, self.scaled_size()).clip(rect).clip(clip))
+			self.draw_selection(origin)
+			self.display.set_clip(clip)
 			self.draw_data()
 			return rect
 		
@@ -1047,12 +1977,12 @@ class Project:
 		def eventHandler(self, events):
 			for event in events:
 				if event.type == MOUSEWHEEL:
-					if self.area.collidepoint(*pg.mouse.get_pos()):
+					if self.area.collidepoint(self.main.input.mouse_pos):
 						self.zoom += event.y * self.main.Options.SCROLL_SENSITIVITY
 						if self.zoom < 1 or self.zoom > 15:
 							self.zoom = pg.math.clamp(self.zoom, 1, 15)
 				elif event.type == MOUSEMOTION:
-					if self.area.collidepoint(pg.mouse.get_pos()):
+					if self.area.collidepoint(self.main.input.mouse_pos):
 						if event.buttons[0]:
 							point = self.get_point(*event.pos)
 							self.selection.size = (point[0] - self.selection.x, point[1] - self.selection.y)
@@ -1060,8 +1990,7 @@ class Project:
 							self.offset -= pg.Vector2(event.rel) * self.main.Options.MOUSE_SENSITIVITY
 				elif event.type == MOUSEBUTTONDOWN:
 					if event.button == 1:
-						if self.area.collidepoint(event.pos) and not any(
-								tile_group.collidepoint(event.pos) for tile_group in self.project.tiles.values()):
+						if self.area.collidepoint(event.pos) and not self.project.over_tile_group(event.pos):
 							self.selection.topleft = pg.Vector2(self.get_point(*event.pos))
 							self.selection.size = (0, 0)
 				elif event.type == MOUSEBUTTONUP:
@@ -1074,59 +2003,63 @@ class Project:
 								self.selection.h - ((self.selection.h * 2) if self.selection.h < 0 else 0)
 							)
 				elif event.type == KEYDOWN:
-					if event == self.main.Bindings.EDIT_TILE:
-						print(self.project.raw_selected_tile)
-						self.selection = pg.Rect(self.project.selected_tile)
-						self.selection_group_name = self.project.raw_selected_tile[0]
-						self.selection_name = str(self.project.raw_selected_tile[1])
-						# self.save_selection = self.img.subsurface(self.selection)
-					elif self.selection != (0, 0, 0, 0):
-						if event == self.main.Bindings.CANCEL_SELECTION:
-							self.selection = pg.Rect(0, 0, 0, 0)
-							self.selection_group_name = ""
-							self.selection_name = ""
-						elif event.key == K_BACKSPACE:
-							if self.editing_selection_group:
-								self.selection_group_name = self.selection_group_name[:-1]
-							else:
-								self.selection_name = self.selection_name[:-1]
-						elif event == self.main.Bindings.EXPORT_TILE:
-							en_x, en_y = 0, 0
-							id_ = self.selection_name
-
-							for x in range(self.selection.x, self.selection.right):
-								if x % self.project.tile_size[0] == 0:
-									en_x += 1
-									for y in range(self.selection.y, self.selection.bottom):
-										if y % self.project.tile_size[1] == 0:
-											en_y += 1
-											if self.selection_group_name not in self.project.tiles:
-												self.project.tiles[self.selection_group_name]: TileGroup = TileGroup(
-													self.project,
-													self.selection_group_name,
-													{}
-												)
-											self.project.tiles[self.selection_group_name][id_ + f' - {x}x{y}'] = (x, y, *self.project.tile_size)
-							self.selection = pg.Rect(0, 0, 0, 0)
-									
-						elif event == self.main.Bindings.SELECTION_ACCEPT:
-							if self.selection_group_name not in self.project.tiles:
-								self.project.tiles[self.selection_group_name]: TileGroup = TileGroup(self.project,
-																									 self.selection_group_name, {})
-
-							id_ = self.selection_name
-							if self.selection_name in self.project.tiles[self.selection_group_name]:
-								del self.project.tiles[self.selection_group_name][self.selection_name]
-							self.project.tiles[self.selection_group_name][id_] = tuple(self.selection.copy())
-							self.selection = pg.Rect(0, 0, 0, 0)
-						elif event.key == K_LEFT or event.key == K_RIGHT:
-							self.editing_selection_group = not self.editing_selection_group
-						elif event.unicode.isprintable():
+					if not self.keys.dispatch(event) and self.selection != (0, 0, 0, 0):
+						if not self.selection_keys.dispatch(event) and event.unicode.isprintable():
 							print(event.unicode)
 							if self.editing_selection_group:
 								self.selection_group_name += event.unicode
 							else:
 								self.selection_name += event.unicode
+		
+		def edit_selected_tile(self):
+			print(self.project.raw_selected_tile)
+			self.selection = pg.Rect(self.project.selected_tile)
+			self.selection_group_name = self.project.raw_selected_tile[0]
+			self.selection_name = str(self.project.raw_selected_tile[1])
+			# self.save_selection = self.img.subsurface(self.selection)
+		
+		def cancel_selection(self):
+			self.selection = pg.Rect(0, 0, 0, 0)
+			self.selection_group_name = ""
+			self.selection_name = ""
+		
+		def erase_selection_name(self):
+			if self.editing_selection_group:
+				self.selection_group_name = self.selection_group_name[:-1]
+			else:
+				self.selection_name = self.selection_name[:-1]
+		
+		def toggle_selection_name(self):
+			self.editing_selection_group = not self.editing_selection_group
+		
+		def export_selection(self):
+			"""every tile of the selection is added to the group"""
+			en_x, en_y = 0, 0
+			id_ = self.selection_name
+
+			for x in range(self.selection.x, self.selection.right):
+				if x % self.project.tile_size[0] == 0:
+					en_x += 1
+					for y in range(self.selection.y, self.selection.bottom):
+						if y % self.project.tile_size[1] == 0:
+							en_y += 1
+							if self.selection_group_name not in self.project.tiles:
+								self.project.tiles[self.selection_group_name]: TileGroup = TileGroup(
+									self.project,
+									self.selection_group_name,
+									{}
+								)
+							self.project.tiles[self.selection_group_name][id_ + f' - {x}x{y}'] = (x, y, *self.project.tile_size)
+			self.selection = pg.Rect(0, 0, 0, 0)
+		
+		def accept_selection(self):
+			if self.selection_group_name not in self.project.tiles:
+				self.project.tiles[self.selection_group_name]: TileGroup = TileGroup(self.project,
+																					 self.selection_group_name, {})
+
+			id_ = self.selection_name
+			self.project.tiles[self.selection_group_name][id_] = tuple(self.selection.copy())
+			self.selection = pg.Rect(0, 0, 0, 0)
 
 
 class PureTileGroup:
@@ -1134,16 +2067,25 @@ class PureTileGroup:
 	def __init__(self, name, tiles, pos=None):
 		self.name = name
 		self.tiles = tiles
-		self.pos = pg.Vector2(pos)
+		self.pos = pg.Vector2(pos) if pos is not None else pg.Vector2()
 		self.tiles: dict = tiles
 		self._matrix = {}
+		self.blob: dict[int, str] = {}  # tiles of the 47 tile set by neighbour mask, see autotile.AutotileRules
+		"""====[ CACHED ]===="""
+		self._resolved_matrix: dict[tuple[int, int], None | str] | None = None
+		self._rules: autotile.AutotileRules | None = None
 	
 	def items(self):
 		return self.tiles.items()
 	
 	@property
 	def matrix(self) -> dict[tuple[int, int], None | str]:
-		"""position from -1x-1 to 1x1"""
+		"""position from -1x-1 to 1x1, resolved only after the matrix changes"""
+		if self._resolved_matrix is None:
+			self._resolved_matrix = self.resolve_matrix()
+		return self._resolved_matrix
+	
+	def resolve_matrix(self) -> dict[tuple[int, int], None | str]:
 		map_matrix = self.mapping_matrix
 		matrix = {
 			(-1, -1): self._matrix[(-1, -1)] if map_matrix[(-1, -1)] else (
@@ -1166,6 +2108,20 @@ class PureTileGroup:
 	def matrix(self, value):
 		value = tuple(value)
 		self._matrix[value[0]] = value[1]
+		self.matrix_changed()
+	
+	def matrix_changed(self):
+		"""has to be called after _matrix or blob is changed directly"""
+		self._resolved_matrix = None
+		self._rules = None
+	
+	@property
+	def rules(self) -> autotile.AutotileRules:
+		"""autotile rules compiled from the matrix and the blob tiles that are still in the group"""
+		if self._rules is None:
+			blob = {mask: name for mask, name in self.blob.items() if name in self.tiles}
+			self._rules = autotile.AutotileRules.from_matrix(self.matrix, blob)
+		return self._rules
 	
 	@property
 	def mapping_matrix(self):
@@ -1204,7 +2160,24 @@ class TileGroup(PureTileGroup):
 			self.pos = pg.Vector2(pos)
 		self.selected_edit = None
 		self._draw_matrix = _draw_matrix
+		self.keys = KeyTable(self.project.main.Bindings, [
+			('MATRIX_TOP_RIGHT', partial(self.set_matrix_part, (1, -1))),
+			('MATRIX_TOP_MID', partial(self.set_matrix_part, (0, -1))),
+			('MATRIX_TOP_LEFT', partial(self.set_matrix_part, (-1, -1))),
+			('MATRIX_MID_RIGHT', partial(self.set_matrix_part, (1, -0))),
+			('MATRIX_MID_MID', partial(self.set_matrix_part, (0, 0))),
+			('MATRIX_MID_LEFT', partial(self.set_matrix_part, (-1, 0))),
+			('MATRIX_BOT_RIGHT', partial(self.set_matrix_part, (1, 1))),
+			('MATRIX_BOT_MID', partial(self.set_matrix_part, (0, 1))),
+			('MATRIX_BOT_LEFT', partial(self.set_matrix_part, (-1, 1))),
+		])
+		"""====[ CACHED ]===="""
+		self.version = 0  # changes with the tiles of the group
+		self.panel: tuple[tuple, pg.Surface] | None = None
+		self.matrix_panel: tuple[tuple, pg.Surface] | None = None
 		super().__init__(name, tiles, self.pos)
+		if tiles:
+			self.project.lookup_changed()
 	
 	def items(self):
 		return self.tiles.items()
@@ -1218,8 +2191,13 @@ class TileGroup(PureTileGroup):
 		height = int((len(self.tiles) / tiles_in_row + 2) * tile_size[1] ) + 64
 		return tile_size, self.project.sidebar.w, height, tiles_in_row
 	
-	def draw(self):
-		tile_size, width, height, tiles_in_row = self.size
+	def panel_state(self, tile_size, width) -> tuple:
+		""":return: everything the look of the panel depends on"""
+		selected = self.project.raw_selected_tile
+		selected = selected[1] if selected is not None and selected[0] == self.name else None
+		return self.version, self.name, tile_size, width, selected, self._draw_matrix, self.project.sprite_sheet
+	
+	def render_panel(self, tile_size, width, height, tiles_in_row) -> pg.Surface:
 		tiles = pg.Surface((width, height))
 		
 		if self.project.selected_tile is not None and self.name == self.project.raw_selected_tile[0]:
@@ -1227,15 +2205,17 @@ class TileGroup(PureTileGroup):
 		else:
 			color = self.project.window_outline_color
 		
-		name = self.header.render(self.name, True, color)
+		name = self.project.main.text_cache.render(self.header, self.name, True, color)
 		tiles.blit(name, ((tiles.get_width() - name.get_width()) / 2, 0))
+		blits = []
 		for idx, (name, tile) in enumerate(self.tiles.items()):
 			pos = pg.Vector2(idx % tiles_in_row * 69 + 5, idx // tiles_in_row * 69 + 5 + 64)
 			# text = self.text.render(name, False, (120, 120, 120), wraplength=55)
 			if (self.name, name) == self.project.raw_selected_tile:
 				pg.draw.rect(tiles, self.project.selected_tile_color,
 				             pg.Rect(pos.x - 4, pos.y - 4, tile_size[0] + 8, tile_size[1] + 8))
-			tiles.blit(pg.transform.scale(self.project.sprite_sheet.img.subsurface(tile), tile_size), pos)
+			blits.append((self.project.tile_cache.get(self.project.sprite_sheet, tile, tile_size), pos))
+		tiles.fblits(blits)
 		# tiles.blit(text, (pos[0] + tile_size[0]/2 - text.get_width() / 2, pos[1] + tile_size[1]))
 		
 		# pg.draw.rect(self.display, color,
@@ -1248,26 +2228,52 @@ class TileGroup(PureTileGroup):
 		else:
 			tiles.blit(self.project.main.show_ico, (x, y))
 		tiles.blit(self.project.main.close_ico, (x + 32, y))
-		self.display.blit(tiles, (self.pos[0], self.project.scroll+self.pos[1]))
+		return tiles
+	
+	def draw(self):
+		"""draws the panel (rendered again only when it changes), groups outside of the window aren't drawn at all"""
+		tile_size, width, height, tiles_in_row = self.size
+		pos = (self.pos[0], self.project.scroll + self.pos[1])
+		dis_rect = self.display.get_rect()
+		if dis_rect.colliderect((pos, (width, height))):
+			state = self.panel_state(tile_size, width)
+			if self.panel is None or self.panel[0] != state:
+				self.panel = (state, self.render_panel(tile_size, width, height, tiles_in_row))
+			self.display.blit(self.panel[1], pos)
 		self.draw_matrix()
 	
 	def draw_matrix(self):
 		if not self._draw_matrix:
 			return
-		matrix_complete = super().matrix_is_full()
-		matrix = super().matrix
-		
 		tile_size = (max(64, int(self.project.tile_size[0])), max(64, int(self.project.tile_size[0])))
 		width = max(256, 3 * tile_size[0])
 		height = max(256, 3 * tile_size[1]) + 64
-		matrix_canvas = pg.Surface((width, height))
+		w = self.project.sidebar.w
+		pos = (self.pos.x + w, self.pos.y + self.project.scroll)
+		if not self.display.get_rect().colliderect((pos[0] - 2, pos[1] - 2, width + 4, height + 4)):
+			return
+		selected = self.project.selected_tile is not None and self.name == self.project.raw_selected_tile[0]
+		state = (self.version, self.name, dict(self._matrix), tile_size, selected, self.project.sprite_sheet)
+		if self.matrix_panel is None or self.matrix_panel[0] != state:
+			self.matrix_panel = (state, self.render_matrix(tile_size, width, height, selected))
+		self.display.blit(self.matrix_panel[1], (pos[0] - 2, pos[1] - 2))
+	
+	def render_matrix(self, tile_size, width, height, selected) -> pg.Surface:
+		""":return: matrix with its outline"""
+		matrix_complete = super().matrix_is_full()
+		matrix = super().matrix
 		
-		if self.project.selected_tile is not None and self.name == self.project.raw_selected_tile[0]:
+		panel = pg.Surface((width + 4, height + 4))
+		matrix_canvas = panel.subsurface((2, 2, width, height))
+		
+		if selected:
 			color = self.project.selected_window_outline_color
 		else:
 			color = self.project.window_outline_color
 		
 		color = color if not matrix_complete else self.project.matrix_full_color
+		panel.fill(color)
+		matrix_canvas.fill((0, 0, 0))
 		
 		for en_x, x in zip((-1, 0, 1), [15 * (x_ + 1) + tile_size[0] * x_ for x_ in range(3)]):
 			for en_y, y in zip((-1, 0, 1), [64 + 15 * y_ + tile_size[1] * y_ for y_ in range(3)]):
@@ -1276,36 +2282,43 @@ class TileGroup(PureTileGroup):
 				else:
 					cl = self.project.selected_window_outline_color if not matrix_complete else self.project.matrix_full_color
 					pg.draw.rect(matrix_canvas, cl, pg.Rect(x - 3, y - 3, tile_size[0] + 6, tile_size[1] + 6))
-					tile = pg.transform.scale(
-						self.project.sprite_sheet.img.subsurface(self.tiles[matrix[(en_x, en_y)]]), tile_size)
+					tile = self.project.tile_cache.get(self.project.sprite_sheet, self.tiles[matrix[(en_x, en_y)]], tile_size)
 					matrix_canvas.blit(tile, pg.Rect((x, y), tile_size))
-		w = self.project.sidebar.w
-		pos = (self.pos.x + w, self.pos.y + self.project.scroll)
-		pg.draw.rect(self.display, color,
-		             (pos[0] - 2, pos[1] - 2, matrix_canvas.get_width() + 4, matrix_canvas.get_height() + 4))
-		self.display.blit(matrix_canvas, pos)
+		return panel
 	
-	def collidepoint(self, *pos):
+	def hit_rects(self) -> list[pg.Rect]:
+		""":return: rects of the tiles panel and the matrix panel (if it is drawn)"""
 		tile_size, width, height, tiles_in_row = self.size
 		pos2 = pg.Vector2(self.pos[0], self.project.scroll+self.pos[1])
-		tiles = pg.Rect(pos2, (width, height))
-		matrix = pg.Rect((pos2.x + width, self.pos.y),
-		                 (max(256, 3 * tile_size[0]), max(256, 3 * tile_size[1]) + 64))
-		return tiles.collidepoint(pos) or (matrix.collidepoint(pos) if self._draw_matrix else False)
+		rects = [pg.Rect(pos2, (width, height))]
+		if self._draw_matrix:
+			rects.append(pg.Rect((pos2.x + width, self.pos.y),
+			                     (max(256, 3 * tile_size[0]), max(256, 3 * tile_size[1]) + 64)))
+		return rects
+	
+	def collidepoint(self, *pos):
+		return any(rect.collidepoint(pos) for rect in self.hit_rects())
 	
 	def eventHandler(self, events):
 		for event in events:
 			if event.type == MOUSEMOTION:
 				if event.buttons[0]:
-					if self.collidepoint(event.pos):
+					if self in self.project.main.input.hits(event.pos):
 						self.pos += event.rel
+						self.project.main.input.panels_changed()
 			elif event.type == MOUSEBUTTONDOWN:
-				if event.button == 1 or event.button == 3 and self.collidepoint(event.pos):
+				if event.button == 1 or event.button == 3 and self in self.project.main.input.hits(event.pos):
 					tile_size, width, height, tiles_in_row = self.size
 					if pg.Rect(self.pos[0] + width - 64, self.pos[1]+self.project.scroll + 20, 32, 32).collidepoint(event.pos):
 						self._draw_matrix = not self._draw_matrix
+						self.project.main.input.panels_changed()
 					elif pg.Rect(self.pos[0] + width - 32, self.pos[1]+self.project.scroll + 20, 32, 32).collidepoint(event.pos):
-						del self.project.tiles[self.name]
+						with self.project.history.step('group-removal'):
+							self.project.history.remember_lookup()
+							for name in list(self.tiles):
+								del self[name]
+							del self.project.tiles[self.name]
+						self.project.main.input.panels_changed()
 					else:
 						for idx, (name, tile) in enumerate(self.tiles.items()):
 							pos = pg.Vector2(idx % tiles_in_row * 69 + 5, idx // tiles_in_row * 69 + 5 + 64) + (self.pos[0], self.pos[1]+self.project.scroll)
@@ -1315,34 +2328,28 @@ class TileGroup(PureTileGroup):
 								break
 			elif event.type == KEYDOWN:
 				if self.selected_edit is not None:
-					match event:
-						case self.project.main.Bindings.MATRIX_TOP_RIGHT:
-							self.matrix = [(1, -1), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_TOP_MID:
-							self.matrix = [(0, -1), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_TOP_LEFT:
-							self.matrix = [(-1, -1), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_MID_RIGHT:
-							self.matrix = [(1, -0), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_MID_MID:
-							self.matrix = [(0, 0), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_MID_LEFT:
-							self.matrix = [(-1, 0), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_BOT_RIGHT:
-							self.matrix = [(1, 1), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_BOT_MID:
-							self.matrix = [(0, 1), self.selected_edit]
-						case self.project.main.Bindings.MATRIX_BOT_LEFT:
-							self.matrix = [(-1, 1), self.selected_edit]
+					self.keys.dispatch(event)
+	
+	def set_matrix_part(self, part: tuple[int, int]):
+		"""puts the edited tile on the part of the autotile matrix"""
+		self.matrix = [part, self.selected_edit]
 	
 	def __setitem__(self, key, value):
 		self.tiles[key] = value
+		self.version += 1
+		self.matrix_changed()
+		self.project.lookup_changed()
 	
 	def __getitem__(self, item):
 		return self.tiles[item]
 	
 	def __delitem__(self, key):
+		"""removes the tile from the lookup, the palette and every layer of the grid"""
 		del self.tiles[key]
+		self.version += 1
+		self.matrix_changed()
+		self.project.grid.remove_tile((self.name, key))
+		self.project.lookup_changed()
 	
 	def __contains__(self, item):
 		if item in self.tiles:
@@ -1353,7 +2360,8 @@ class TileGroup(PureTileGroup):
 	@property
 	def data(self):
 		return {'tiles': {name: tile for name, tile in self.tiles.items()}, 'pos': list(self.pos),
-		        '_draw_matrix': self._draw_matrix, '_matrix': {}}
+		        '_draw_matrix': self._draw_matrix, '_matrix': {},
+		        'blob': {str(mask): name for mask, name in self.blob.items()}}
 
 	def __repr__(self):
 		return f'<TileGroup name:\"{self.name}\" tiles:{self.tiles}>'
@@ -1383,10 +2391,18 @@ class Welcome:
 		"""it's just to prevent errors"""
 		pass
 	
+	def autosave(self):
+		"""it's just to prevent errors"""
+		pass
+	
+	def update(self):
+		"""it's just to prevent errors"""
+		pass
+	
 	def render(self):
 		""""""  # empty doc string
 		"""====[ CONFIG ]===="""
-		mouse_pos = pg.mouse.get_pos()
+		mouse_pos = self.main.input.mouse_pos
 		dis_rect = self.display.get_rect()
 		
 		"""====[ WELCOME ]===="""
@@ -1416,18 +2432,28 @@ class Welcome:
 			pos = (rect.left + self.text.size('  ')[0], rect.top + row * self.text.get_height())
 			if self.main.colors.Welcome['shortened-recent-path']:
 				text = './' + text.split('/')[-1]
-				txt = self.text.render(
-					text, True, self.main.colors.Welcome['recent-text-color']
+				txt = self.main.text_cache.render(
+					self.text, text, True, self.main.colors.Welcome['recent-text-color']
 				)
 				if txt.get_rect(topleft=pos).collidepoint(mouse_pos) and len(self.main.popups) == 0:
-					txt = self.text_und.render(
-						text, True, self.main.colors.Welcome['recent-text-color']
+					txt = self.main.text_cache.render(
+						self.text_und, text, True, self.main.colors.Welcome['recent-text-color']
 					)
 			self.display.blit(txt, pos)
 	
 	def render_on_top(self):
 		pass
 	
+	@staticmethod
+	def panels() -> tuple:
+		"""the welcome screen has no panels to hit-test, see Input"""
+		return ()
+	
+	@staticmethod
+	def damage(event) -> None:
+		"""hovered texts get underlined, so every mouse motion redraws the welcome screen"""
+		return None
+	
 	def eventHandler(self):
 		for event in self.main.events:
 			if event.type == MOUSEBUTTONDOWN:
@@ -1448,7 +2474,7 @@ class Welcome:
 					else:
 						rect = pg.Rect(25, dis_rect.h / 2, dis_rect.w / 2 - 25, dis_rect.h / 2)
 						for row, text in enumerate(self.main.recent):
-							txt = self.text.render(text, True, (150, 150, 150))
+							txt = self.main.text_cache.render(self.text, text, True, (150, 150, 150))
 							txt = txt.get_rect(
 								topleft=(rect.left + self.text.size('  ')[0], rect.top + row * self.text.get_height()))
 							if txt.collidepoint(event.pos):
@@ -1521,7 +2547,7 @@ class Popup:
 			top += question.get_height()
 			for en, (name, texture) in enumerate(options.items()):
 				pos = pg.Rect((rect.centerx-texture.get_width()/2, top), texture.get_size())
-				if pos.collidepoint(pg.mouse.get_pos()) or self.answer[self.DATA[enum]['question']] == name:
+				if pos.collidepoint(self.main.input.mouse_pos) or self.answer[self.DATA[enum]['question']] == name:
 					self.display.blit(self.option_groups_hover[enum]['options'][name], pos)
 				else:
 					self.display.blit(texture, pos)
@@ -1530,12 +2556,12 @@ class Popup:
 			pg.draw.rect(self.display, (30,) * 3, pg.Rect(rect.x + 25, rect.bottom - 55, rect.w - 50, 50))
 			pg.draw.rect(self.display, (40,) * 3, pg.Rect(rect.x + 25, rect.bottom - 55, rect.w - 50, 5))
 			pg.draw.rect(self.display, (40,) * 3, pg.Rect(rect.x + 25, rect.bottom - 55, 5, 50))
-			text = self.small_header.render('OK', True, (60,)*3)
+			text = self.main.text_cache.render(self.small_header, 'OK', True, (60,)*3)
 		else:
 			pg.draw.rect(self.display, (60,) * 3, pg.Rect(rect.x + 25, rect.bottom - 55, rect.w - 50, 50))
 			pg.draw.rect(self.display, (80,) * 3, pg.Rect(rect.x + 25, rect.bottom - 55, rect.w - 50, 5))
 			pg.draw.rect(self.display, (80,) * 3, pg.Rect(rect.x + 25, rect.bottom - 55, 5, 50))
-			text = self.small_header.render('OK', True, (120,)*3)
+			text = self.main.text_cache.render(self.small_header, 'OK', True, (120,)*3)
 		self.display.blit(text, (rect.x + 25 + (rect.w - 50 - text.get_width())/2, rect.bottom - 50))
 
 	def eventHandler(self, events):
@@ -1590,7 +2616,7 @@ class Layers:
 		layers: int = len(self.project.grid)
 		height: int = 300
 		texture: pg.Surface = pg.Surface((350, height))
-		text: pg.Surface = self.header.render("Layers", True, cl)
+		text: pg.Surface = self.project.main.text_cache.render(self.header, "Layers", True, cl)
 		texture.blit(text, ((texture.get_width() - text.get_width())/2, 10))
 		pg.draw.line(texture, cl, (10, 10 + text.get_height()), (texture.get_width()-10, 10 + text.get_height()))
 		
@@ -1603,7 +2629,9 @@ class Layers:
 				prefix = '_' if self.project.renaming else ''
 			else:
 				prefix = ''
-			text: pg.Surface = self.text.render(self.project.layer_names[layer] + prefix, True, text_cl, layer_cl)
+			text: pg.Surface = self.project.main.text_cache.render(
+				self.text, self.project.layer_names[layer] + prefix, True, text_cl, layer_cl
+			)
 			pg.draw.rect(texture, layer_cl, (10, y, texture.get_width() - 10, 40))
 			texture.blit(text, (10, y + 5))
 			y += 40
@@ -1611,9 +2639,13 @@ class Layers:
 		pg.draw.rect(self.display, cl, (self.pos-(2, 2), (350+4, height+4)), border_radius=15)
 		self.display.blit(texture, self.pos)
 	
-	def collidepoint(self, *pos):
+	@property
+	def rect(self) -> pg.Rect:
 		height: int = 300
-		return pg.Rect(self.pos, (350, height)).collidepoint(pos)
+		return pg.Rect(self.pos, (350, height))
+	
+	def collidepoint(self, *pos):
+		return self.rect.collidepoint(pos)
 	
 	def event_handler(self, events):
 		for event in events:
@@ -1624,9 +2656,416 @@ class Layers:
 					if pg.Rect(self.pos, (350, height)).collidepoint(event.pos):
 						self.pos += event.rel
 						self.selected = True
+						self.project.main.input.panels_changed()
 			if event.type == MOUSEBUTTONUP:
 				self.selected = False
 	
 
+class MipPyramid:
+	
+	MAX_LEVEL_SIZE = 8192  # biggest side of a level
+	
+	def __init__(self, image: pg.Surface, max_bytes: int | None = None):
+		"""
+		copies of the image scaled by powers of two, every level is built when it's first needed.
+		built levels are only kept alive by their subsurfaces (the textures of TextureCache, which counts them)
+		:param max_bytes: bytes the biggest level can use, bigger levels aren't built
+		"""
+		self.image = image
+		self.max_bytes = max_bytes
+		self.levels: WeakValueDictionary[int, pg.Surface] = WeakValueDictionary({0: image})  # image scaled by 2 ** key
+		self.missing: set[int] = set()  # levels that are too big or too small
+	
+	def level(self, exponent: int) -> pg.Surface | None:
+		""":return: the image scaled by 2 ** exponent, None if it would be too big or small"""
+		level = self.levels.get(exponent)
+		if level is not None or exponent in self.missing:
+			return level
+		w, h = self.image.get_size()
+		size = (int(w * 2 ** exponent), int(h * 2 ** exponent))
+		if max(size) > self.MAX_LEVEL_SIZE or min(size) < 1 or (
+				self.max_bytes is not None and size[0] * size[1] * self.image.get_bytesize() > self.max_bytes):
+			self.missing.add(exponent)
+			return None
+		previous = self.level(exponent - 1 if exponent > 0 else exponent + 1)
+		if previous is None:
+			self.missing.add(exponent)
+			return None
+		level = self.levels[exponent] = pg.transform.scale(previous, size)
+		return level
+	
+	@staticmethod
+	def exponent(scale: float) -> int | None:
+		""":return: exponent if the scale is a power of two"""
+		if scale <= 0:
+			return None
+		mantissa, exponent = math.frexp(scale)
+		return exponent - 1 if mantissa == 0.5 else None
+	
+	def tile(self, rect, size) -> pg.Surface:
+		"""
+		:return: part of the image at the rect scaled to the size,
+		         power of two scales are only subsurfaces of a level, anything else is scaled
+		"""
+		rect = pg.Rect(rect)
+		if rect.w and rect.h and size[0] / rect.w == size[1] / rect.h:
+			exponent = self.exponent(size[0] / rect.w)
+			if exponent is not None and (exponent >= 0 or all(value % 2 ** -exponent == 0 for value in rect)):
+				level = self.level(exponent)
+				if level is not None:
+					scale = 2 ** exponent
+					return level.subsurface(
+						(int(rect.x * scale), int(rect.y * scale), int(rect.w * scale), int(rect.h * scale))
+					)
+		return pg.transform.scale(self.image.subsurface(rect), size)
+
+
+class TextureCache:
+	
+	def __init__(self, max_bytes: int):
+		"""
+		scaled tile textures keyed by (rect on the sprite sheet, size), least recently used are dropped above max_bytes.
+		a level of the mip pyramid (or the atlas) is counted while any of its subsurfaces is cached, dropping the last one frees it,
+		so an atlas replaced after the lookup changed is counted until its last texture is dropped
+		"""
+		self.max_bytes = max_bytes
+		self.textures: OrderedDict[tuple[tuple, tuple], pg.Surface] = OrderedDict()
+		self.levels: dict[pg.Surface, int] = {}  # pyramid level: amount of cached subsurfaces
+		self.nbytes = 0
+	
+	def get(self, sprite_sheet: 'Project.SpriteSheet', rect, size) -> pg.Surface:
+		""":return: part of the sprite sheet at the rect scaled to the size"""
+		key = (tuple(rect), tuple(size))
+		texture = self.textures.get(key)
+		if texture is None:
+			return self.add(sprite_sheet, key)
+		self.textures.move_to_end(key)
+		return texture
+	
+	@staticmethod
+	def texture_size(texture: pg.Surface) -> int:
+		""":return: bytes of the pixels of the surface"""
+		return texture.get_width() * texture.get_height() * texture.get_bytesize()
+	
+	def charge(self, texture: pg.Surface, sprite_sheet: 'Project.SpriteSheet') -> int:
+		""":return: bytes the texture adds, a subsurface adds its pyramid level (or atlas) when it's the first one using it"""
+		level = texture.get_parent()
+		if level is None:
+			return self.texture_size(texture)
+		if level is sprite_sheet.img:
+			return 0  # the sprite sheet is kept anyway
+		users = self.levels.get(level, 0)
+		self.levels[level] = users + 1
+		return self.texture_size(level) if not users else 0
+	
+	def release(self, texture: pg.Surface) -> int:
+		""":return: bytes freed by dropping the texture"""
+		level = texture.get_parent()
+		if level is None:
+			return self.texture_size(texture)
+		users = self.levels.get(level)
+		if users is None:
+			return 0
+		if users > 1:
+			self.levels[level] = users - 1
+			return 0
+		del self.levels[level]
+		return self.texture_size(level)
+	
+	def add(self, sprite_sheet: 'Project.SpriteSheet', key: tuple[tuple, tuple]) -> pg.Surface:
+		texture = sprite_sheet.tile(*key)
+		self.textures[key] = texture
+		self.nbytes += self.charge(texture, sprite_sheet)
+		while self.nbytes > self.max_bytes and len(self.textures) > 1:
+			_, old = self.textures.popitem(last=False)
+			self.nbytes -= self.release(old)
+		return texture
+	
+	def prewarm(self, sprite_sheet: 'Project.SpriteSheet', keys: Iterator[tuple[tuple, tuple]], budget: float) -> bool:
+		"""
+		scales textures of the keys that aren't cached yet, it never drops textures to make room for them
+		:param budget: seconds that can be spent
+		:return: True if there is nothing left to scale, False if it has to be called again with the rest of the keys
+		"""
+		end = time.perf_counter() + budget
+		for key in keys:
+			if key in self.textures:
+				continue
+			if self.nbytes + key[1][0] * key[1][1] * 4 > self.max_bytes:
+				return True
+			self.add(sprite_sheet, key)
+			# prepared textures are the first to go, they may never be used
+			self.textures.move_to_end(key, last=False)
+			if time.perf_counter() > end:
+				return False
+		return True
+	
+	def clear(self):
+		self.textures.clear()
+		self.levels.clear()
+		self.nbytes = 0
+
+
+class TextCache:
+	
+	def __init__(self, max_bytes: int):
+		"""rendered texts keyed by (font, text, colour, underline, ...), least recently used are dropped above max_bytes"""
+		self.max_bytes = max_bytes
+		self.texts: OrderedDict[tuple, pg.Surface] = OrderedDict()
+		self.nbytes = 0
+	
+	def render(self, font: pg.font.Font, text: str, antialias: bool, color, background=None) -> pg.Surface:
+		""":return: the text rendered like font.render, the surface is shared so it must not be drawn on"""
+		key = (
+			font, text, antialias, tuple(pg.Color(color)), tuple(pg.Color(background)) if background is not None else None,
+			font.underline, font.bold, font.italic
+		)
+		surface = self.texts.get(key)
+		if surface is not None:
+			self.texts.move_to_end(key)
+			return surface
+		surface = self.texts[key] = font.render(text, antialias, color, background)
+		self.nbytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+		while self.nbytes > self.max_bytes and len(self.texts) > 1:
+			_, old = self.texts.popitem(last=False)
+			self.nbytes -= old.get_width() * old.get_height() * old.get_bytesize()
+		return surface
+	
+	def clear(self):
+		self.texts.clear()
+		self.nbytes = 0
+
+
+class ChunkCache:
+	
+	MAX_CHUNK_SIZE = 2048  # biggest side of a pre-rendered chunk in pixels, bigger zooms are drawn tile by tile
+	
+	def __init__(self, project: Project, max_bytes: int):
+		"""
+		pre-rendered surfaces of every chunk of every layer at the current zoom
+		:param max_bytes: bytes of the surfaces that aren't visible and are still kept, the oldest are dropped first
+		"""
+		self.project: Project = project
+		self.max_bytes = max_bytes
+		self.surfaces: dict[tuple[int, tuple[int, int]], tuple[int, pg.Surface]] = {}
+		self.nbytes = 0
+		self.size: tuple[float, float] | None = None
+	
+	def invalidate(self):
+		"""forgets every surface, used when tile lookup or the sprite sheet changes"""
+		self.surfaces.clear()
+		self.nbytes = 0
+	
+	@staticmethod
+	def surface_size(surface: pg.Surface) -> int:
+		return surface.get_width() * surface.get_height() * surface.get_bytesize()
+	
+	def bake(self, layer: Layer, key: tuple[int, int], size) -> pg.Surface:
+		chunk = layer.chunks[key]
+		surface = pg.Surface((int(size[0] * CHUNK_SIZE), int(size[1] * CHUNK_SIZE)), SRCALPHA).convert_alpha()
+		textures = {}
+		blits = []
+		left, top = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+		for x, y, tile_id in layer.iter_rect(left, top, left + CHUNK_SIZE, top + CHUNK_SIZE):
+			texture = textures.get(tile_id, False)
+			if texture is False:
+				texture = textures[tile_id] = self.project.tile_texture(tile_id, size)
+			if texture is not None:
+				blits.append((texture, ((x - left) * size[0], (y - top) * size[1])))
+		surface.fblits(blits)
+		old = self.surfaces.pop((layer.uid, key), None)
+		if old is not None:
+			self.nbytes -= self.surface_size(old[1])
+		self.surfaces[(layer.uid, key)] = (chunk.version, surface)
+		self.nbytes += self.surface_size(surface)
+		return surface
+	
+	def draw(self, left: int, top: int, right: int, bottom: int, size) -> bool:
+		"""
+		draws every layer in the tile area using pre-rendered chunks, chunks are re-rendered only when they changed
+		:return: False if the chunks would be too big at the current zoom (nothing is drawn)
+		"""
+		if size[0] * CHUNK_SIZE > self.MAX_CHUNK_SIZE or size[1] * CHUNK_SIZE > self.MAX_CHUNK_SIZE:
+			return False
+		if size != self.size:
+			self.size = size
+			self.invalidate()
+		bold = self.project.bold
+		chunk_w, chunk_h = size[0] * CHUNK_SIZE, size[1] * CHUNK_SIZE
+		used = set()
+		used_bytes = 0
+		blits = []
+		for layer in self.project.grid:
+			for key, chunk in layer.chunks_in_rect(left, top, right, bottom):
+				cached = self.surfaces.get((layer.uid, key))
+				if cached is None or cached[0] != chunk.version:
+					surface = self.bake(layer, key, size)
+				else:
+					surface = cached[1]
+				used.add((layer.uid, key))
+				used_bytes += self.surface_size(surface)
+				blits.append((surface, (bold.x + chunk_w * key[0], bold.y + chunk_h * key[1])))
+		self.project.display.fblits(blits)
+		if self.nbytes - used_bytes > self.max_bytes:
+			for key in [key for key in self.surfaces if key not in used]:
+				self.nbytes -= self.surface_size(self.surfaces.pop(key)[1])
+				if self.nbytes - used_bytes <= self.max_bytes:
+					break
+		return True
+
+
+class Journal:
+	
+	def __init__(self, path: str, token: str, grid: GRID, records: int = 0, chunks: int = 0):
+		"""
+		remembers what the last save of the world contained, so the next save only has to write what changed
+		:param token: token of the full save, journal records of other full saves are ignored while loading
+		:param records: amount of records already in the journal
+		:param chunks: amount of chunks already in the journal
+		"""
+		self.path = path
+		self.token = token
+		self.records = records
+		self.chunks = chunks
+		self.layers: list[int] = []
+		self.versions: dict[int, dict[tuple[int, int], int]] = {}
+		self.mark(grid)
+	
+	def mark(self, grid: GRID, chunks: int | None = None):
+		"""
+		remembers the current state of the grid as saved
+		:param chunks: amount of chunks written to the journal, None if the state wasn't written as a record
+		"""
+		self.layers = [layer.uid for layer in grid]
+		self.versions = {layer.uid: {key: chunk.version for key, chunk in layer.chunks.items()} for layer in grid}
+		if chunks is not None:
+			self.records += 1
+			self.chunks += chunks
+	
+	def diff(self, grid: GRID) -> tuple[list[int], list[tuple[int, tuple[int, int], Chunk | None]]]:
+		""":return: layers and chunks that changed since the last mark (see binary.write_journal_record)"""
+		indexes = {uid: idx for idx, uid in enumerate(self.layers)}
+		layers = [indexes.get(layer.uid, -1) for layer in grid]
+		chunks = []
+		for idx, layer in enumerate(grid):
+			versions = self.versions.get(layer.uid, {})
+			for key, chunk in layer.chunks.items():
+				if versions.get(key) != chunk.version:
+					chunks.append((idx, key, chunk.copy()))
+			for key in versions.keys() - layer.chunks.keys():
+				chunks.append((idx, key, None))
+		return layers, chunks
+
+
+class Saver:
+	
+	def __init__(self):
+		"""writes worlds on a worker thread, so saving never stops the frame loop"""
+		self.pending: dict[str, list[tuple]] = {}
+		self.lock = threading.Lock()
+		self.wake = threading.Condition(self.lock)
+		self.busy = False
+		self.failed: set[str] = set()  # worlds whose last write failed, their next save has to be a full one
+		self.thread = threading.Thread(target=self.work, name='WorldD saver', daemon=True)
+		self.thread.start()
+	
+	def save(self, path: str, meta: dict, grid: GRID, save_format: str = 'binary', compression: str | None = 'zlib'):
+		"""
+		queues a full save of the world, it replaces everything of the same path that wasn't written yet
+		:param meta: json friendly data besides the grid, it must not be changed afterwards
+		:param grid: snapshot of the grid (Grid.copy()), it must not be changed afterwards
+		"""
+		with self.lock:
+			self.pending[path] = [(self.write, path, meta, grid, save_format, compression)]
+			self.wake.notify()
+	
+	def append(self, path: str, token: str, meta: dict, layers: list[int], chunks: list, compression: str | None = 'zlib'):
+		"""queues a journal record of the world, see binary.write_journal_record"""
+		with self.lock:
+			self.pending.setdefault(path, []).append((self.write_journal, path, token, meta, layers, chunks, compression))
+			self.wake.notify()
+	
+	def work(self):
+		while True:
+			with self.lock:
+				while not self.pending:
+					self.busy = False
+					self.wake.notify_all()
+					self.wake.wait()
+				self.busy = True
+				path = next(iter(self.pending))
+				jobs = self.pending.pop(path)
+			for job, *args in jobs:
+				job(*args)
+	
+	@staticmethod
+	def file_mode(path: str) -> int:
+		""":return: permissions of the world, or the default permissions of a new file if it doesn't exist yet"""
+		try:
+			return stat.S_IMODE(os.stat(path).st_mode)
+		except FileNotFoundError:
+			umask = os.umask(0)
+			os.umask(umask)
+			return 0o666 & ~umask
+	
+	def failed_saving(self, path: str) -> bool:
+		""":return: True if writing the world or its journal failed after the last successful full save"""
+		with self.lock:
+			return path in self.failed
+	
+	def write(self, path: str, meta: dict, grid: GRID, save_format: str, compression: str | None):
+		"""writes the world to a temporary file next to the path and replaces the old world only when it's complete"""
+		directory, name = os.path.split(os.path.abspath(path))
+		temporary = None
+		try:
+			handle, temporary = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory)
+			with os.fdopen(handle, 'wb') as file:
+				if save_format == 'json':
+					file.write(dumps(meta, grid).encode())
+				else:
+					binary.write(file, meta, grid, compression)
+				file.flush()
+				os.fsync(file.fileno())
+			# mkstemp creates the file readable only by the owner, the world keeps the permissions it had
+			os.chmod(temporary, self.file_mode(path))
+			os.replace(temporary, path)
+			# the old journal belongs to the previous full save
+			if os.path.exists(binary.journal_path(path)):
+				os.remove(binary.journal_path(path))
+		except Exception as error:
+			print(f'{RED}[SAVE] > FAILED ({path}): {error}{RESET}')
+			with self.lock:
+				self.failed.add(path)
+			if temporary is not None and os.path.exists(temporary):
+				os.remove(temporary)
+		else:
+			with self.lock:
+				self.failed.discard(path)
+			print(f'{GREEN}[SAVE] > SUCCESSFUL ({path}){RESET}')
+	
+	def write_journal(self, path: str, token: str, meta: dict, layers: list[int], chunks: list, compression: str | None):
+		"""appends the changes to the journal of the world, an interrupted record is ignored while loading"""
+		try:
+			with open(binary.journal_path(path), 'r+b' if os.path.exists(binary.journal_path(path)) else 'wb') as file:
+				# an interrupted record would hide every record appended after it
+				file.truncate(binary.journal_end(file))
+				file.seek(0, 2)
+				binary.write_journal_record(file, token, meta, layers, chunks, compression)
+				file.flush()
+				os.fsync(file.fileno())
+		except Exception as error:
+			print(f'{RED}[SAVE] > FAILED ({binary.journal_path(path)}): {error}{RESET}')
+			# the journal already treats the chunks as saved
+			with self.lock:
+				self.failed.add(path)
+		else:
+			print(f'{GREEN}[SAVE] > SUCCESSFUL ({path}, {len(chunks)} changed chunks){RESET}')
+	
+	def wait(self):
+		"""blocks until every queued world is written"""
+		with self.lock:
+			while self.pending or self.busy:
+				self.wake.wait()
+
 if __name__ == '__main__':
 	Main().run()
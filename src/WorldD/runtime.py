@@ -0,0 +1,278 @@
+"""
+read-only access to binary worlds for games.
+the file is memory mapped, opening it only reads the header and the meta block,
+chunks are found by a binary search in the chunk directory and read straight from the mapped file.
+chunks saved to the journal of the world after the last full save are kept in memory on top of the file.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping
+from itertools import compress
+from typing import Iterator, Sequence
+
+from . import binary
+from .grid import CHUNK_AREA, CHUNK_MASK, CHUNK_SHIFT, EMPTY, TILE_ID_TYPE, cell, iter_chunk_rect
+
+
+class MappedLayer(Mapping):
+	"""
+	one layer of a MappedWorld, behaves like a read-only layer of the grid returned by WorldD.load:
+	(x, y) in layer, layer[x, y] -> (group, name), layer.get((x, y))
+	"""
+
+	def __init__(self, world: 'MappedWorld', idx: int, directory: int, count: int):
+		self.world = world
+		self.idx = idx
+		self.directory = directory
+		self.count = count
+		self.overlay: dict[tuple[int, int], Sequence[int] | None] = {}  # chunks of the journal, None = removed chunk
+		self._len = None
+
+	def _entry(self, idx: int) -> tuple[int, int, int, int]:
+		""":return: chunk x, chunk y, offset, size of the directory entry"""
+		return binary.DIRECTORY_ENTRY.unpack_from(self.world.buffer, self.directory + binary.DIRECTORY_ENTRY.size * idx)
+
+	def _bisect(self, cx: int, cy: int) -> int:
+		""":return: index of the first directory entry that isn't before (cx, cy)"""
+		low, high = 0, self.count
+		unpack_from, buffer = binary.DIRECTORY_ENTRY.unpack_from, self.world.buffer
+		directory, size = self.directory, binary.DIRECTORY_ENTRY.size
+		while low < high:
+			middle = (low + high) >> 1
+			x, y, _, _ = unpack_from(buffer, directory + size * middle)
+			if (y, x) < (cy, cx):
+				low = middle + 1
+			else:
+				high = middle
+		return low
+
+	def chunk(self, cx: int, cy: int) -> Sequence[int] | None:
+		""":return: CHUNK_AREA tile ids of the chunk or None if the chunk is empty"""
+		if self.overlay and (cx, cy) in self.overlay:
+			return self.overlay[cx, cy]
+		idx = self._bisect(cx, cy)
+		if idx == self.count:
+			return None
+		x, y, offset, size = self._entry(idx)
+		if x != cx or y != cy:
+			return None
+		return self.world.chunk_tiles(offset, size)
+
+	def chunks_in_rect(self, left: int, top: int, right: int, bottom: int) -> Iterator[tuple[tuple[int, int], Sequence[int]]]:
+		""":return: iterator of (chunk key, tile ids) for every chunk that overlaps the tile area, sorted by (y, x)"""
+		if not self.overlay or left >= right or top >= bottom:
+			yield from self._stored_chunks_in_rect(left, top, right, bottom)
+			return
+		overlay = self.overlay
+		chunks = {key: tiles for key, tiles in self._stored_chunks_in_rect(left, top, right, bottom) if key not in overlay}
+		c_left, c_top = left >> CHUNK_SHIFT, top >> CHUNK_SHIFT
+		c_right, c_bottom = (right - 1) >> CHUNK_SHIFT, (bottom - 1) >> CHUNK_SHIFT
+		for (cx, cy), tiles in overlay.items():
+			if tiles is not None and c_left <= cx <= c_right and c_top <= cy <= c_bottom:
+				chunks[cx, cy] = tiles
+		yield from sorted(chunks.items(), key=lambda item: (item[0][1], item[0][0]))
+
+	def _stored_chunks_in_rect(self, left: int, top: int, right: int, bottom: int) -> Iterator[tuple[tuple[int, int], Sequence[int]]]:
+		""":return: iterator of (chunk key, tile ids) for every chunk of the file that overlaps the tile area"""
+		if left >= right or top >= bottom:
+			return
+		c_left, c_top = left >> CHUNK_SHIFT, top >> CHUNK_SHIFT
+		c_right, c_bottom = (right - 1) >> CHUNK_SHIFT, (bottom - 1) >> CHUNK_SHIFT
+		idx = self._bisect(c_left, c_top)
+		while idx < self.count:
+			cx, cy, offset, size = self._entry(idx)
+			if cy > c_bottom:
+				return
+			if cx > c_right:
+				# rest of the row is outside of the area, jump to the next row
+				idx = self._bisect(c_left, cy + 1)
+				continue
+			if cx < c_left:
+				idx = self._bisect(c_left, cy)
+				continue
+			yield (cx, cy), self.world.chunk_tiles(offset, size)
+			idx += 1
+
+	def id_at(self, x: int, y: int) -> int:
+		""":return: tile id at x, y (EMPTY if there is no tile)"""
+		tiles = self.chunk(x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+		if tiles is None:
+			return EMPTY
+		return tiles[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+	def tile_at(self, x: int, y: int) -> tuple[str, str] | None:
+		""":return: (group, name) of the tile at x, y or None"""
+		return self.world.palette[self.id_at(x, y)]
+
+	def tiles_in_rect(self, left: int, top: int, right: int, bottom: int) -> Iterator[tuple[int, int, tuple[str, str]]]:
+		""":return: iterator of (x, y, (group, name)) for every tile with left <= x < right and top <= y < bottom"""
+		palette = self.world.palette
+		for key, tiles in self.chunks_in_rect(left, top, right, bottom):
+			for x, y, id_ in iter_chunk_rect(key, tiles, left, top, right, bottom):
+				yield x, y, palette[id_]
+
+	def __getitem__(self, pos):
+		xy = cell(pos)
+		id_ = self.id_at(*xy) if xy is not None else EMPTY
+		if id_ == EMPTY:
+			raise KeyError(pos)
+		return self.world.palette[id_]
+
+	def get(self, pos, default=None):
+		xy = cell(pos)
+		id_ = self.id_at(*xy) if xy is not None else EMPTY
+		return self.world.palette[id_] if id_ != EMPTY else default
+
+	def __contains__(self, pos) -> bool:
+		xy = cell(pos)
+		return xy is not None and self.id_at(*xy) != EMPTY
+
+	def iter_chunks(self) -> Iterator[tuple[tuple[int, int], Sequence[int]]]:
+		""":return: iterator of (chunk key, tile ids) for every chunk of the layer"""
+		overlay = self.overlay
+		for idx in range(self.count):
+			cx, cy, offset, size = self._entry(idx)
+			if (cx, cy) not in overlay:
+				yield (cx, cy), self.world.chunk_tiles(offset, size)
+		for key, tiles in overlay.items():
+			if tiles is not None:
+				yield key, tiles
+
+	def __iter__(self) -> Iterator[tuple[int, int]]:
+		for (cx, cy), tiles in self.iter_chunks():
+			left, top = cx << CHUNK_SHIFT, cy << CHUNK_SHIFT
+			for idx in compress(range(CHUNK_AREA), tiles):
+				yield left + (idx & CHUNK_MASK), top + (idx >> CHUNK_SHIFT)
+
+	def __len__(self) -> int:
+		# counting needs every chunk, it's done only when asked for
+		if self._len is None:
+			self._len = sum(sum(map(bool, tiles)) for _, tiles in self.iter_chunks())
+		return self._len
+
+	def __repr__(self):
+		return f'<MappedLayer idx:{self.idx} chunks:{self.count}>'
+
+
+class MappedWorld:
+	"""
+	read-only binary world for shipped games, RAM usage doesn't depend on the size of the map.
+	uncompressed worlds are read without copying (save them with SAVE-COMPRESSION = 'none' or
+	convert them with `python -m WorldD.binary world.world runtime.world none`),
+	compressed chunks are decompressed on demand and the last CACHE_CHUNKS of them are kept.
+	the journal of the world is replayed while opening, its chunks stay in memory (layer.overlay),
+	ship worlds that were converted (or fully saved) after the last edit to avoid that.
+	"""
+
+	CACHE_CHUNKS = 256
+
+	def __init__(self, path: str):
+		self.path = path
+		self.file = open(path, 'rb')
+		try:
+			self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:  # empty file
+			self.file.close()
+			raise ValueError(f'{path} is not a binary world') from None
+		self.buffer = memoryview(self.map)
+		self._cache: OrderedDict[int, Sequence[int]] = OrderedDict()
+		try:
+			self.compression, layer_count, meta_offset, meta_size = binary.read_header(self.buffer)
+		except (ValueError, struct.error):
+			self.close()
+			raise ValueError(f'{path} is not a binary world, convert it with `python -m WorldD.binary`') from None
+		self.apply_meta(json.loads(bytes(self.buffer[meta_offset:meta_offset + meta_size])))
+		self.grid: list[MappedLayer] = [
+			MappedLayer(self, idx, *binary.LAYER.unpack_from(self.buffer, binary.HEADER.size + binary.LAYER.size * idx))
+			for idx in range(layer_count)
+		]
+		self.journal_records = 0
+		if 'journal' in self.meta:
+			self.replay_journal()
+
+	def apply_meta(self, meta: dict):
+		self.meta: dict = meta
+		self.palette: list[tuple[str, str] | None] = [None] + [
+			(entry[0], entry[1]) if entry is not None else None for entry in meta.get('palette', [])
+		]
+		self.tile_size: list[int] = meta['tile-size']
+		self.img: str = meta['img']
+		self.tiles: dict[str, dict[str, list[int]]] = {
+			name: group['tiles'] for name, group in meta.get('data', {}).items()
+		}
+		self.layer_names: list[str] = meta.get('layer-names', [])
+
+	def replay_journal(self):
+		"""puts the chunks saved to the journal after the last full save on top of the layers, like WorldD.load does"""
+		path = binary.journal_path(self.path)
+		if not os.path.exists(path):
+			return
+		token = self.meta['journal']
+		with open(path, 'rb') as file:
+			for meta, layers, chunks in binary.iter_journal(file, token):
+				self.apply_meta({**meta, 'journal': token})
+				previous = self.grid
+				self.grid = [previous[idx] if idx >= 0 else MappedLayer(self, 0, 0, 0) for idx in layers]
+				for idx, layer in enumerate(self.grid):
+					layer.idx = idx
+				for idx, key, chunk in chunks:
+					self.grid[idx].overlay[key] = chunk.tiles if chunk is not None else None
+					self.grid[idx]._len = None
+				self.journal_records += 1
+
+	def chunk_tiles(self, offset: int, size: int) -> Sequence[int]:
+		""":return: tile ids of the chunk stored at the offset of the file"""
+		tiles = self._cache.get(offset)
+		if tiles is not None:
+			self._cache.move_to_end(offset)
+			return tiles
+		data = self.buffer[offset:offset + size]
+		if self.compression == binary.COMPRESSIONS['none'] and sys.byteorder == 'little':
+			tiles = data.cast(TILE_ID_TYPE)
+		else:
+			tiles = binary.decode_chunk(data, self.compression).tiles
+			data.release()
+		self._cache[offset] = tiles
+		if len(self._cache) > self.CACHE_CHUNKS:
+			# not released, the chunk may still be used by a running tiles_in_rect
+			self._cache.popitem(last=False)
+		return tiles
+
+	def tile_at(self, layer: int, x: int, y: int) -> tuple[str, str] | None:
+		""":return: (group, name) of the tile at x, y or None"""
+		return self.grid[layer].tile_at(x, y)
+
+	def tiles_in_rect(self, layer: int, left: int, top: int, right: int, bottom: int) -> Iterator[tuple[int, int, tuple[str, str]]]:
+		""":return: iterator of (x, y, (group, name)) for every tile with left <= x < right and top <= y < bottom"""
+		return self.grid[layer].tiles_in_rect(left, top, right, bottom)
+
+	def close(self):
+		for tiles in self._cache.values():
+			if isinstance(tiles, memoryview):
+				tiles.release()
+		self._cache.clear()
+		self.buffer.release()
+		self.map.close()
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __repr__(self):
+		return f'<MappedWorld path:"{self.path}" layers:{len(self.grid)}>'
+
+
+def open_world(path: str) -> MappedWorld:
+	"""
+	:param path: path to a binary world
+	:returns: memory mapped world, close it (or use it in a with statement) when it isn't needed anymore
+	"""
+	return MappedWorld(path)
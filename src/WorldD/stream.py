@@ -0,0 +1,130 @@
+import codecs
+import json
+import os
+import re
+from typing import Iterator
+
+
+class JSONStream:
+
+	BLOCK_SIZE = 1 << 20  # amount of bytes read from the file at once
+	LOOKAHEAD = 1 << 16  # buffer is refilled before matching if less than this is left
+
+	def __init__(self, file):
+		"""
+		incremental reader of a json document, values are decoded one by one instead of loading the whole file
+		:param file: file opened in binary mode (text mode works too, but progress is less precise)
+		"""
+		self.file = file
+		self.decoder = json.JSONDecoder()
+		self.utf8 = codecs.getincrementaldecoder('utf-8')()
+		self.buffer = ''
+		self.pos = 0
+		self.eof = False
+		self.bytes_read = 0
+		try:
+			self.size = os.fstat(file.fileno()).st_size
+		except (AttributeError, OSError, ValueError):
+			self.size = 0
+
+	@property
+	def progress(self) -> float:
+		""":return: part of the file that was already read, from 0 to 1"""
+		if self.eof or not self.size:
+			return 1.0 if self.eof else 0.0
+		return min(self.bytes_read / self.size, 1.0)
+
+	def fill(self) -> bool:
+		""":return: False if there is nothing left to read"""
+		if self.eof:
+			return False
+		block = self.file.read(self.BLOCK_SIZE)
+		self.bytes_read += len(block)
+		if isinstance(block, bytes):
+			block = self.utf8.decode(block, final=not block)
+		if not block:
+			self.eof = True
+			return False
+		self.buffer = self.buffer[self.pos:] + block
+		self.pos = 0
+		return True
+
+	def peek(self) -> str:
+		""":return: next character that isn't a whitespace, empty string at the end of the file"""
+		while True:
+			buffer, pos = self.buffer, self.pos
+			while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+				pos += 1
+			self.pos = pos
+			if pos < len(buffer):
+				return buffer[pos]
+			if not self.fill():
+				return ''
+
+	def consume(self, char: str):
+		if self.peek() != char:
+			raise json.JSONDecodeError(f'expected {char!r}', self.buffer, self.pos)
+		self.pos += 1
+
+	def value(self):
+		""":return: next json value (string, number, list, ...)"""
+		self.peek()
+		while True:
+			try:
+				value, end = self.decoder.raw_decode(self.buffer, self.pos)
+			except json.JSONDecodeError:
+				if not self.fill():
+					raise
+				continue
+			# a number at the very end of the buffer could continue in the next block
+			if end >= len(self.buffer) and self.fill():
+				continue
+			self.pos = end
+			return value
+
+	def match(self, pattern: re.Pattern) -> re.Match | None:
+		"""
+		fast path for many small values, the pattern has to end with a lookahead that proves the value ended
+		:return: match at the current position (the position is moved after it) or None
+		"""
+		if len(self.buffer) - self.pos < self.LOOKAHEAD:
+			self.fill()
+		match = pattern.match(self.buffer, self.pos)
+		if match is not None:
+			self.pos = match.end()
+		return match
+
+	def items(self) -> Iterator[str]:
+		"""
+		iterates over keys of the next object, value of every key has to be read before asking for the next key
+		(by value(), items(), elements() or by skipping it with value())
+		"""
+		self.consume('{')
+		if self.peek() == '}':
+			self.pos += 1
+			return
+		while True:
+			key = self.value()
+			self.consume(':')
+			yield key
+			if self.peek() == ',':
+				self.pos += 1
+			else:
+				self.consume('}')
+				return
+
+	def elements(self) -> Iterator[int]:
+		"""iterates over indexes of the next array, every element has to be read before asking for the next one"""
+		self.consume('[')
+		if self.peek() == ']':
+			self.pos += 1
+			return
+		idx = 0
+		while True:
+			yield idx
+			idx += 1
+			if self.peek() == ',':
+				self.pos += 1
+			else:
+				self.consume(']')
+				return
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# the editor is imported without a window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+@pytest.fixture(scope='session')
+def main():
+	""":return: editor without a window"""
+	from WorldD.main import Main
+	main = Main()
+	yield main
+	main.saver.wait()
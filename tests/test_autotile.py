@@ -0,0 +1,75 @@
+import os
+
+from WorldD import autotile
+from WorldD.grid import Grid
+from WorldD.main import Main, Project
+
+from conftest import EXAMPLES
+
+MATRIX = {(x, y): f'{x}x{y}' for x in (-1, 0, 1) for y in (-1, 0, 1)}
+
+
+def test_edges_from_matrix():
+	rules = autotile.AutotileRules.from_matrix(MATRIX)
+	assert rules[0] == '0x0'
+	assert rules[autotile.S | autotile.E] == '-1x-1'
+	assert rules[autotile.N | autotile.W] == '1x1'
+	# corners don't change the tile without blob tiles
+	assert rules[autotile.S | autotile.E | autotile.SE] == rules[autotile.S | autotile.E]
+
+
+def test_blob_masks():
+	assert len(autotile.BLOB_MASKS) == 47
+	assert autotile.reduce_mask(autotile.NE | autotile.N) == autotile.N
+	assert autotile.reduce_mask(autotile.NE | autotile.N | autotile.E) == autotile.NE | autotile.N | autotile.E
+
+
+def test_blob_tiles_win_over_edges():
+	inner = autotile.S | autotile.E | autotile.SE
+	rules = autotile.AutotileRules.from_matrix(MATRIX, {inner: 'inner', 255: 'full'})
+	assert rules[inner] == 'inner'
+	# a corner without both of its edges is ignored
+	assert rules[inner | autotile.NW] == 'inner'
+	assert rules[autotile.S | autotile.E] == '-1x-1'
+	assert rules[255] == 'full'
+	assert rules[255 & ~autotile.NE] == '0x0'
+	assert rules.names >= {'inner', 'full'}
+
+
+def test_paint_cells_matches_painting_one_by_one():
+	cells = [(x, y) for x in range(-3, 4) for y in range(-2, 3)] + [(10, 10), (-3, -2)]
+	grids = Grid([{}]), Grid([{}])
+	for grid in grids:
+		table, terrain = autotile.AutotileRules.from_matrix(MATRIX).ids('group', grid.palette)
+		if grid is grids[0]:
+			autotile.paint_cells(grid[0], cells, table, terrain)
+			autotile.paint_cells(grid[0], [(0, 0)], table, terrain, erase=True)
+		else:
+			for x, y in cells:
+				autotile.paint(grid[0], x, y, table, terrain)
+			autotile.paint(grid[0], 0, 0, table, terrain, erase=True)
+	assert dict(grids[0][0].items()) == dict(grids[1][0].items())
+	assert grids[0][0][-3, -2] == ('group', '-1x-1')
+	assert (0, 0) not in grids[0][0]
+
+
+def test_blob_tile_is_assigned_to_the_mask_under_the_mouse(main: Main):
+	project = Project(main, (32, 32), load=os.path.join(EXAMPLES, 'asset-world.world'))
+	project.finish_loading()
+	group = next(group for group in project.tiles.values() if len(group.tiles) > 1)
+	edge, blob = list(group.tiles)[:2]
+	for part in ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)):
+		group.matrix = [part, edge]
+	project.selected_tile = (group.name, edge)
+	project.autotile_blocks([(x, y) for x in range(3) for y in range(3)])
+	project.current_block = lambda pos=None: (1, 1)
+	project.selected_tile = (group.name, blob)
+	project.assign_blob_tile()
+	assert group.blob == {255: blob}
+	assert project.grid[project.current_layer][1, 1] == (group.name, blob)
+	assert group.data['blob'] == {'255': blob}
+	# without a selected tile the blob tile is removed
+	project.selected_tile = None
+	project.assign_blob_tile()
+	assert not group.blob
+	assert project.grid[project.current_layer][1, 1] == (group.name, edge)
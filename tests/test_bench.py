@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def test_bench_runs_headless_without_tkinter(tmp_path):
+	# a separate process, the bench switches the display driver and tkinter must not be imported by it
+	script = (
+		'import sys\n'
+		'from WorldD import bench\n'
+		f'bench.main(["--synthetic", "10k", "--frames", "6", "--dir", {str(tmp_path)!r}])\n'
+		'assert "tkinter" not in sys.modules\n'
+	)
+	env = {**os.environ, 'PYTHONPATH': SRC}
+	result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, timeout=120)
+	assert result.returncode == 0, result.stderr
+	assert 'synthetic-10k.world' in result.stdout
@@ -0,0 +1,23 @@
+import os
+
+from WorldD.grid import Layer
+from WorldD.main import Main, Project
+
+from conftest import EXAMPLES
+
+
+def test_layer_memory_is_measured_at_most_once_per_interval(main: Main, monkeypatch):
+	project = Project(main, (32, 32), load=os.path.join(EXAMPLES, 'asset-world.world'))
+	project.finish_loading()
+	calls = []
+	memory_usage = Layer.memory_usage
+	monkeypatch.setattr(Layer, 'memory_usage', lambda layer: calls.append(layer) or memory_usage(layer))
+	main.caption_layer = None
+	for _ in range(100):
+		stats = main.layer_stats(project)
+	assert len(calls) == 1
+	assert stats.startswith(f'{len(project.grid[0])} tiles')
+	# the interval is over
+	main.next_caption = 0
+	main.layer_stats(project)
+	assert len(calls) == 2
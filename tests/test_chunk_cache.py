@@ -0,0 +1,27 @@
+import os
+
+from WorldD.grid import CHUNK_SIZE
+from WorldD.main import Main, Project
+
+from conftest import EXAMPLES
+
+
+def test_unused_chunks_are_bounded_by_bytes(main: Main):
+	project = Project(main, (32, 32), load=os.path.join(EXAMPLES, 'asset-world.world'))
+	project.finish_loading()
+	project.grid[0].clear()
+	group = next(group for group in project.tiles.values() if group.tiles)
+	tile = (group.name, next(iter(group.tiles)))
+	cache = project.chunk_cache
+	size = (32, 32)  # chunks of 1024 x 1024 px, 4 MB each
+	chunk_bytes = (size[0] * CHUNK_SIZE) * (size[1] * CHUNK_SIZE) * 4
+	cache.max_bytes = 2 * chunk_bytes
+	for cx in range(10):
+		project.grid[0][cx * CHUNK_SIZE, 0] = tile
+	for cx in range(10):
+		left = cx * CHUNK_SIZE
+		assert cache.draw(left, 0, left + CHUNK_SIZE, CHUNK_SIZE, size)
+		assert cache.nbytes == sum(cache.surface_size(surface) for _, surface in cache.surfaces.values())
+		# the visible chunk and at most max_bytes of the others
+		assert cache.nbytes <= chunk_bytes + cache.max_bytes
+	assert len(cache.surfaces) == 3
@@ -0,0 +1,44 @@
+import os
+
+import pygame as pg
+import pytest
+
+import WorldD
+from WorldD.grid import Grid, cell
+
+from conftest import EXAMPLES
+
+
+def test_example_world_indexed_with_vectors():
+	# examples/visualizer-with-collisions.py indexes the layer with positions made of pygame.Vector2
+	_, _, _, grid, _ = WorldD.load(os.path.join(EXAMPLES, 'asset-world.world'), print_out=False)
+	world = grid[0]
+	x, y = next(iter(world))
+	block_pos = pg.Vector2(x, y + 1)
+	pos = (block_pos[0], block_pos[1] - 1)
+	assert pos in world
+	assert world[pos] == world[x, y]
+	assert world.get(pos) == world[x, y]
+
+
+def test_float_positions():
+	grid = Grid([{}])
+	layer = grid[0]
+	layer[2.0, -3.0] = ('group', 'tile')
+	assert (2, -3) in layer
+	assert list(layer) == [(2, -3)]
+	assert (2.5, -3) not in layer
+	assert layer.get((2.5, -3)) is None
+	with pytest.raises(KeyError):
+		layer[2.5, -3]
+	with pytest.raises(KeyError):
+		layer[0.5, 0] = ('group', 'tile')
+	del layer[pg.Vector2(2, -3)]
+	assert not layer
+
+
+def test_cell():
+	assert cell((1, 2)) == (1, 2)
+	assert cell((1.0, -2.0)) == (1, -2)
+	assert type(cell(pg.Vector2(3, 4))[0]) is int
+	assert cell((1.5, 2)) is None
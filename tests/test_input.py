@@ -0,0 +1,35 @@
+import os
+
+import pygame as pg
+from pygame.locals import MOUSEMOTION
+
+from WorldD.main import HitIndex, Input, Main, Project
+
+from conftest import EXAMPLES
+
+
+def test_hit_index_matches_the_rects():
+	panels = [(pg.Rect(10, 10, 300, 40), 'a'), (pg.Rect(200, 0, 50, 500), 'b'), (pg.Rect(0, 0, 0, 10), 'c')]
+	index = HitIndex(panels)
+	for pos in [(x, y) for x in range(0, 400, 7) for y in range(0, 600, 7)]:
+		assert index.hits(pos) == tuple(owner for rect, owner in reversed(panels) if rect.collidepoint(pos))
+
+
+def test_dragged_tile_group_is_hit_at_its_new_place(main: Main):
+	project = Project(main, (32, 32), load=os.path.join(EXAMPLES, 'asset-world.world'))
+	project.finish_loading()
+	group = next(iter(project.tiles.values()))
+	rect = group.hit_rects()[0]
+	start = pg.Vector2(group.pos)
+	pos = (rect.left + 5, rect.top + 5)
+	moved = (pos[0] + rect.w, pos[1])
+	# the second motion of the frame is only on the group after the first one moved it
+	events = [
+		pg.event.Event(MOUSEMOTION, pos=pos, rel=(rect.w, 0), buttons=(1, 0, 0)),
+		pg.event.Event(MOUSEMOTION, pos=moved, rel=(10, 0), buttons=(1, 0, 0)),
+	]
+	main.input = Input(events, project.panels)
+	assert main.input.hits(moved) == ()
+	group.eventHandler(events)
+	assert group.pos == start + (rect.w + 10, 0)
+	assert group in main.input.hits((moved[0] + 10, moved[1]))
@@ -0,0 +1,39 @@
+import json
+import os
+import shutil
+
+from WorldD.main import Main, Project
+
+from conftest import EXAMPLES
+
+
+def test_dangling_tiles_are_skipped_while_loading(main: Main, tmp_path):
+	"""1.0.0 worlds can reference tiles of removed groups, they are only purged when loading finishes"""
+	shutil.copy(os.path.join(EXAMPLES, 'asset-img.png'), tmp_path / 'asset-img.png')
+	tiles = {'tile': [0, 0, 16, 16]}
+	grid = {f'{x},{y}': ['removed' if (x + y) % 2 else 'group', 'tile'] for x in range(-50, 50) for y in range(-50, 50)}
+	path = tmp_path / 'world.world'
+	path.write_text(json.dumps({
+		'version': '1.0.0',
+		'tile-size': [16, 16],
+		'img': str(tmp_path / 'asset-img.png'),
+		'data': {'group': {'tiles': tiles, 'pos': [0, 0]}},
+		'grid': [grid],
+		'layer-names': ['layer 1']
+	}))
+	project = Project(main, (32, 32), load=str(path))
+	main.projects.append(project)
+	try:
+		while project.sprite_sheet is None:
+			next(project.loader)
+			project.apply_loaded()
+		assert project.loader is not None
+		assert ('removed', 'tile') in project.palette
+		for zoom in (1, 8):
+			project.zoom = zoom
+			project.draw_grid_tiles()
+		project.finish_loading()
+		assert ('removed', 'tile') not in project.palette
+		assert len(project.grid[0]) == len(grid) // 2
+	finally:
+		main.projects.remove(project)
@@ -0,0 +1,110 @@
+import os
+import shutil
+import stat
+
+import WorldD
+from WorldD import binary
+from WorldD.main import Main, Project
+
+from conftest import EXAMPLES
+
+
+def open_project(main: Main, path: str) -> Project:
+	project = Project(main, (32, 32), load=path)
+	project.finish_loading()
+	return project
+
+
+def copy_example(tmp_path) -> str:
+	for name in ('asset-world.world', 'asset-img.png'):
+		shutil.copy(os.path.join(EXAMPLES, name), tmp_path / name)
+	return str(tmp_path / 'asset-world.world')
+
+
+def test_json_world_stays_json(main, tmp_path):
+	path = copy_example(tmp_path)
+	project = open_project(main, path)
+	tile = next(iter(project.palette.ids))
+	for _ in range(2):
+		project.grid[0][1000, 1000] = tile
+		project.write()
+		main.saver.wait()
+		del project.grid[0][1000, 1000]
+		project.grid[0][1001, 1000] = tile
+	with open(path, 'rb') as file:
+		assert not binary.is_binary(file)
+	assert not os.path.exists(binary.journal_path(path))
+	assert tuple(WorldD.load(path, print_out=False)[3][0][1000, 1000]) == tile
+
+
+def test_binary_world_appends_to_journal(main, tmp_path):
+	path = copy_example(tmp_path)
+	WorldD.convert(path, path, 'zlib', print_out=False)
+	project = open_project(main, path)
+	project.write()
+	main.saver.wait()
+	tile = next(iter(project.palette.ids))
+	project.grid[0][1000, 1000] = tile
+	project.write()
+	main.saver.wait()
+	assert os.path.getsize(binary.journal_path(path)) > 0
+	assert tuple(WorldD.load(path, print_out=False)[3][0][1000, 1000]) == tile
+
+
+def test_saving_keeps_the_permissions(main, tmp_path):
+	path = copy_example(tmp_path)
+	os.chmod(path, 0o640)
+	project = open_project(main, path)
+	project.grid[0][1000, 1000] = next(iter(project.palette.ids))
+	project.write()
+	main.saver.wait()
+	assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_new_worlds_get_the_default_permissions(main, tmp_path):
+	path = str(tmp_path / 'new.world')
+	umask = os.umask(0o022)
+	try:
+		main.saver.save(path, {}, WorldD.Grid([{}]), 'json')
+		main.saver.wait()
+	finally:
+		os.umask(umask)
+	assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_failed_journal_append_forces_a_full_save(main, tmp_path):
+	path = copy_example(tmp_path)
+	WorldD.convert(path, path, 'zlib', print_out=False)
+	project = open_project(main, path)
+	project.write()
+	main.saver.wait()
+	tile = next(iter(project.palette.ids))
+	project.grid[0][1000, 1000] = tile
+	# the journal can't be opened, the append fails
+	os.mkdir(binary.journal_path(path))
+	project.write()
+	main.saver.wait()
+	assert main.saver.failed_saving(path)
+	os.rmdir(binary.journal_path(path))
+	project.autosave()
+	main.saver.wait()
+	assert not main.saver.failed_saving(path)
+	assert not os.path.exists(binary.journal_path(path))
+	assert tuple(WorldD.load(path, print_out=False)[3][0][1000, 1000]) == tile
+
+
+def test_blob_tiles_are_saved(main, tmp_path):
+	path = copy_example(tmp_path)
+	WorldD.convert(path, path, 'zlib', print_out=False)
+	project = open_project(main, path)
+	project.write()
+	main.saver.wait()
+	group = next(group for group in project.tiles.values() if group.tiles)
+	name = next(iter(group.tiles))
+	group.blob[255] = name
+	project.write()  # only the meta changed, it goes to the journal
+	main.saver.wait()
+	assert open_project(main, path).tiles[group.name].blob == {255: name}
+	json_path = str(tmp_path / 'json.world')
+	WorldD.convert(path, json_path, 'json', print_out=False)
+	assert open_project(main, json_path).tiles[group.name].blob == {255: name}
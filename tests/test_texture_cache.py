@@ -0,0 +1,87 @@
+import gc
+
+import pygame as pg
+
+from WorldD.atlas import Atlas
+from WorldD.main import MipPyramid, TextureCache
+
+TILE = 16
+
+
+class SpriteSheet:
+	"""the parts of Project.SpriteSheet used by the texture cache"""
+
+	def __init__(self, cache: TextureCache, size: int = 256):
+		self.img = pg.Surface((size, size), pg.SRCALPHA)
+		self.atlas = None
+		self.pyramid = MipPyramid(self.img, cache.max_bytes // 4)
+
+	def tile(self, rect, size) -> pg.Surface:
+		if self.atlas is not None and rect in self.atlas:
+			return self.atlas_pyramid.tile(self.atlas[rect], size)
+		return self.pyramid.tile(rect, size)
+
+	def pack(self, rects):
+		"""packs the rects into a new atlas, like Project.SpriteSheet.get_atlas after the lookup changed"""
+		self.atlas = Atlas(self.img, rects)
+		self.atlas_pyramid = MipPyramid(self.atlas.surface, self.pyramid.max_bytes)
+
+
+def rects(size: int = 256):
+	return [(x, y, TILE, TILE) for y in range(0, size, TILE) for x in range(0, size, TILE)]
+
+
+def counted(cache: TextureCache) -> int:
+	own = sum(cache.texture_size(texture) for texture in cache.textures.values() if texture.get_parent() is None)
+	return own + sum(cache.texture_size(level) for level in cache.levels)
+
+
+def test_pyramid_levels_are_counted_once():
+	cache = TextureCache(8 * 1024 * 1024)
+	sheet = SpriteSheet(cache)
+	for rect in rects():
+		cache.get(sheet, rect, (TILE * 2, TILE * 2))
+	assert len(cache.levels) == 1
+	assert cache.nbytes == counted(cache) == 512 * 512 * 4
+
+
+def test_levels_are_dropped_with_their_textures():
+	cache = TextureCache(4 * 1024 * 1024)
+	sheet = SpriteSheet(cache)
+	for scale in (2, 1, 5):
+		for rect in rects():
+			cache.get(sheet, rect, (TILE * scale, TILE * scale))
+		assert cache.nbytes == counted(cache) <= cache.max_bytes
+		if scale == 2:
+			assert 1 in sheet.pyramid.levels
+	# the level of scale 2 lost all of its textures
+	assert not cache.levels
+	gc.collect()
+	assert 1 not in sheet.pyramid.levels
+
+
+def test_levels_bigger_than_a_quarter_of_the_cache_are_not_built():
+	cache = TextureCache(2 * 1024 * 1024)
+	sheet = SpriteSheet(cache)
+	for rect in rects()[:4]:
+		texture = cache.get(sheet, rect, (TILE * 4, TILE * 4))
+		assert texture.get_parent() is None
+	assert not cache.levels
+	assert cache.nbytes == 4 * (TILE * 4) ** 2 * 4
+
+
+def test_replaced_atlas_is_counted_until_its_textures_are_dropped():
+	cache = TextureCache(256 * 1024)
+	sheet = SpriteSheet(cache)
+	sheet.pack(rects()[:64])
+	old = sheet.atlas.surface
+	for rect in rects()[:64]:
+		cache.get(sheet, rect, (TILE, TILE))
+	assert cache.levels == {old: 64}
+	assert cache.nbytes == counted(cache) == cache.texture_size(old)
+	sheet.pack(rects()[64:128])
+	for rect in rects()[64:128]:
+		cache.get(sheet, rect, (TILE * 3, TILE * 3))
+		assert cache.nbytes == counted(cache) <= cache.max_bytes
+	# the old atlas is only kept alive by its cached textures and dropping them frees it
+	assert old not in cache.levels
@@ -0,0 +1,165 @@
+import os
+
+import pytest
+
+import WorldD
+from WorldD import binary
+from WorldD.main import Journal, dumps
+
+TOKEN = 'token'
+
+
+def make_grid() -> WorldD.Grid:
+	"""grid with negative chunks, an empty layer and freed palette ids"""
+	grid = WorldD.Grid([{}, {}, {}])
+	first, _, third = grid
+	first[-40, -1] = ('group', 'a')
+	first[-1, -33] = ('group', 'b')
+	first[5, 5] = ('group', 'removed')
+	first[31, 32] = ('other', 'c')
+	third[-1000, 1000] = ('group', 'b')
+	third.fill(-5, -5, 5, 5, grid.palette.intern(('other', 'd')))
+	grid.remove_tile(('group', 'removed'))
+	assert grid.palette.free
+	return grid
+
+
+def make_meta(grid: WorldD.Grid, **extra) -> dict:
+	return {
+		'tile-size': [16, 16],
+		'img': 'sheet.png',
+		'data': {},
+		'layer-names': [f'layer {idx + 1}' for idx in range(len(grid))],
+		'current-layer': 0,
+		**extra
+	}
+
+
+def cells(grid: WorldD.Grid) -> list[dict]:
+	return [{pos: tuple(tile) for pos, tile in layer.items()} for layer in grid]
+
+
+def assert_same(loaded: WorldD.Grid, grid: WorldD.Grid):
+	assert cells(loaded) == cells(grid)
+	assert loaded.palette.entries == grid.palette.entries
+	assert sorted(loaded.palette.free) == sorted(grid.palette.free)
+
+
+def write_binary(path: str, grid: WorldD.Grid, compression: str | None = 'zlib', **extra):
+	with open(path, 'wb') as file:
+		binary.write(file, make_meta(grid, **extra), grid, compression)
+
+
+def load(path: str) -> WorldD.Grid:
+	result = WorldD.load(path, print_out=False)
+	assert result is not None
+	return result[3]
+
+
+@pytest.mark.parametrize('compression', ['none', 'zlib', 'lzma'])
+def test_binary_round_trip(tmp_path, compression):
+	grid = make_grid()
+	path = str(tmp_path / 'world.world')
+	write_binary(path, grid, compression)
+	loaded = load(path)
+	assert_same(loaded, grid)
+	assert len(loaded[1]) == 0
+
+
+def test_json_round_trip(tmp_path):
+	grid = make_grid()
+	path = tmp_path / 'world.world'
+	path.write_text(dumps(make_meta(grid), grid))
+	loader = WorldD.WorldLoader(str(path), print_out=False)
+	assert loader.load() is not None
+	assert loader.version == '1.1.0'
+	assert_same(loader.grid, grid)
+
+
+def append_record(path: str, journal: Journal, grid: WorldD.Grid):
+	layers, chunks = journal.diff(grid)
+	with open(binary.journal_path(path), 'ab') as file:
+		binary.write_journal_record(file, journal.token, {**make_meta(grid), 'palette': grid.palette.to_list()}, layers, chunks)
+	journal.mark(grid, len(chunks))
+
+
+def edit(grid: WorldD.Grid, step: int):
+	if step == 0:
+		grid[0][-40, -1] = ('other', 'c')
+		del grid[0][-1, -33]
+		grid.new_layer()[-64, -64] = ('new', 'tile')
+	else:
+		del grid[1]
+		grid[0][100, -100] = ('group', 'a')
+		grid.remove_tile(('other', 'd'))
+
+
+def test_journal_replay(tmp_path):
+	grid = make_grid()
+	path = str(tmp_path / 'world.world')
+	write_binary(path, grid, journal=TOKEN)
+	journal = Journal(path, TOKEN, grid)
+	for step in range(2):
+		edit(grid, step)
+		append_record(path, journal, grid)
+	loader = WorldD.WorldLoader(path, print_out=False)
+	loader.load()
+	assert loader.journal_records == 2
+	assert_same(loader.grid, grid)
+
+
+def test_journal_of_another_save_is_ignored(tmp_path):
+	grid = make_grid()
+	path = str(tmp_path / 'world.world')
+	write_binary(path, grid, journal=TOKEN)
+	saved = grid.copy()
+	journal = Journal(path, 'older token', grid)
+	edit(grid, 0)
+	append_record(path, journal, grid)
+	assert_same(load(path), saved)
+
+
+def test_torn_journal_record(tmp_path):
+	grid = make_grid()
+	path = str(tmp_path / 'world.world')
+	write_binary(path, grid, journal=TOKEN)
+	journal = Journal(path, TOKEN, grid)
+	edit(grid, 0)
+	append_record(path, journal, grid)
+	first = grid.copy()
+	complete = os.path.getsize(binary.journal_path(path))
+	edit(grid, 1)
+	append_record(path, journal, grid)
+	# the second save was interrupted in the middle of its record
+	with open(binary.journal_path(path), 'r+b') as file:
+		file.truncate(os.path.getsize(binary.journal_path(path)) - 7)
+		assert binary.journal_end(file) == complete
+	loader = WorldD.WorldLoader(path, print_out=False)
+	loader.load()
+	assert loader.journal_records == 1
+	assert_same(loader.grid, first)
+
+
+def mapped_cells(world: WorldD.MappedWorld) -> list[dict]:
+	return [{pos: layer[pos] for pos in layer} for layer in world.grid]
+
+
+@pytest.mark.parametrize('compression', ['none', 'zlib'])
+def test_open_world_replays_journal(tmp_path, compression):
+	grid = make_grid()
+	path = str(tmp_path / 'world.world')
+	write_binary(path, grid, compression, journal=TOKEN)
+	journal = Journal(path, TOKEN, grid)
+	for step in range(2):
+		edit(grid, step)
+		append_record(path, journal, grid)
+	grid[0][1000, 1000] = ('group', 'a')
+	append_record(path, journal, grid)
+	with WorldD.open_world(path) as world:
+		assert world.journal_records == 3
+		assert world.tile_at(0, 1000, 1000) == ('group', 'a')
+		assert mapped_cells(world) == cells(grid)
+		assert [len(layer) for layer in world.grid] == [len(layer) for layer in grid]
+		for idx, layer in enumerate(grid):
+			expected = sorted((x, y, tuple(tile)) for (x, y), tile in layer.items() if -70 <= x < 40 and -40 <= y < 40)
+			assert sorted(world.tiles_in_rect(idx, -70, -40, 40, 40)) == expected